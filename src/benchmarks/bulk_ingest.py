@@ -0,0 +1,113 @@
+"""
+Compare ORM and bulk session ingest throughput in rows per second.
+
+Run from the repository root against a scratch database:
+
+    python -m src.benchmarks.bulk_ingest --rows 100000
+    python -m src.benchmarks.bulk_ingest --url sqlite+aiosqlite:///:memory:
+
+Rows shaped like `SpeedAndFeed` are loaded into a scratch copy of its table
+(same columns, no foreign keys), which is dropped afterwards. The ORM path
+uses an `AsyncSession` with `add_all` per chunk; the bulk paths use
+`BulkSession.insert` and, on asyncpg, `BulkSession.copy`.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from sqlalchemy import Integer, MetaData, Table
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import registry
+
+from ..config import get_settings
+from ..db.postgres.bulk import bulk_session
+from ..db.postgres.models import SpeedAndFeed
+
+
+def scratch_table(metadata: MetaData) -> Table:
+    columns = [column._copy() for column in SpeedAndFeed.__table__.columns]
+    for column in columns:
+        if column.primary_key:
+            # SQLite only autoincrements INTEGER primary keys
+            column.type = column.type.with_variant(Integer(), "sqlite")
+    return Table("bench_speed_and_feed", metadata, *columns)
+
+
+def make_rows(count: int) -> List[Dict]:
+    rng = random.Random(42)
+    return [
+        {
+            "preset_name": f"preset-{i % 7}",
+            "operation_id": rng.randint(1, 40),
+            "tool_id": rng.randint(1, 5000),
+            "material": rng.choice(["P", "M", "K", "N", "S", "H"]),
+            "hardness_min_hb": 150.0,
+            "hardness_max_hb": 250.0,
+            "spindle_speed": rng.uniform(1000, 20000),
+            "surface_speed": rng.uniform(50, 400),
+            "cutting_feedrate": rng.uniform(100, 4000),
+            "feed_per_tooth": rng.uniform(0.01, 0.2),
+            "stepdown": rng.uniform(0.1, 5),
+            "stepover": rng.uniform(0.1, 5),
+        }
+        for i in range(count)
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.url or get_settings().postgres_async_url)
+    metadata = MetaData()
+    table = scratch_table(metadata)
+
+    class BenchRow:
+        pass
+
+    registry().map_imperatively(BenchRow, table)
+    rows = make_rows(args.rows)
+
+    async def reset() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.drop_all)
+            await conn.run_sync(metadata.create_all)
+
+    async def orm() -> None:
+        async with AsyncSession(engine) as session:
+            for start in range(0, len(rows), args.chunk):
+                session.add_all(BenchRow(**row) for row in rows[start:start + args.chunk])
+                await session.flush()
+            await session.commit()
+
+    async def bulk_insert() -> None:
+        async with bulk_session(engine) as bulk:
+            await bulk.insert(table, rows)
+
+    async def bulk_copy() -> None:
+        async with bulk_session(engine) as bulk:
+            await bulk.copy(table, rows)
+
+    paths = {"orm add_all": orm, "bulk insert": bulk_insert}
+    if engine.dialect.driver == "asyncpg":
+        paths["bulk copy"] = bulk_copy
+
+    for name, path in paths.items():
+        await reset()
+        start = time.perf_counter()
+        await path()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {len(rows) / elapsed:12,.0f} rows/s  ({elapsed:.2f} s)")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
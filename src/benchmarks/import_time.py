@@ -0,0 +1,66 @@
+"""
+Measure how long a fresh interpreter takes to import project modules.
+
+Run from the repository root:
+
+    python -m src.benchmarks.import_time
+    python -m src.benchmarks.import_time --max-ms 150 src.services
+
+Each module is imported in a new process (as a process-pool worker would
+be) and the median wall time over several runs is reported next to the
+baseline cost of starting the interpreter itself. The Postgres settings
+are not required: nothing touches the database at import time.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+
+DEFAULT_MODULES = [
+    "src.config",
+    "src.db",
+    "src.db.postgres.models",
+    "src.services",
+    "src.routers.speed_feed.scraper",
+]
+
+
+def time_import(statement: str, runs: int) -> float:
+    """Median wall time in ms of `python -c statement` over `runs` runs."""
+    timings: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-ms", type=float, default=None,
+        help="fail if any module costs more than this on top of interpreter startup",
+    )
+    args = parser.parse_args()
+
+    baseline = time_import("pass", args.runs)
+    print(f"{'interpreter startup':<40} {baseline:8.1f} ms")
+
+    failed = False
+    for module in args.modules:
+        total = time_import(f"import {module}", args.runs)
+        cost = total - baseline
+        over = args.max_ms is not None and cost > args.max_ms
+        failed |= over
+        print(f"{module:<40} {cost:8.1f} ms{'  OVER BUDGET' if over else ''}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Compare storage size and decode time of packed index arrays.
+
+Run from the repository root:
+
+    python -m src.benchmarks.index_codec
+    python -m src.benchmarks.index_codec --features 200 --triangles 50000
+
+Synthetic triangle index arrays (runs of consecutive ids with gaps, as a
+tessellator emits them) and face index arrays are generated from a fixed
+seed. Sizes are uncompressed payload bytes; the `int[]` size counts the
+24 byte header of a one dimensional Postgres array, and TOAST compression
+is not modelled. Decode time for `int[]` is the cost of turning the list
+of ints a driver hands back into a NumPy array, so it leaves out the
+driver's own list construction. No database is needed.
+"""
+import argparse
+import random
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from ..utils.index_codec import pack_indices, unpack_indices
+
+
+def make_indices(count: int, rng: random.Random) -> List[int]:
+    values: List[int] = []
+    position = rng.randrange(1_000_000)
+    while len(values) < count:
+        run = rng.randint(4, 400)
+        values.extend(range(position, position + run))
+        position += run + rng.randint(1, 5000)
+    return values[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=100)
+    parser.add_argument("--triangles", type=int, default=30000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    arrays = [make_indices(args.triangles, rng) for _ in range(args.features)]
+    values = args.features * args.triangles
+    print(f"{args.features} features x {args.triangles} indices = {values:,} values")
+
+    list_bytes = sum(
+        sys.getsizeof(array) + sum(sys.getsizeof(v) for v in array) for array in arrays
+    )
+    print(f"{'python list in memory':<24} {list_bytes / values:8.2f} bytes/value")
+
+    sizes = {"int[]": sum(24 + 4 * len(array) for array in arrays)}
+    packed = {}
+    for codec in ("int32", "varint"):
+        start = time.perf_counter()
+        packed[codec] = [pack_indices(array, codec) for array in arrays]
+        encode = time.perf_counter() - start
+        sizes[codec] = sum(len(blob) for blob in packed[codec])
+        print(f"{'pack ' + codec:<24} {encode * 1000:8.1f} ms")
+
+    print()
+    for name, size in sizes.items():
+        print(
+            f"{name:<24} {size / 1e6:8.2f} MB  {size / values:5.2f} bytes/value"
+            f"  {size / sizes['int[]']:6.1%} of int[]"
+        )
+
+    print()
+    start = time.perf_counter()
+    baseline = [np.asarray(array, dtype=np.int32) for array in arrays]
+    timings = {"int[] list -> ndarray": time.perf_counter() - start}
+    for codec, blobs in packed.items():
+        start = time.perf_counter()
+        decoded = [unpack_indices(blob) for blob in blobs]
+        timings[f"unpack {codec}"] = time.perf_counter() - start
+        assert all(np.array_equal(a, b) for a, b in zip(baseline, decoded)), codec
+    for name, seconds in timings.items():
+        print(f"{name:<24} {seconds * 1000:8.2f} ms  {values / seconds / 1e6:10.1f} M values/s")
+    print("all codecs round-trip")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compare ways of evaluating applies_if predicates over a job's features.
+
+Run from the repository root:
+
+    python -m src.benchmarks.predicates
+    python -m src.benchmarks.predicates --features 5000 --policies 1000
+
+A synthetic part and policy set are generated from a fixed seed. Three
+strategies are timed over every (policy, feature) pair: interpreting the
+JSON dict per feature, calling the compiled closures per feature, and the
+vectorized `evaluate_many`. All three must agree. No database is needed.
+"""
+import argparse
+import operator
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ..utils.predicates import _compile_cached, compile_predicate, evaluate_many
+
+
+FEATURE_TYPES = ["hole", "pocket", "slot", "face", "chamfer", "fillet", "boss", "thread"]
+OPERATIONS = ["drill", "ream", "tap", "rough_mill", "finish_mill", "chamfer_mill", "bore"]
+
+
+def make_features(count: int, rng: random.Random) -> List[Dict]:
+    features = []
+    for i in range(count):
+        dimensions = {
+            "diameter": round(rng.uniform(0.5, 50), 3),
+            "depth": round(rng.uniform(0.1, 80), 3),
+            "width": round(rng.uniform(1, 200), 3),
+        }
+        if rng.random() < 0.2:
+            del dimensions["width"]
+        features.append({
+            "feature_id": f"f{i}",
+            "feature_type": rng.choice(FEATURE_TYPES),
+            "dimensions": dimensions,
+            "required_ops": rng.sample(OPERATIONS, rng.randint(1, 3)),
+        })
+    return features
+
+
+def make_policies(count: int, rng: random.Random) -> List[Dict]:
+    def clause() -> Dict:
+        kind = rng.randrange(5)
+        if kind == 0:
+            return {"feature_type": rng.choice(FEATURE_TYPES)}
+        if kind == 1:
+            return {"feature_type": rng.sample(FEATURE_TYPES, 3)}
+        if kind == 2:
+            low = rng.choice([1, 2, 3, 5, 8, 12, 20])
+            return {"dimensions.diameter": {"gte": low, "lt": low * 2}}
+        if kind == 3:
+            return {"dimensions.depth": {"between": [0, rng.choice([5, 10, 20, 40])]}}
+        return {"required_ops": {"contains": rng.choice(OPERATIONS)}}
+
+    policies = []
+    for _ in range(count):
+        spec = {"all": [clause() for _ in range(rng.randint(1, 3))]}
+        if rng.random() < 0.3:
+            spec = {"any": [spec, {"not": clause()}]}
+        policies.append(spec)
+    return policies
+
+
+_COMPARE = {
+    "lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge,
+}
+
+
+def interpret(spec: Dict, feature: Dict) -> bool:
+    """Walk the JSON predicate for one feature, as callers do without the compiler."""
+    for key, value in spec.items():
+        if key == "all":
+            if not all(interpret(item, feature) for item in value):
+                return False
+        elif key == "any":
+            if not any(interpret(item, feature) for item in value):
+                return False
+        elif key == "not":
+            if interpret(value, feature):
+                return False
+        else:
+            actual: Any = feature
+            for part in key.split("."):
+                actual = actual.get(part) if isinstance(actual, dict) else None
+            tests = value if isinstance(value, dict) else (
+                {"in": value} if isinstance(value, list) else {"eq": value}
+            )
+            for op, arg in tests.items():
+                if op == "eq":
+                    ok = actual == arg
+                elif op == "in":
+                    ok = actual in arg
+                elif op == "contains":
+                    ok = isinstance(actual, list) and arg in actual
+                elif op == "between":
+                    ok = actual is not None and arg[0] <= actual <= arg[1]
+                else:
+                    ok = actual is not None and _COMPARE[op](actual, arg)
+                if not ok:
+                    return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", type=int, default=5000)
+    parser.add_argument("--policies", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    features = make_features(args.features, rng)
+    policies = make_policies(args.policies, rng)
+    pairs = args.features * args.policies
+    print(f"{args.features} features x {args.policies} policies = {pairs:,} evaluations")
+
+    def report(name: str, seconds: float, evaluations: bool = True) -> None:
+        rate = f"  {pairs / seconds / 1e6:8.2f} M evals/s" if evaluations else ""
+        print(f"{name:<28} {seconds * 1000:10.1f} ms{rate}")
+
+    start = time.perf_counter()
+    interpreted = np.array([[interpret(spec, f) for f in features] for spec in policies])
+    report("interpret dicts", time.perf_counter() - start)
+
+    _compile_cached.cache_clear()
+    start = time.perf_counter()
+    compiled = [compile_predicate(spec) for spec in policies]
+    report("compile (cold cache)", time.perf_counter() - start, evaluations=False)
+
+    start = time.perf_counter()
+    closures = np.array([[predicate(f) for f in features] for predicate in compiled])
+    report("compiled closures", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectorized = evaluate_many(policies, features)
+    report("vectorized evaluate_many", time.perf_counter() - start)
+
+    assert (interpreted == closures).all(), "closures disagree with the interpreter"
+    assert (interpreted == vectorized).all(), "vectorized disagrees with the interpreter"
+    print(f"all strategies agree; {interpreted.mean():.1%} of pairs match")
+
+
+if __name__ == "__main__":
+    main()
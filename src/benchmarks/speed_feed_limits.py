@@ -0,0 +1,133 @@
+"""
+Time capping a plan's speeds and feeds to machine limits.
+
+Run from the repository root:
+
+    python -m src.benchmarks.speed_feed_limits
+    python -m src.benchmarks.speed_feed_limits --setups 20 --operations 2000
+
+A synthetic plan (fixed seed) is capped three ways, and the results are
+checked to agree:
+
+    plan entries, per entry    `clamp_plan_operations`, one pass per entry
+    plan entries, as arrays    the entries' values gathered into one array
+                               per field, `clamp_arrays`, results written
+                               back into the entries
+    preset array               the same values as a structured array (the
+                               shape `SpeedFeedIndex` lookups return),
+                               `clamp_presets`
+
+Plan timings include copying the plan. No database is needed.
+"""
+import argparse
+import math
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..utils.speed_feed_limits import (
+    VALUE_FIELDS, MachineLimits, _copy_plan, clamp_arrays, clamp_plan_operations,
+    clamp_presets
+)
+
+
+def make_plans(setups: int, operations: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [
+        {
+            "setup_name": f"Setup {s + 1}",
+            "sequence": s + 1,
+            "operations": [
+                {
+                    "feature_id": f"f{s}-{o}",
+                    "speed_feed": {
+                        "spindle_speed": rng.uniform(2000, 20000),
+                        "surface_speed": rng.uniform(100, 600),
+                        "cutting_feedrate": rng.uniform(200, 8000),
+                        "feed_per_tooth": rng.uniform(0.02, 0.2),
+                        "stepdown": rng.uniform(0.2, 5),
+                        "stepover": rng.uniform(0.5, 10),
+                        "plunge_feedrate": rng.uniform(100, 3000),
+                        "retract_feedrate": rng.uniform(1000, 40000),
+                    },
+                }
+                for o in range(operations)
+            ],
+        }
+        for s in range(setups)
+    ]
+
+
+def clamp_as_arrays(
+    plans: List[Dict[str, Any]], limits: MachineLimits
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    targets: List[Dict[str, Any]] = []
+    entries: List[Dict[str, Any]] = []
+    plans = [_copy_plan(plan, "speed_feed", targets, entries) for plan in plans]
+    matrix = np.array([[t.get(name) for name in VALUE_FIELDS] for t in targets], dtype=np.float64)
+    clamped, flags = clamp_arrays(
+        {name: matrix[:, column] for column, name in enumerate(VALUE_FIELDS)}, limits
+    )
+    bits = np.column_stack([flags[name] for name in VALUE_FIELDS])
+    changed = np.flatnonzero(bits.any(axis=1))
+    new_values = np.column_stack([clamped[name] for name in VALUE_FIELDS])[changed].tolist()
+    old_values = matrix[changed].tolist()
+    for i, row_values, row_old, row_bits in zip(
+        changed.tolist(), new_values, old_values, bits[changed].tolist()
+    ):
+        reasons, before = {}, {}
+        for name, value, old, bit in zip(VALUE_FIELDS, row_values, row_old, row_bits):
+            if bit:
+                targets[i][name] = value
+                reasons[name] = bit
+                before[name] = old
+        entries[i]["clamped"] = reasons
+        entries[i]["unclamped"] = before
+    return plans, {"operations": len(targets), "clamped": len(changed)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--setups", type=int, default=10)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--rigidity", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    plans = make_plans(args.setups, args.operations, random.Random(args.seed))
+    limits = MachineLimits(spindle_rpm=12000, cutting_feed=5000, rapid_feed=25000, rigidity=args.rigidity)
+    print(f"{args.setups} setups x {args.operations} operations")
+
+    start = time.perf_counter()
+    per_entry, counts = clamp_plan_operations(plans, limits)
+    entry_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    as_arrays, _ = clamp_as_arrays(plans, limits)
+    array_time = time.perf_counter() - start
+
+    rows = np.zeros(counts["operations"], dtype=[(name, np.float64) for name in VALUE_FIELDS])
+    for name in VALUE_FIELDS:
+        rows[name] = [e["speed_feed"][name] for plan in plans for e in plan["operations"]]
+    start = time.perf_counter()
+    presets, _ = clamp_presets(rows, limits)
+    preset_time = time.perf_counter() - start
+
+    position = 0
+    for a, b in zip(per_entry, as_arrays):
+        for x, y in zip(a["operations"], b["operations"]):
+            assert x.get("clamped") == y.get("clamped")
+            assert x.get("unclamped") == y.get("unclamped")
+            for name in VALUE_FIELDS:
+                assert math.isclose(x["speed_feed"][name], y["speed_feed"][name]), name
+                assert math.isclose(x["speed_feed"][name], presets[name][position]), name
+            position += 1
+
+    print(f"{'plan entries, per entry':<26} {entry_time * 1000:8.1f} ms  ({counts['clamped']:,} of {counts['operations']:,} clamped)")
+    print(f"{'plan entries, as arrays':<26} {array_time * 1000:8.1f} ms")
+    print(f"{'preset array':<26} {preset_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -21,8 +23,34 @@ class Settings(BaseSettings):
     POSTGRES_DATABASE: str
     POSTGRES_POOL_SIZE: int = 20
     POSTGRES_MAX_OVERFLOW: int = 0
+    POSTGRES_POOL_TIMEOUT: float = 30.0
     POSTGRES_ECHO: bool = False
     
+    # Adaptive pool sizing (grows max_overflow up to POSTGRES_POOL_MAX_SIZE)
+    POSTGRES_POOL_ADAPTIVE: bool = False
+    POSTGRES_POOL_MAX_SIZE: int = 40
+    POSTGRES_POOL_GROW_WAIT_MS: float = 50.0
+    POSTGRES_POOL_SHRINK_WAIT_MS: float = 1.0
+    
+    # PostgreSQL read replica (optional; unset fields fall back to the primary's)
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    POSTGRES_REPLICA_USER: Optional[str] = None
+    POSTGRES_REPLICA_PASSWORD: Optional[str] = None
+    POSTGRES_REPLICA_DATABASE: Optional[str] = None
+    POSTGRES_REPLICA_POOL_SIZE: int = 20
+    POSTGRES_REPLICA_LAG_CHECK_INTERVAL: float = 0.05
+    
+    # Bulk ingest
+    INGEST_CHUNK_SIZE: int = 500
+    
+    # Job work queue
+    JOB_QUEUE_LEASE_SECONDS: float = 60.0
+    JOB_QUEUE_MAX_ATTEMPTS: int = 5
+    
+    # Mirror legacy policy writes into the v2 policy tables during cutover
+    POLICY_DUAL_WRITE: bool = False
+    
     # Database URL Properties
     @property
     def postgres_async_url(self) -> str:
@@ -32,4 +60,33 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DATABASE}"
         )
 
-settings = Settings()
+    @property
+    def postgres_replica_async_url(self) -> Optional[str]:
+        """PostgreSQL read replica async connection URL, if a replica is configured."""
+        if not self.POSTGRES_REPLICA_HOST:
+            return None
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_REPLICA_USER or self.POSTGRES_USER}"
+            f":{self.POSTGRES_REPLICA_PASSWORD or self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_REPLICA_HOST}:{self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT}"
+            f"/{self.POSTGRES_REPLICA_DATABASE or self.POSTGRES_DATABASE}"
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Build the settings on first use.
+
+    Importing this module stays free of side effects, so offline tools that
+    never touch the database do not need the Postgres environment.
+    """
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Backwards compatible `from src.config import settings`
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
@@ -1,11 +1,67 @@
-from .base import Base, TimestampMixin
-from .postgres import check_db, close_db, get_db
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .base import Base, TimestampMixin
+    from .postgres import (
+        AdaptivePoolSizer, BulkSession, ChunkedIngest, IngestResult,
+        PoolMonitor, ReplicaRouter, RoutingSession, bulk_session, check_db,
+        close_db, get_db, get_engine,
+        get_pool_monitor, get_pool_stats, get_read_db, get_replica_engine,
+        get_session_factory, ingest_session, pool_monitor
+    )
 
 
 __all__ = [
     "Base", 
     "TimestampMixin",
+    "AdaptivePoolSizer",
+    "BulkSession",
+    "ChunkedIngest",
+    "IngestResult",
+    "PoolMonitor",
+    "ReplicaRouter",
+    "RoutingSession",
+    "bulk_session",
     "check_db",
     "close_db",
     "get_db",
+    "get_engine",
+    "get_pool_monitor",
+    "get_pool_stats",
+    "get_read_db",
+    "get_replica_engine",
+    "get_session_factory",
+    "ingest_session",
+    "pool_monitor",
 ]
+
+_POSTGRES_EXPORTS = (
+    "AdaptivePoolSizer",
+    "BulkSession",
+    "ChunkedIngest",
+    "IngestResult",
+    "PoolMonitor",
+    "ReplicaRouter",
+    "RoutingSession",
+    "bulk_session",
+    "check_db",
+    "close_db",
+    "get_db",
+    "get_engine",
+    "get_pool_monitor",
+    "get_pool_stats",
+    "get_read_db",
+    "get_replica_engine",
+    "get_session_factory",
+    "ingest_session",
+    "pool_monitor",
+)
+
+# Everything is imported on first access so `import src.db` stays cheap
+__getattr__ = lazy_exports(__name__, {
+    "Base": ".base",
+    "TimestampMixin": ".base",
+    **{name: ".postgres" for name in _POSTGRES_EXPORTS},
+})
@@ -1 +1,154 @@
+from typing import TYPE_CHECKING
 
+from ...utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .dimension_controller import (
+        DimensionResolver,
+        get_resolver,
+        material_resolver,
+        operation_resolver,
+        tool_type_resolver,
+        vendor_resolver,
+    )
+    from .formatted_feature_controller import (
+        PACKED_COLUMNS,
+        fan_out_job_features,
+        feature_indices,
+        flatten_job_features,
+        iter_job_features,
+        migrate_packed_indices,
+        packed_index_values,
+        packed_storage_report,
+    )
+    from .job_controller import (
+        JOB_PROFILES,
+        JobPage,
+        get_job,
+        job_columns,
+        job_load_options,
+        list_jobs,
+        select_jobs,
+    )
+    from .material_property_controller import (
+        load_material_properties,
+        materials_covering_hardness,
+        refresh_material_properties,
+    )
+    from .operation_plan_controller import (
+        PLAN_FIELDS,
+        load_job_plans,
+        plan_values,
+        replace_job_plans,
+        write_plan_diff,
+    )
+    from .policy_migration_controller import (
+        PolicyMappingError,
+        PolicyMigrator,
+        configure_policy_dual_write,
+        disable_policy_dual_write,
+        enable_policy_dual_write,
+    )
+    from .sync_controller import (
+        SPEED_AND_FEED_SYNC,
+        TOOL_SYNC,
+        ChangeSet,
+        SyncSpec,
+        apply_changes,
+        detect_changes,
+        sync_rows,
+        sync_speed_and_feeds,
+        sync_tools,
+    )
+
+__all__ = [
+    "JOB_PROFILES",
+    "PACKED_COLUMNS",
+    "PLAN_FIELDS",
+    "SPEED_AND_FEED_SYNC",
+    "TOOL_SYNC",
+    "ChangeSet",
+    "DimensionResolver",
+    "JobPage",
+    "PolicyMappingError",
+    "PolicyMigrator",
+    "SyncSpec",
+    "apply_changes",
+    "detect_changes",
+    "configure_policy_dual_write",
+    "disable_policy_dual_write",
+    "enable_policy_dual_write",
+    "fan_out_job_features",
+    "feature_indices",
+    "flatten_job_features",
+    "get_job",
+    "get_resolver",
+    "iter_job_features",
+    "job_columns",
+    "job_load_options",
+    "list_jobs",
+    "load_job_plans",
+    "load_material_properties",
+    "material_resolver",
+    "materials_covering_hardness",
+    "migrate_packed_indices",
+    "operation_resolver",
+    "packed_index_values",
+    "packed_storage_report",
+    "plan_values",
+    "refresh_material_properties",
+    "replace_job_plans",
+    "select_jobs",
+    "sync_rows",
+    "sync_speed_and_feeds",
+    "sync_tools",
+    "tool_type_resolver",
+    "vendor_resolver",
+    "write_plan_diff",
+]
+
+__getattr__ = lazy_exports(__name__, {
+    "JOB_PROFILES": ".job_controller",
+    "PACKED_COLUMNS": ".formatted_feature_controller",
+    "PLAN_FIELDS": ".operation_plan_controller",
+    "SPEED_AND_FEED_SYNC": ".sync_controller",
+    "TOOL_SYNC": ".sync_controller",
+    "ChangeSet": ".sync_controller",
+    "DimensionResolver": ".dimension_controller",
+    "JobPage": ".job_controller",
+    "PolicyMappingError": ".policy_migration_controller",
+    "PolicyMigrator": ".policy_migration_controller",
+    "SyncSpec": ".sync_controller",
+    "apply_changes": ".sync_controller",
+    "detect_changes": ".sync_controller",
+    "configure_policy_dual_write": ".policy_migration_controller",
+    "disable_policy_dual_write": ".policy_migration_controller",
+    "enable_policy_dual_write": ".policy_migration_controller",
+    "fan_out_job_features": ".formatted_feature_controller",
+    "feature_indices": ".formatted_feature_controller",
+    "flatten_job_features": ".formatted_feature_controller",
+    "get_job": ".job_controller",
+    "get_resolver": ".dimension_controller",
+    "iter_job_features": ".formatted_feature_controller",
+    "job_columns": ".job_controller",
+    "job_load_options": ".job_controller",
+    "list_jobs": ".job_controller",
+    "load_job_plans": ".operation_plan_controller",
+    "load_material_properties": ".material_property_controller",
+    "material_resolver": ".dimension_controller",
+    "materials_covering_hardness": ".material_property_controller",
+    "migrate_packed_indices": ".formatted_feature_controller",
+    "operation_resolver": ".dimension_controller",
+    "packed_index_values": ".formatted_feature_controller",
+    "packed_storage_report": ".formatted_feature_controller",
+    "plan_values": ".operation_plan_controller",
+    "refresh_material_properties": ".material_property_controller",
+    "replace_job_plans": ".operation_plan_controller",
+    "select_jobs": ".job_controller",
+    "sync_rows": ".sync_controller",
+    "sync_speed_and_feeds": ".sync_controller",
+    "sync_tools": ".sync_controller",
+    "tool_type_resolver": ".dimension_controller",
+    "vendor_resolver": ".dimension_controller",
+    "write_plan_diff": ".operation_plan_controller",
+})
@@ -0,0 +1,143 @@
+"""Batched get-or-create resolution for name keyed reference tables."""
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Type
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..postgres.connection import get_engine
+from ..postgres.models import Base, Material, OperationName, ToolType, Vendor
+from ...utils import slugify
+
+
+# Keeps every statement well below asyncpg's 32767 bind parameter limit
+BATCH_SIZE = 1000
+
+
+class DimensionResolver:
+    """
+    Resolve small reference rows (vendors, tool types, ...) by unique name.
+
+    Resolved ids are kept in an in-process name -> id map, so repeated names
+    cost nothing and each batch of misses costs one SELECT plus at most one
+    INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+    Lookups and inserts run in their own short transaction instead of the
+    caller's session. Created rows are committed immediately, so a rollback
+    in the caller can never leave a stale id in the map, and unique index
+    locks are not held for the length of an ingest. Names are inserted in
+    sorted order so concurrent workers always lock keys in the same order
+    and cannot deadlock on each other.
+    """
+
+    def __init__(
+        self,
+        model: Type[Base],
+        defaults: Optional[Callable[[str], Dict]] = None,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.model = model
+        self.defaults = defaults or (lambda name: {})
+        self.bind = bind
+        self._ids: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Normalize a raw name the same way for lookups and inserts."""
+        return " ".join(name.split())
+
+    async def resolve(
+        self, names: Iterable[Optional[str]], create: bool = True
+    ) -> Dict[str, int]:
+        """
+        Map names to ids, creating missing rows when `create` is set.
+
+        The returned dict is keyed by normalized name. Names that do not
+        exist and were not created are left out.
+        """
+        wanted = {self.normalize(name) for name in names if name}
+        wanted.discard("")
+
+        missing = sorted(wanted - self._ids.keys())
+        if missing:
+            # One in-flight resolution per process; callers racing on the
+            # same names wait and then find them in the map.
+            async with self._lock:
+                missing = [name for name in missing if name not in self._ids]
+                for start in range(0, len(missing), BATCH_SIZE):
+                    await self._resolve_batch(missing[start:start + BATCH_SIZE], create)
+
+        return {name: self._ids[name] for name in wanted if name in self._ids}
+
+    async def resolve_one(self, name: str, create: bool = True) -> Optional[int]:
+        """Map a single name to an id."""
+        resolved = await self.resolve([name], create=create)
+        return resolved.get(self.normalize(name))
+
+    def prime(self, ids: Dict[str, int]) -> None:
+        """Seed the map with known name -> id pairs."""
+        self._ids.update({self.normalize(name): id_ for name, id_ in ids.items()})
+
+    def clear(self) -> None:
+        """Forget every cached id, e.g. after rows were deleted or renamed."""
+        self._ids.clear()
+
+    async def _resolve_batch(self, names: List[str], create: bool) -> None:
+        engine = self.bind or get_engine()
+        async with engine.begin() as conn:
+            found = await self._select(conn, names)
+            self._ids.update(found)
+
+            remaining = [name for name in names if name not in found]
+            if not remaining or not create:
+                return
+
+            table = self.model.__table__
+            stmt = (
+                insert(table)
+                .values([{"name": name, **self.defaults(name)} for name in remaining])
+                .on_conflict_do_nothing(index_elements=[table.c.name])
+                .returning(table.c.name, table.c.id)
+            )
+            created = {name: id_ for name, id_ in await conn.execute(stmt)}
+            self._ids.update(created)
+
+            # Rows inserted concurrently by another worker hit the conflict
+            # and are not returned; they are committed by now, so read them.
+            raced = [name for name in remaining if name not in created]
+            if raced:
+                self._ids.update(await self._select(conn, raced))
+
+    async def _select(self, conn: AsyncConnection, names: List[str]) -> Dict[str, int]:
+        table = self.model.__table__
+        result = await conn.execute(
+            select(table.c.name, table.c.id).where(table.c.name.in_(names))
+        )
+        return {name: id_ for name, id_ in result}
+
+
+vendor_resolver = DimensionResolver(
+    Vendor, defaults=lambda name: {"slug": slugify(name)}
+)
+tool_type_resolver = DimensionResolver(ToolType)
+operation_resolver = DimensionResolver(
+    OperationName, defaults=lambda name: {"code": slugify(name).replace("-", "_")}
+)
+material_resolver = DimensionResolver(Material)
+
+_RESOLVERS: Dict[Type[Base], DimensionResolver] = {
+    Vendor: vendor_resolver,
+    ToolType: tool_type_resolver,
+    OperationName: operation_resolver,
+    Material: material_resolver,
+}
+
+
+def get_resolver(model: Type[Base]) -> DimensionResolver:
+    """Return the shared resolver for a reference model."""
+    try:
+        return _RESOLVERS[model]
+    except KeyError:
+        raise ValueError(f"No dimension resolver registered for {model.__name__}") from None
@@ -0,0 +1,284 @@
+"""FormattedFeature writes: bulk fan-out from jobs and packed index arrays."""
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from sqlalchemy import bindparam, delete, func, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..postgres.bulk import bulk_session
+from ..postgres.connection import get_engine
+from ..postgres.invalidation import notify_model_change
+from ..postgres.schema import apply_schema_changes
+from ..postgres.models import FormattedFeature, Job
+from ...utils.index_codec import Indices, pack_indices, unpack_indices
+
+
+BATCH_SIZE = 500
+
+# FormattedFeature column -> keys it is read from in a raw job feature,
+# and the value used when none is present
+FEATURE_FIELDS: Dict[str, tuple] = {
+    "feature_id": (("feature_id", "id"), None),
+    "feature_type": (("feature_type", "type"), None),
+    "faces": (("faces",), {}),
+    "dimensions": (("dimensions",), {}),
+    "directions": (("directions",), []),
+    "bounding_box": (("bounding_box", "bbox"), {}),
+    "triangle_indices": (("triangle_indices",), []),
+    "face_indices": (("face_indices",), []),
+    "manufacturing_notes": (("manufacturing_notes", "notes"), []),
+    "required_ops": (("required_ops",), []),
+    "optional_ops": (("optional_ops",), []),
+    "adjacent_planes": (("adjacent_planes",), None),
+}
+
+# Array column -> packed column
+PACKED_COLUMNS = {
+    "triangle_indices": "triangle_indices_packed",
+    "face_indices": "face_indices_packed",
+}
+
+
+def packed_index_values(
+    triangle_indices: Indices, face_indices: Indices, codec: str = "int32"
+) -> Dict[str, Any]:
+    """
+    Column values storing both index arrays packed.
+
+    The array columns are NOT NULL and get empty arrays; readers go through
+    `feature_indices`, which prefers the packed form.
+    """
+    return {
+        "triangle_indices": [],
+        "face_indices": [],
+        "triangle_indices_packed": pack_indices(triangle_indices, codec),
+        "face_indices_packed": pack_indices(face_indices, codec),
+    }
+
+
+def feature_indices(feature: Any, column: str) -> np.ndarray:
+    """
+    One index array of a feature (ORM object or row) as int32 NumPy array.
+
+    Packed values are unpacked, zero-copy for the int32 codec; rows not
+    migrated yet fall back to converting the array column. The packed
+    columns are deferred, so ORM objects only use them when loaded with
+    `undefer`.
+    """
+    if column not in PACKED_COLUMNS:
+        raise ValueError(f"{column!r} is not a packed index column")
+    state = inspect(feature, raiseerr=False)
+    if state is not None and PACKED_COLUMNS[column] in state.unloaded:
+        packed = None
+    else:
+        packed = getattr(feature, PACKED_COLUMNS[column], None)
+    if packed is not None:
+        return unpack_indices(packed)
+    return np.asarray(getattr(feature, column) or (), dtype=np.int32)
+
+
+async def migrate_packed_indices(
+    codec: str = "int32",
+    clear_arrays: bool = False,
+    batch_size: int = BATCH_SIZE,
+    bind: Optional[AsyncEngine] = None,
+) -> int:
+    """
+    Fill the packed columns of every row that lacks them.
+
+    The columns are added first if the table does not have them yet. Rows
+    are walked in id order, one batch per transaction, so the migration
+    can be interrupted and rerun. With `clear_arrays` the array columns are
+    emptied in the same update to give their space back (after the next
+    VACUUM), including rows packed by an earlier run; leave it off until
+    every reader uses `feature_indices`. Returns the number of rows
+    written.
+    """
+    table = FormattedFeature.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(
+            triangle_indices_packed=bindparam("new_triangle_indices_packed"),
+            face_indices_packed=bindparam("new_face_indices_packed"),
+            # Same content in a new representation: keep the timestamp
+            updated_at=table.c.updated_at,
+        )
+    )
+    if clear_arrays:
+        stmt = stmt.values(triangle_indices=[], face_indices=[])
+
+    pending = table.c.triangle_indices_packed.is_(None) | table.c.face_indices_packed.is_(None)
+    if clear_arrays:
+        # Also empty the arrays of rows packed by an earlier run
+        pending |= (func.cardinality(table.c.triangle_indices) > 0) | (
+            func.cardinality(table.c.face_indices) > 0
+        )
+
+    engine = bind or get_engine()
+    await apply_schema_changes(["formattedfeature_packed_indices"], engine)
+    migrated = 0
+    last_id = 0
+    while True:
+        async with engine.begin() as conn:
+            rows = (await conn.execute(
+                select(table.c.id, table.c.triangle_indices, table.c.face_indices)
+                .where(table.c.id > last_id, pending)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return migrated
+            last_id = rows[-1].id
+            await conn.execute(stmt, [
+                {
+                    "row_id": row.id,
+                    "new_triangle_indices_packed": pack_indices(row.triangle_indices, codec),
+                    "new_face_indices_packed": pack_indices(row.face_indices, codec),
+                }
+                for row in rows
+            ])
+            migrated += len(rows)
+
+
+async def packed_storage_report(bind: Optional[AsyncEngine] = None) -> Dict[str, int]:
+    """
+    Stored bytes of the array and packed index columns of migrated rows.
+
+    Sizes are `pg_column_size`, i.e. as stored after TOAST compression.
+    Only meaningful before the arrays are cleared.
+    """
+    table = FormattedFeature.__table__
+    query = select(
+        func.count().label("rows"),
+        func.coalesce(func.sum(
+            func.pg_column_size(table.c.triangle_indices)
+            + func.pg_column_size(table.c.face_indices)
+        ), 0).label("array_bytes"),
+        func.coalesce(func.sum(
+            func.pg_column_size(table.c.triangle_indices_packed)
+            + func.pg_column_size(table.c.face_indices_packed)
+        ), 0).label("packed_bytes"),
+    ).where(
+        table.c.triangle_indices_packed.is_not(None),
+        table.c.face_indices_packed.is_not(None),
+    )
+
+    engine = bind or get_engine()
+    async with engine.connect() as conn:
+        row = (await conn.execute(query)).one()
+    return {"rows": row.rows, "array_bytes": int(row.array_bytes), "packed_bytes": int(row.packed_bytes)}
+
+
+def iter_job_features(features: Any) -> Iterable[Mapping]:
+    """
+    Raw feature dicts of a `Job.features` value.
+
+    Accepts a list of features, a `{"features": [...]}` wrapper or a dict
+    keyed by feature id; in the last form the key stands in for a missing
+    feature id.
+    """
+    if isinstance(features, Mapping) and isinstance(features.get("features"), list):
+        features = features["features"]
+    if isinstance(features, Mapping):
+        for key, feature in features.items():
+            if isinstance(feature, Mapping):
+                has_id = feature.get("feature_id") is not None or feature.get("id") is not None
+                yield feature if has_id else {"feature_id": str(key), **feature}
+        return
+    for feature in features or ():
+        if isinstance(feature, Mapping):
+            yield feature
+
+
+def flatten_job_features(
+    job_id: int,
+    company_id: Optional[int],
+    features: Any,
+    codec: Optional[str] = None,
+) -> Dict[str, List[Any]]:
+    """
+    Flatten a job's raw features into FormattedFeature column batches.
+
+    Returns column name -> list of values, one entry per feature, in
+    feature order (also stored as `index`). With `codec` the index arrays
+    are written packed (see `packed_index_values`).
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in FEATURE_FIELDS}
+    columns.update(index=[], company_id=[], cad_feature_cache_id=[])
+    if codec is not None:
+        columns.update(triangle_indices_packed=[], face_indices_packed=[])
+
+    for position, feature in enumerate(iter_job_features(features)):
+        for name, (keys, default) in FEATURE_FIELDS.items():
+            value = next((feature[key] for key in keys if feature.get(key) is not None), default)
+            columns[name].append(value)
+        if columns["feature_type"][-1] is None:
+            raise ValueError(f"Job {job_id}: feature {position} has no feature_type")
+        if columns["feature_id"][-1] is not None:
+            columns["feature_id"][-1] = str(columns["feature_id"][-1])
+        columns["index"].append(position)
+        columns["company_id"].append(company_id)
+        columns["cad_feature_cache_id"].append(job_id)
+
+        if codec is not None:
+            for name in PACKED_COLUMNS:
+                columns[PACKED_COLUMNS[name]].append(pack_indices(columns[name][-1], codec))
+                columns[name][-1] = []
+    return columns
+
+
+async def fan_out_job_features(
+    job_ids: Iterable[int],
+    replace: bool = True,
+    codec: Optional[str] = None,
+    use_copy: Optional[bool] = None,
+    bind: Optional[AsyncEngine] = None,
+) -> int:
+    """
+    Write the FormattedFeature rows of jobs from their `features`.
+
+    All jobs go through one bulk session: one SELECT of the jobs, one
+    DELETE of their existing rows when `replace` is set, and the new rows
+    as a single binary COPY (asyncpg; arrays and JSONB travel in COPY's
+    binary format) or as batched multi-row INSERTs. The whole fan-out
+    commits or rolls back together, and caches of these jobs' features are
+    notified after the commit. Returns the number of rows written.
+    """
+    job_ids = sorted(set(job_ids))
+    if not job_ids:
+        return 0
+    jobs = Job.__table__
+    table = FormattedFeature.__table__
+
+    engine = bind or get_engine()
+    if use_copy is None:
+        use_copy = engine.dialect.driver == "asyncpg"
+
+    async with bulk_session(engine) as bulk:
+        rows = await bulk.execute(
+            select(jobs.c.id, jobs.c.company_id, jobs.c.features).where(jobs.c.id.in_(job_ids))
+        )
+        batches: Dict[str, List[Any]] = {}
+        for job_id, company_id, features in rows:
+            flattened = flatten_job_features(job_id, company_id, features, codec)
+            for name, values in flattened.items():
+                batches.setdefault(name, []).extend(values)
+
+        if replace:
+            await bulk.execute(delete(table).where(table.c.cad_feature_cache_id.in_(job_ids)))
+
+        written = 0
+        if batches and batches["index"]:
+            names = list(batches)
+            records = list(zip(*(batches[name] for name in names)))
+            if use_copy:
+                written = await bulk.copy(table, records, columns=names)
+            else:
+                written = await bulk.insert(table, records, columns=names)
+
+    notify_model_change({
+        FormattedFeature: [{"cad_feature_cache_id": job_id} for job_id in job_ids]
+    })
+    return written
@@ -0,0 +1,143 @@
+"""Job reads that only load the columns a caller needs."""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql import ColumnElement
+
+from ..postgres.models import Job
+
+
+# Scalar columns: every profile loads them
+_SUMMARY = (
+    "id", "company_id", "user_id", "session_id", "machine_id", "material_id",
+    "stock_id", "machine_rigidity", "deterministic_completed",
+    "ai_strategy_completed", "cad_url", "glb_url", "glb_map_url", "gdt_url",
+    "gdt_cache_url", "created_at", "updated_at",
+)
+
+# Profile name -> Job columns it loads. The JSONB columns can run to
+# megabytes per row, so listings should never use "full".
+JOB_PROFILES: Dict[str, Tuple[str, ...]] = {
+    "summary": _SUMMARY,
+    "geometry": _SUMMARY + ("features", "bounding_box", "directions"),
+    "planning": _SUMMARY + (
+        "features", "bounding_box", "directions", "operations_json",
+        "operations_json_v2", "flagged_features", "policy",
+    ),
+    "feedback": _SUMMARY + ("ratings_json", "flagged_features"),
+    "full": tuple(column.key for column in Job.__table__.columns),
+}
+
+JobCursor = Tuple[Optional[int], int]
+
+
+@dataclass
+class JobPage:
+    """One page of a job listing and the cursor of the next, if any."""
+
+    jobs: List[Job]
+    next_cursor: Optional[JobCursor]
+
+
+def job_columns(profile: str) -> List[ColumnElement]:
+    """Table columns of a profile, for Core projections without ORM objects."""
+    table = Job.__table__
+    return [table.c[name] for name in _profile(profile)]
+
+
+def job_load_options(profile: str):
+    """
+    Loader option restricting a `select(Job)` to a profile's columns.
+
+    Reading a column outside the profile raises instead of silently
+    emitting one lazy load per row.
+    """
+    if profile == "full":
+        return load_only(*(getattr(Job, name) for name in _profile(profile)))
+    return load_only(*(getattr(Job, name) for name in _profile(profile)), raiseload=True)
+
+
+def select_jobs(profile: str = "summary") -> Select:
+    """`select(Job)` loading only a profile's columns."""
+    return select(Job).options(job_load_options(profile))
+
+
+async def get_job(session: AsyncSession, job_id: int, profile: str = "full") -> Optional[Job]:
+    """One job by id, with a profile's columns."""
+    result = await session.execute(select_jobs(profile).where(Job.id == job_id))
+    return result.scalar_one_or_none()
+
+
+async def list_jobs(
+    session: AsyncSession,
+    company_id: Optional[int] = None,
+    profile: str = "summary",
+    after: Optional[JobCursor] = None,
+    limit: int = 50,
+    descending: bool = False,
+    where: Sequence[ColumnElement] = (),
+) -> JobPage:
+    """
+    Keyset-paginated jobs ordered by (company_id, id).
+
+    With `company_id` the listing stays within one company; without it,
+    it walks every company, then the jobs without a company (cursor
+    company None) in id order. Pass the previous page's `next_cursor` as
+    `after` to continue; unlike OFFSET, later pages cost the same as the
+    first. `descending` lists newest ids first.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    stmt = select_jobs(profile).where(*where)
+    if company_id is not None:
+        stmt = _after_id(stmt.where(Job.company_id == company_id), after, descending)
+        return _to_page(await _fetch(session, stmt, limit + 1), limit)
+
+    jobs: List[Job] = []
+    if after is None or after[0] is not None:
+        by_company = stmt.where(Job.company_id.is_not(None))
+        if after is not None:
+            key, cursor = tuple_(Job.company_id, Job.id), tuple_(*after)
+            by_company = by_company.where(key < cursor if descending else key > cursor)
+        if descending:
+            by_company = by_company.order_by(Job.company_id.desc(), Job.id.desc())
+        else:
+            by_company = by_company.order_by(Job.company_id, Job.id)
+        jobs = await _fetch(session, by_company, limit + 1)
+        after = None
+    if len(jobs) <= limit:
+        # A query of their own: NULLs fail the (company_id, id) row comparison
+        without = _after_id(stmt.where(Job.company_id.is_(None)), after, descending)
+        jobs += await _fetch(session, without, limit + 1 - len(jobs))
+    return _to_page(jobs, limit)
+
+
+def _after_id(stmt: Select, after: Optional[JobCursor], descending: bool) -> Select:
+    if after is not None:
+        stmt = stmt.where(Job.id < after[1] if descending else Job.id > after[1])
+    return stmt.order_by(Job.id.desc() if descending else Job.id)
+
+
+async def _fetch(session: AsyncSession, stmt: Select, limit: int) -> List[Job]:
+    return list((await session.execute(stmt.limit(limit))).scalars())
+
+
+def _to_page(jobs: List[Job], limit: int) -> JobPage:
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = (jobs[-1].company_id, jobs[-1].id)
+    return JobPage(jobs, next_cursor)
+
+
+def _profile(profile: str) -> Tuple[str, ...]:
+    try:
+        return JOB_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown job profile {profile!r}; expected one of {', '.join(JOB_PROFILES)}"
+        ) from None
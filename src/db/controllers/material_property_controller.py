@@ -0,0 +1,113 @@
+"""Persist numeric ranges parsed from the material property texts."""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.sql import Select
+
+from ..postgres.connection import get_engine
+from ..postgres.models import Material, MaterialPropertyRange
+from ...utils import content_hash
+from ...utils.material_properties import PROPERTY_COLUMNS, parse_material_properties
+
+
+BATCH_SIZE = 1000
+
+
+async def refresh_material_properties(
+    material_ids: Optional[Iterable[int]] = None,
+    force: bool = False,
+    bind: Optional[AsyncEngine] = None,
+) -> int:
+    """
+    Parse and store the property ranges of materials whose texts changed.
+
+    Materials are read in id order, one batch per transaction, joined with
+    their stored ranges; only rows whose property texts hash differently
+    from the stored `source_hash` (or every row, with `force`) are parsed
+    and upserted. Returns the number of materials written.
+    """
+    materials = Material.__table__
+    ranges = MaterialPropertyRange.__table__
+    ids = sorted(set(material_ids)) if material_ids is not None else None
+    engine = bind or get_engine()
+
+    written = 0
+    last_id = 0
+    while True:
+        query = (
+            select(materials.c.id, *(materials.c[c] for c in PROPERTY_COLUMNS), ranges.c.source_hash)
+            .outerjoin(ranges, ranges.c.material_id == materials.c.id)
+            .where(materials.c.id > last_id)
+            .order_by(materials.c.id)
+            .limit(BATCH_SIZE)
+        )
+        if ids is not None:
+            query = query.where(materials.c.id.in_(ids))
+
+        async with engine.begin() as conn:
+            rows = (await conn.execute(query)).mappings().all()
+            if not rows:
+                return written
+            last_id = rows[-1]["id"]
+
+            changed: List[Dict] = []
+            for row in rows:
+                source_hash = content_hash([row[c] for c in PROPERTY_COLUMNS])
+                if force or row["source_hash"] != source_hash:
+                    changed.append({
+                        "material_id": row["id"],
+                        "source_hash": source_hash,
+                        **parse_material_properties(row),
+                    })
+            if changed:
+                stmt = insert(ranges)
+                await conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[ranges.c.material_id],
+                        set_={
+                            name: stmt.excluded[name]
+                            for name in changed[0]
+                            if name != "material_id"
+                        } | {"updated_at": func.now()},
+                    ),
+                    changed,
+                )
+                written += len(changed)
+
+        if len(rows) < BATCH_SIZE:
+            return written
+
+
+async def load_material_properties(
+    material_ids: Iterable[int], bind: Optional[AsyncEngine] = None
+) -> Dict[int, Dict[str, Optional[float]]]:
+    """Stored numeric ranges of the given materials, keyed by material id."""
+    ranges = MaterialPropertyRange.__table__
+    columns = [c for c in ranges.columns if c.name not in ("source_hash", "created_at", "updated_at")]
+    ids = sorted(set(material_ids))
+    engine = bind or get_engine()
+
+    result: Dict[int, Dict[str, Optional[float]]] = {}
+    async with engine.connect() as conn:
+        for start in range(0, len(ids), BATCH_SIZE):
+            rows = await conn.execute(
+                select(*columns).where(ranges.c.material_id.in_(ids[start:start + BATCH_SIZE]))
+            )
+            for row in rows.mappings():
+                values = dict(row)
+                result[values.pop("material_id")] = values
+    return result
+
+
+def materials_covering_hardness(hardness_hb: float) -> Select:
+    """Ids of materials whose parsed hardness range covers `hardness_hb`."""
+    ranges = MaterialPropertyRange.__table__
+    return select(ranges.c.material_id).where(
+        or_(ranges.c.hardness_min_hb.is_not(None), ranges.c.hardness_max_hb.is_not(None)),
+        and_(
+            or_(ranges.c.hardness_min_hb.is_(None), ranges.c.hardness_min_hb <= hardness_hb),
+            or_(ranges.c.hardness_max_hb.is_(None), ranges.c.hardness_max_hb >= hardness_hb),
+        ),
+    )
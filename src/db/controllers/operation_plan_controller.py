@@ -0,0 +1,118 @@
+"""MachineOperationPlan reads and writes for one job at a time."""
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..postgres.models import MachineOperationPlan
+from ...utils import content_hash
+
+
+# Columns of a plan row that carry its content; everything else is
+# bookkeeping (id, job, timestamps)
+PLAN_FIELDS = ("setup_name", "sequence", "operations")
+
+
+def plan_values(plan: Any) -> Dict[str, Any]:
+    """Content columns of a plan given as a mapping, row or ORM object."""
+    if isinstance(plan, Mapping):
+        values = {name: plan.get(name) for name in PLAN_FIELDS}
+    else:
+        values = {name: getattr(plan, name, None) for name in PLAN_FIELDS}
+    if values["sequence"] is None or values["operations"] is None:
+        raise ValueError("Operation plans need a sequence and operations")
+    return values
+
+
+async def load_job_plans(conn: AsyncConnection, job_id: int) -> List[Dict[str, Any]]:
+    """Content columns and `id` of a job's plans in sequence order."""
+    table = MachineOperationPlan.__table__
+    rows = await conn.execute(
+        select(*(table.c[name] for name in PLAN_FIELDS), table.c.id)
+        .where(table.c.cad_feature_cache_id == job_id)
+        .order_by(table.c.sequence, table.c.id)
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+async def replace_job_plans(
+    conn: AsyncConnection, job_id: int, plans: Iterable[Any]
+) -> int:
+    """
+    Replace all of a job's plans with `plans` on `conn`'s transaction.
+
+    Returns the number of rows written. The caller commits and reports the
+    change (`notify_model_change`) once committed.
+    """
+    table = MachineOperationPlan.__table__
+    values = [{**plan_values(plan), "cad_feature_cache_id": job_id} for plan in plans]
+    await conn.execute(delete(table).where(table.c.cad_feature_cache_id == job_id))
+    if values:
+        await conn.execute(insert(table), values)
+    return len(values)
+
+
+async def write_plan_diff(
+    conn: AsyncConnection,
+    job_id: int,
+    current: Sequence[Mapping[str, Any]],
+    plans: Iterable[Any],
+) -> Dict[str, int]:
+    """
+    Bring a job's plan rows from `current` (as `load_job_plans` returns
+    them) to `plans` with as few row writes as possible.
+
+    A row whose setup name and operations reappear keeps its id and is only
+    touched if its sequence moved; remaining rows are reused in order for
+    the remaining plans, then the surplus is inserted or deleted. Returns
+    the number of rows inserted, updated, deleted and left unchanged.
+    """
+    table = MachineOperationPlan.__table__
+    plans = [plan_values(plan) for plan in plans]
+
+    def content(values: Mapping[str, Any]) -> tuple:
+        return (values["setup_name"], content_hash(values["operations"]))
+
+    unused: Dict[tuple, List[Mapping[str, Any]]] = {}
+    for row in current:
+        unused.setdefault(content(row), []).append(row)
+
+    pairs = []
+    unmatched = []
+    for plan in plans:
+        same = unused.get(content(plan))
+        if same:
+            pairs.append((same.pop(0), plan))
+        else:
+            unmatched.append(plan)
+    leftover = sorted(
+        (row for rows in unused.values() for row in rows), key=lambda row: row["sequence"]
+    )
+    pairs.extend(zip(leftover, unmatched))
+    inserts = unmatched[len(leftover):]
+    deletes = leftover[len(unmatched):]
+
+    updates = [
+        {"row_id": row["id"], **{f"new_{name}": plan[name] for name in PLAN_FIELDS}}
+        for row, plan in pairs
+        if any(row[name] != plan[name] for name in PLAN_FIELDS)
+    ]
+    if updates:
+        await conn.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(**{name: bindparam(f"new_{name}") for name in PLAN_FIELDS}),
+            updates,
+        )
+    if deletes:
+        await conn.execute(delete(table).where(table.c.id.in_([row["id"] for row in deletes])))
+    if inserts:
+        await conn.execute(
+            insert(table), [{**plan, "cad_feature_cache_id": job_id} for plan in inserts]
+        )
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": len(pairs) - len(updates),
+    }
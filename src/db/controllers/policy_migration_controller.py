@@ -0,0 +1,519 @@
+"""Streaming, resumable migration of legacy policies to the v2 tables."""
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Connection, and_, delete, event, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy_utils import Ltree
+
+from ...config import get_settings
+from ..postgres.connection import get_engine
+from ..postgres.ingest import IngestResult
+from ..postgres.invalidation import notify_model_change
+from ..postgres.models import (
+    DefaultPolicy, DefaultPolicyV2, DisabledDefaultPolicy, IngestCheckpoint,
+    IngestQuarantine, OperationName, PolicyMigrationMap, PolicyOverride,
+    ToolTaxonomy, ToolType, ToolTypeTaxonomyMap, UserDefaultPolicyExclusion,
+    UserPolicy
+)
+
+
+DEFAULTS = "defaults"
+EXCLUSIONS = "exclusions"
+OVERRIDES = "overrides"
+# Exclusions point at migrated defaults, so defaults always go first
+STAGES = (DEFAULTS, EXCLUSIONS, OVERRIDES)
+
+_STAGE_MODELS = {
+    DEFAULTS: (DefaultPolicy, DefaultPolicyV2),
+    EXCLUSIONS: (DisabledDefaultPolicy, UserDefaultPolicyExclusion),
+    OVERRIDES: (PolicyOverride, UserPolicy),
+}
+DUAL_WRITE_JOB = "policy_dual_write"
+
+
+class PolicyMappingError(ValueError):
+    """A legacy policy row cannot be expressed in the v2 tables."""
+
+
+@dataclass
+class PolicyLookups:
+    """Translations for one batch of legacy rows, loaded in bulk."""
+
+    # lower-cased operation name or code -> operation id
+    operations: Dict[str, int]
+    # tool type id -> tool taxonomy code
+    taxonomy_codes: Dict[int, str]
+    # legacy policy_id string -> migrated default_policy_v2 id
+    default_ids: Dict[str, int]
+
+    @classmethod
+    def load(cls, conn: Connection, stage: str, rows: Sequence[Any]) -> "PolicyLookups":
+        if stage == EXCLUSIONS:
+            default_ids = conn.execute(
+                select(DefaultPolicy.policy_id, PolicyMigrationMap.v2_id)
+                .join(PolicyMigrationMap, and_(
+                    PolicyMigrationMap.legacy_table == DefaultPolicy.__tablename__,
+                    PolicyMigrationMap.legacy_id == DefaultPolicy.id,
+                ))
+                .where(DefaultPolicy.policy_id.in_({row.policy_id for row in rows}))
+            )
+            return cls(operations={}, taxonomy_codes={}, default_ids=dict(default_ids.all()))
+
+        names = {row.operation.strip().lower() for row in rows}
+        tool_type_ids = {row.tool_type_id for row in rows}
+        operations = conn.execute(
+            select(
+                OperationName.id,
+                func.lower(OperationName.name),
+                func.lower(OperationName.code),
+            ).where(or_(
+                func.lower(OperationName.name).in_(names),
+                func.lower(OperationName.code).in_(names),
+            ))
+        ).all()
+        mapped_codes = conn.execute(
+            select(ToolTypeTaxonomyMap.tool_type_id, ToolTypeTaxonomyMap.tool_taxonomy_code)
+            .where(ToolTypeTaxonomyMap.tool_type_id.in_(tool_type_ids))
+        ).all()
+        unmapped = tool_type_ids - {tool_type_id for tool_type_id, _ in mapped_codes}
+        named_codes = conn.execute(
+            select(ToolType.id, ToolTaxonomy.code)
+            .join(ToolTaxonomy, func.lower(ToolTaxonomy.name) == func.lower(ToolType.name))
+            .where(ToolType.id.in_(unmapped))
+        ).all() if unmapped else []
+
+        by_name: Dict[str, int] = {code: id_ for id_, _, code in operations}
+        # Names win over codes when a string is both
+        by_name.update({name: id_ for id_, name, _ in operations})
+
+        taxonomy_codes: Dict[int, str] = {}
+        candidates: Dict[int, Set[str]] = {}
+        for tool_type_id, code in named_codes:
+            candidates.setdefault(tool_type_id, set()).add(str(code))
+        # A tool type name matching several taxonomy nodes needs a map row
+        for tool_type_id, codes in candidates.items():
+            if len(codes) == 1:
+                taxonomy_codes[tool_type_id] = codes.pop()
+        taxonomy_codes.update({tool_type_id: str(code) for tool_type_id, code in mapped_codes})
+
+        return cls(operations=by_name, taxonomy_codes=taxonomy_codes, default_ids={})
+
+    def operation_id(self, name: str) -> int:
+        try:
+            return self.operations[name.strip().lower()]
+        except KeyError:
+            raise PolicyMappingError(f"unknown operation {name!r}") from None
+
+    def taxonomy_code(self, tool_type_id: int) -> str:
+        try:
+            return self.taxonomy_codes[tool_type_id]
+        except KeyError:
+            raise PolicyMappingError(f"no taxonomy code for tool type {tool_type_id}") from None
+
+    def default_id(self, policy_id: str) -> int:
+        try:
+            return self.default_ids[policy_id]
+        except KeyError:
+            raise PolicyMappingError(f"default policy {policy_id!r} is not migrated") from None
+
+
+def parse_policy_id(row: Any) -> Dict[str, str]:
+    """
+    Recover the feature or surface type suffix of a legacy policy_id.
+
+    policy_id reads `{operation}_{tier}_{tool_type_id}_{material}` with an
+    optional `_{feature_type}` or `__{surface_type}` suffix. The material
+    is the row's `material_category`, which may itself contain `_`
+    (`cast_iron`); without one it is taken as a single word. Ids that do
+    not follow the format yield nothing.
+    """
+    prefix = f"{row.operation}_{row.policy_tier}_{row.tool_type_id}_"
+    if not row.policy_id.startswith(prefix):
+        return {}
+    rest = row.policy_id[len(prefix):]
+    if row.material_category:
+        material = f"{row.material_category}_"
+        if not rest.startswith(material):
+            return {}
+        suffix = rest[len(material):]
+    else:
+        _, _, suffix = rest.partition("_")
+    if suffix.startswith("_") and len(suffix) > 1:
+        return {"surface_type": suffix[1:]}
+    if suffix:
+        return {"feature_type": suffix}
+    return {}
+
+
+def map_row(stage: str, row: Any, lookups: PolicyLookups) -> Dict[str, Any]:
+    """Translate one legacy row into column values of its v2 table."""
+    if stage == EXCLUSIONS:
+        return {
+            "user_id": row.user_id,
+            "default_policy_id": lookups.default_id(row.policy_id),
+            "is_active": True,
+        }
+
+    applies_if: Dict[str, Any] = {}
+    if row.material_category:
+        applies_if["material_category"] = row.material_category
+    if stage == DEFAULTS:
+        applies_if.update(parse_policy_id(row))
+
+    values = {
+        "tier": row.policy_tier,
+        "operation_id": lookups.operation_id(row.operation),
+        "tool_taxonomy_code": Ltree(lookups.taxonomy_code(row.tool_type_id)),
+        "applies_if": applies_if,
+        "constraints": row.constraints,
+        "preferences": {},
+    }
+    if stage == OVERRIDES:
+        values.update(user_id=row.user_id, is_active=True, is_deleted=False)
+    return values
+
+
+def migrate_rows(
+    conn: Connection, stage: str, rows: Sequence[Any], job_name: str
+) -> Tuple[int, int, int]:
+    """
+    Write v2 counterparts of legacy `rows` on `conn`; returns (migrated,
+    quarantined, skipped).
+
+    Rows already present in `policy_migration_map` are skipped, so running
+    this twice over the same rows is harmless. Synchronous so the async
+    migrator (through `run_sync`) and the flush-time dual writer share it.
+    """
+    legacy, v2 = _STAGE_MODELS[stage]
+    done = set(conn.execute(
+        select(PolicyMigrationMap.legacy_id).where(
+            PolicyMigrationMap.legacy_table == legacy.__tablename__,
+            PolicyMigrationMap.legacy_id.in_([row.id for row in rows]),
+        )
+    ).scalars())
+    pending = [row for row in rows if row.id not in done]
+    if not pending:
+        return 0, 0, len(done)
+
+    lookups = PolicyLookups.load(conn, stage, pending)
+    mapped: List[Tuple[Any, Dict[str, Any]]] = []
+    rejected: List[Tuple[Any, str]] = []
+    for row in pending:
+        try:
+            mapped.append((row, map_row(stage, row, lookups)))
+        except PolicyMappingError as exc:
+            rejected.append((row, str(exc)))
+
+    if mapped:
+        if stage == EXCLUSIONS:
+            stmt = insert(v2)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    constraint="uq_user_default_policy_exclusion",
+                    set_={"is_active": True, "updated_at": datetime.now(timezone.utc)},
+                ),
+                [values for _, values in mapped],
+            )
+            pairs = {(values["user_id"], values["default_policy_id"]) for _, values in mapped}
+            ids = dict(((user_id, default_id), id_) for user_id, default_id, id_ in conn.execute(
+                select(v2.user_id, v2.default_policy_id, v2.id)
+                .where(tuple_(v2.user_id, v2.default_policy_id).in_(list(pairs)))
+            ))
+            v2_ids = [ids[(values["user_id"], values["default_policy_id"])] for _, values in mapped]
+        else:
+            # Ids are drawn up front so every legacy row knows its v2 row
+            # without relying on the order of INSERT ... RETURNING
+            sequence = func.pg_get_serial_sequence(v2.__tablename__, "id")
+            v2_ids = conn.execute(
+                select(func.nextval(sequence)).select_from(func.generate_series(1, len(mapped)))
+            ).scalars().all()
+            conn.execute(
+                insert(v2),
+                [{"id": id_, **values} for id_, (_, values) in zip(v2_ids, mapped)],
+            )
+        conn.execute(insert(PolicyMigrationMap).on_conflict_do_nothing(), [
+            {
+                "legacy_table": legacy.__tablename__,
+                "legacy_id": row.id,
+                "v2_table": v2.__tablename__,
+                "v2_id": id_,
+            }
+            for (row, _), id_ in zip(mapped, v2_ids)
+        ])
+
+    if rejected:
+        conn.execute(insert(IngestQuarantine), [
+            {
+                "job_name": job_name,
+                "position": row.id,
+                "payload": _payload(legacy, row),
+                "error": f"PolicyMappingError: {error}",
+            }
+            for row, error in rejected
+        ])
+    return len(mapped), len(rejected), len(done)
+
+
+class PolicyMigrator:
+    """
+    Copy legacy policies into the v2 tables in id-ordered batches.
+
+    Stages run in order: defaults, exclusions, overrides. Each batch is read
+    with keyset pagination and written in one transaction together with its
+    `policy_migration_map` rows and the stage checkpoint, so a restarted
+    migration resumes after the last committed batch. Operation names and
+    tool types are translated with one query each per batch. Rows that
+    cannot be mapped are quarantined; rows already in the map, e.g. created
+    by the dual writer, are skipped. After fixing the cause (a missing
+    operation or `tool_type_taxonomy_map` row), `reset()` and run again to
+    pick up quarantined rows.
+    """
+
+    def __init__(self, bind: Optional[AsyncEngine] = None, batch_size: Optional[int] = None):
+        self.bind = bind
+        self.batch_size = batch_size or get_settings().INGEST_CHUNK_SIZE
+
+    @staticmethod
+    def job_name(stage: str) -> str:
+        return f"policy_migration:{stage}"
+
+    async def run(self, stages: Sequence[str] = STAGES) -> Dict[str, IngestResult]:
+        return {stage: await self.run_stage(stage) for stage in stages}
+
+    async def run_stage(self, stage: str) -> IngestResult:
+        result = IngestResult(self.job_name(stage))
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            checkpoint = (await conn.execute(
+                select(IngestCheckpoint).where(IngestCheckpoint.job_name == result.job_name)
+            )).first()
+        if checkpoint:
+            result.position = checkpoint.position
+            result.committed = checkpoint.rows_committed
+            result.quarantined = checkpoint.rows_quarantined
+
+        while True:
+            async with engine.begin() as conn:
+                if not await conn.run_sync(self._migrate_next_batch, stage, result):
+                    break
+            notify_model_change({_STAGE_MODELS[stage][1]: None})
+            result.chunks += 1
+        return result
+
+    async def reset(self, stages: Sequence[str] = STAGES) -> None:
+        """Forget checkpoints so the next run rescans from the first row."""
+        engine = self.bind or get_engine()
+        async with engine.begin() as conn:
+            await conn.execute(delete(IngestCheckpoint).where(
+                IngestCheckpoint.job_name.in_([self.job_name(stage) for stage in stages])
+            ))
+
+    async def verify(self) -> Dict[str, Dict[str, int]]:
+        """Per stage: legacy rows, rows with a v2 counterpart, open quarantine."""
+        engine = self.bind or get_engine()
+        report: Dict[str, Dict[str, int]] = {}
+        async with engine.connect() as conn:
+            for stage, (legacy, _) in _STAGE_MODELS.items():
+                counts = select(
+                    select(func.count()).select_from(legacy).scalar_subquery(),
+                    select(func.count()).where(
+                        PolicyMigrationMap.legacy_table == legacy.__tablename__
+                    ).scalar_subquery(),
+                    select(func.count()).where(
+                        IngestQuarantine.job_name.in_([self.job_name(stage), DUAL_WRITE_JOB]),
+                        IngestQuarantine.payload["legacy_table"].astext == legacy.__tablename__,
+                        IngestQuarantine.replayed_at.is_(None),
+                    ).scalar_subquery(),
+                )
+                legacy_rows, mapped, quarantined = (await conn.execute(counts)).one()
+                report[stage] = {
+                    "legacy": legacy_rows,
+                    "mapped": mapped,
+                    "quarantined": quarantined,
+                }
+        return report
+
+    def _migrate_next_batch(self, conn: Connection, stage: str, result: IngestResult) -> bool:
+        legacy = _STAGE_MODELS[stage][0].__table__
+        rows = conn.execute(
+            select(legacy)
+            .where(legacy.c.id > result.position)
+            .order_by(legacy.c.id)
+            .limit(self.batch_size)
+        ).all()
+        if not rows:
+            return False
+
+        migrated, quarantined, skipped = migrate_rows(conn, stage, rows, result.job_name)
+        result.committed += migrated
+        result.quarantined += quarantined
+        result.skipped += skipped
+        result.position = rows[-1].id
+
+        stmt = insert(IngestCheckpoint).values(
+            job_name=result.job_name,
+            position=result.position,
+            rows_committed=result.committed,
+            rows_quarantined=result.quarantined,
+        )
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[IngestCheckpoint.job_name],
+            set_={
+                "position": stmt.excluded.position,
+                "rows_committed": stmt.excluded.rows_committed,
+                "rows_quarantined": stmt.excluded.rows_quarantined,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        ))
+        return True
+
+
+def enable_policy_dual_write() -> None:
+    """
+    Mirror every ORM write to the legacy policy tables into the v2 tables.
+
+    The mirrored statements run on the flushing session's connection, so
+    they commit or roll back with the legacy write, and the v2 models they
+    touch are reported to `on_model_change` callbacks on commit. Inserts
+    are migrated like a batch; updates rewrite the mapped v2 row; deletes
+    soft-delete user policies, deactivate exclusions and remove defaults
+    (with the exclusions pointing at them). Rows that cannot be mapped are
+    quarantined under `policy_dual_write` instead of failing the write.
+    """
+    if not event.contains(Session, "after_flush", _mirror_flush):
+        event.listen(Session, "after_flush", _mirror_flush)
+
+
+def configure_policy_dual_write() -> bool:
+    """
+    Enable or disable the dual writer from `POLICY_DUAL_WRITE`; call once at
+    process startup, before the first session flushes. Returns whether it is on.
+    """
+    if get_settings().POLICY_DUAL_WRITE:
+        enable_policy_dual_write()
+        return True
+    disable_policy_dual_write()
+    return False
+
+
+def disable_policy_dual_write() -> None:
+    if event.contains(Session, "after_flush", _mirror_flush):
+        event.remove(Session, "after_flush", _mirror_flush)
+
+
+def _mirror_flush(session: Session, flush_context) -> None:
+    legacy_models = tuple(legacy for legacy, _ in _STAGE_MODELS.values())
+    if not any(
+        isinstance(instance, legacy_models)
+        for instance in (*session.new, *session.dirty, *session.deleted)
+    ):
+        return
+
+    conn = session.connection()
+    for stage in STAGES:
+        legacy, v2 = _STAGE_MODELS[stage]
+        deleted = [obj for obj in session.deleted if isinstance(obj, legacy)]
+        dirty = [
+            obj for obj in session.dirty
+            if isinstance(obj, legacy) and obj not in session.deleted and session.is_modified(obj)
+        ]
+        new = [obj for obj in session.new if isinstance(obj, legacy)]
+
+        if stage == EXCLUSIONS:
+            # An exclusion has no payload of its own: an edit is a move
+            deleted, new = deleted + dirty, new + dirty
+            dirty = []
+        if deleted:
+            _mirror_deletes(conn, stage, deleted)
+        if dirty:
+            _mirror_updates(conn, stage, dirty)
+        if new:
+            migrate_rows(conn, stage, new, DUAL_WRITE_JOB)
+
+        if deleted or dirty or new:
+            # Core writes: report them to the session's commit-time
+            # invalidation without row snapshots
+            changed = session.info.setdefault("changed_models", {})
+            changed[v2] = None
+            if stage == DEFAULTS and deleted:
+                changed[UserDefaultPolicyExclusion] = None
+
+
+def _v2_ids(conn: Connection, legacy: Any, objs: Sequence[Any]) -> Dict[int, int]:
+    return dict(conn.execute(
+        select(PolicyMigrationMap.legacy_id, PolicyMigrationMap.v2_id).where(
+            PolicyMigrationMap.legacy_table == legacy.__tablename__,
+            PolicyMigrationMap.legacy_id.in_([obj.id for obj in objs]),
+        )
+    ).all())
+
+
+def _mirror_updates(conn: Connection, stage: str, objs: Sequence[Any]) -> None:
+    legacy, v2 = _STAGE_MODELS[stage]
+    v2_ids = _v2_ids(conn, legacy, objs)
+    unmigrated = [obj for obj in objs if obj.id not in v2_ids]
+    if unmigrated:
+        migrate_rows(conn, stage, unmigrated, DUAL_WRITE_JOB)
+
+    migrated = [obj for obj in objs if obj.id in v2_ids]
+    if not migrated:
+        return
+    lookups = PolicyLookups.load(conn, stage, migrated)
+    for obj in migrated:
+        try:
+            values = map_row(stage, obj, lookups)
+        except PolicyMappingError as exc:
+            conn.execute(insert(IngestQuarantine).values(
+                job_name=DUAL_WRITE_JOB,
+                position=obj.id,
+                payload=_payload(legacy, obj),
+                error=f"PolicyMappingError: {exc}",
+            ))
+            continue
+        values.pop("is_active", None)
+        values.pop("is_deleted", None)
+        conn.execute(
+            update(v2).where(v2.id == v2_ids[obj.id])
+            .values(**values, updated_at=datetime.now(timezone.utc))
+        )
+
+
+def _mirror_deletes(conn: Connection, stage: str, objs: Sequence[Any]) -> None:
+    legacy, v2 = _STAGE_MODELS[stage]
+    v2_ids = list(_v2_ids(conn, legacy, objs).values())
+    if not v2_ids:
+        return
+
+    now = datetime.now(timezone.utc)
+    if stage == OVERRIDES:
+        conn.execute(update(v2).where(v2.id.in_(v2_ids)).values(is_deleted=True, updated_at=now))
+    elif stage == EXCLUSIONS:
+        conn.execute(update(v2).where(v2.id.in_(v2_ids)).values(is_active=False, updated_at=now))
+    else:
+        exclusion_ids = select(UserDefaultPolicyExclusion.id).where(
+            UserDefaultPolicyExclusion.default_policy_id.in_(v2_ids)
+        )
+        conn.execute(delete(PolicyMigrationMap).where(
+            PolicyMigrationMap.v2_table == UserDefaultPolicyExclusion.__tablename__,
+            PolicyMigrationMap.v2_id.in_(exclusion_ids),
+        ))
+        conn.execute(delete(UserDefaultPolicyExclusion).where(
+            UserDefaultPolicyExclusion.default_policy_id.in_(v2_ids)
+        ))
+        conn.execute(delete(v2).where(v2.id.in_(v2_ids)))
+
+    conn.execute(delete(PolicyMigrationMap).where(
+        PolicyMigrationMap.legacy_table == legacy.__tablename__,
+        PolicyMigrationMap.legacy_id.in_([obj.id for obj in objs]),
+    ))
+
+
+def _payload(legacy: Any, row: Any) -> Dict[str, Any]:
+    values = {column.name: getattr(row, column.name) for column in legacy.__table__.columns}
+    values["legacy_table"] = legacy.__tablename__
+    return json.loads(json.dumps(values, default=str))
@@ -0,0 +1,232 @@
+"""Change detection for re-ingesting scraped rows."""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from ..postgres.models import Base, SpeedAndFeed, Tool
+from ...utils import content_hash, normalize_value
+
+
+BATCH_SIZE = 1000
+
+# Bookkeeping columns that never take part in change detection
+IGNORED_COLUMNS = ("id", "created_at", "updated_at")
+
+
+@dataclass(frozen=True)
+class SyncSpec:
+    """How rows of one model are matched between the source and the table."""
+
+    model: Type[Base]
+    # Natural key identifying a row in both the source and the table
+    key_columns: Tuple[str, ...]
+    # Single column used to fetch the stored counterparts of a source batch
+    lookup_column: str
+
+    @property
+    def content_columns(self) -> List[str]:
+        return [
+            column.name
+            for column in self.model.__table__.columns
+            if column.name not in IGNORED_COLUMNS
+            and column.name not in self.key_columns
+            and column.computed is None
+        ]
+
+    def key_of(self, row: Dict[str, Any]) -> Tuple:
+        return tuple(normalize_value(row.get(column)) for column in self.key_columns)
+
+
+TOOL_SYNC = SyncSpec(Tool, key_columns=("product_id",), lookup_column="product_id")
+SPEED_AND_FEED_SYNC = SyncSpec(
+    SpeedAndFeed,
+    key_columns=("tool_id", "material", "operation_id", "spindle_speed", "preset_name"),
+    lookup_column="tool_id",
+)
+
+
+@dataclass
+class ChangeSet:
+    """Rows that differ between a source batch and the stored table."""
+
+    spec: SyncSpec
+    inserts: List[Dict[str, Any]] = field(default_factory=list)
+    # (id, changed column -> (stored value, new value))
+    updates: List[Tuple[int, Dict[str, Tuple[Any, Any]]]] = field(default_factory=list)
+    deletes: List[Tuple[int, Tuple]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.inserts or self.updates or self.deletes)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "inserts": len(self.inserts),
+            "updates": len(self.updates),
+            "deletes": len(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+    def print_diff(self) -> None:
+        """Print the change set in a human readable form."""
+        table = self.spec.model.__tablename__
+        print(f"{table}: {self.summary()}")
+        for row in self.inserts:
+            print(f"  + {self.spec.key_of(row)}")
+        for id_, changes in self.updates:
+            print(f"  ~ id={id_}")
+            for column, (old, new) in changes.items():
+                print(f"      {column}: {old!r} -> {new!r}")
+        for id_, key in self.deletes:
+            print(f"  - id={id_} {key}")
+
+
+async def detect_changes(
+    session: AsyncSession,
+    spec: SyncSpec,
+    rows: Iterable[Dict[str, Any]],
+    delete_missing: bool = False,
+    scope: Optional[ColumnElement[bool]] = None,
+) -> ChangeSet:
+    """
+    Compare source rows against the table and return only what changed.
+
+    Each row is compared through a content hash of its normalized values,
+    restricted to the columns the source actually provides, so a source that
+    omits a column never blanks it out. Stored rows are fetched by the spec's
+    lookup column, or by `scope` when given. With `delete_missing`, stored
+    rows in that set whose key is absent from the source are reported as
+    deletes; pass a `scope` (e.g. `Tool.vendor_id == vendor_id`) when the
+    lookup column alone cannot tell which rows the source covers.
+    """
+    content_columns = spec.content_columns
+
+    source: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        # Later duplicates of a key win, as they would in a sequential reload
+        source[spec.key_of(row)] = row
+
+    stored = await _load_stored(session, spec, source, scope)
+
+    changes = ChangeSet(spec)
+    for key, row in source.items():
+        current = stored.get(key)
+        if current is None:
+            changes.inserts.append(row)
+            continue
+
+        columns = [column for column in content_columns if column in row]
+        new_values = {column: row[column] for column in columns}
+        old_values = {column: current[column] for column in columns}
+        if content_hash(new_values) == content_hash(old_values):
+            changes.unchanged += 1
+            continue
+
+        diff = {
+            column: (old_values[column], new_values[column])
+            for column in columns
+            if normalize_value(old_values[column]) != normalize_value(new_values[column])
+        }
+        changes.updates.append((current["id"], diff))
+
+    if delete_missing:
+        changes.deletes = [
+            (current["id"], key) for key, current in stored.items() if key not in source
+        ]
+
+    return changes
+
+
+async def apply_changes(session: AsyncSession, changes: ChangeSet) -> None:
+    """Write a change set: multi-row inserts, executemany updates, batched deletes."""
+    table = changes.spec.model.__table__
+    conn = await session.connection()
+    now = datetime.now(timezone.utc)
+
+    # executemany needs one shape for every row; unknown keys are dropped
+    insert_columns = sorted(
+        {key for row in changes.inserts for key in row} & set(table.c.keys())
+    )
+    inserts = [{column: row.get(column) for column in insert_columns} for row in changes.inserts]
+    for start in range(0, len(inserts), BATCH_SIZE):
+        await conn.execute(insert(table), inserts[start:start + BATCH_SIZE])
+
+    # Rows changing the same columns share one executemany statement
+    grouped: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for id_, diff in changes.updates:
+        params = {f"new_{column}": new for column, (_, new) in diff.items()}
+        params["row_id"] = id_
+        grouped.setdefault(tuple(sorted(diff)), []).append(params)
+    for columns, params in grouped.items():
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values({column: bindparam(f"new_{column}") for column in columns})
+            .values(updated_at=now)
+        )
+        await conn.execute(stmt, params)
+
+    ids = [id_ for id_, _ in changes.deletes]
+    for start in range(0, len(ids), BATCH_SIZE):
+        await conn.execute(delete(table).where(table.c.id.in_(ids[start:start + BATCH_SIZE])))
+
+
+async def sync_rows(
+    session: AsyncSession,
+    spec: SyncSpec,
+    rows: Iterable[Dict[str, Any]],
+    delete_missing: bool = False,
+    scope: Optional[ColumnElement[bool]] = None,
+    dry_run: bool = False,
+) -> ChangeSet:
+    """Detect changes for a source batch and write them unless `dry_run` is set."""
+    changes = await detect_changes(session, spec, rows, delete_missing, scope)
+    if dry_run:
+        changes.print_diff()
+    elif not changes.is_empty:
+        await apply_changes(session, changes)
+    return changes
+
+
+async def sync_tools(session: AsyncSession, rows: Iterable[Dict[str, Any]], **kwargs) -> ChangeSet:
+    """Load scraped `Tool` rows, writing only new or changed ones."""
+    return await sync_rows(session, TOOL_SYNC, rows, **kwargs)
+
+
+async def sync_speed_and_feeds(
+    session: AsyncSession, rows: Iterable[Dict[str, Any]], **kwargs
+) -> ChangeSet:
+    """Load scraped `SpeedAndFeed` rows, writing only new or changed ones."""
+    return await sync_rows(session, SPEED_AND_FEED_SYNC, rows, **kwargs)
+
+
+async def _load_stored(
+    session: AsyncSession,
+    spec: SyncSpec,
+    source: Dict[Tuple, Dict[str, Any]],
+    scope: Optional[ColumnElement[bool]],
+) -> Dict[Tuple, Dict[str, Any]]:
+    table = spec.model.__table__
+    columns = [table.c.id, *(table.c[name] for name in spec.key_columns)]
+    columns += [table.c[name] for name in spec.content_columns]
+
+    if scope is not None:
+        result = await session.execute(select(*columns).where(scope))
+        return {spec.key_of(row): row for row in map(dict, result.mappings())}
+
+    lookup_index = spec.key_columns.index(spec.lookup_column)
+    lookups = sorted({key[lookup_index] for key in source if key[lookup_index] is not None})
+    stored: Dict[Tuple, Dict[str, Any]] = {}
+    for start in range(0, len(lookups), BATCH_SIZE):
+        stmt = select(*columns).where(
+            table.c[spec.lookup_column].in_(lookups[start:start + BATCH_SIZE])
+        )
+        result = await session.execute(stmt)
+        for row in map(dict, result.mappings()):
+            stored[spec.key_of(row)] = row
+    return stored
@@ -1,7 +1,62 @@
-from .connection import check_db, close_db, get_db
+from typing import TYPE_CHECKING
+
+from ...utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .connection import (
+        check_db, close_db, get_db, get_engine, get_pool_monitor, get_pool_stats,
+        get_read_db, get_replica_engine, get_session_factory, pool_monitor
+    )
+    from .bulk import BulkSession, bulk_session
+    from .ingest import ChunkedIngest, IngestResult, ingest_session
+    from .pool import AdaptivePoolSizer, PoolMonitor
+    from .routing import ReplicaRouter, RoutingSession
+    from .schema import SCHEMA_CHANGES, apply_schema_changes
 
 __all__ = [
+    "AdaptivePoolSizer",
+    "BulkSession",
+    "ChunkedIngest",
+    "IngestResult",
+    "PoolMonitor",
+    "ReplicaRouter",
+    "RoutingSession",
+    "SCHEMA_CHANGES",
+    "apply_schema_changes",
+    "bulk_session",
     "check_db",
     "close_db", 
     "get_db",
+    "get_engine",
+    "get_pool_monitor",
+    "get_pool_stats",
+    "get_read_db",
+    "get_replica_engine",
+    "get_session_factory",
+    "ingest_session",
+    "pool_monitor",
 ]
+
+__getattr__ = lazy_exports(__name__, {
+    "AdaptivePoolSizer": ".pool",
+    "BulkSession": ".bulk",
+    "ChunkedIngest": ".ingest",
+    "IngestResult": ".ingest",
+    "PoolMonitor": ".pool",
+    "ReplicaRouter": ".routing",
+    "RoutingSession": ".routing",
+    "SCHEMA_CHANGES": ".schema",
+    "apply_schema_changes": ".schema",
+    "bulk_session": ".bulk",
+    "check_db": ".connection",
+    "close_db": ".connection",
+    "get_db": ".connection",
+    "get_engine": ".connection",
+    "get_pool_monitor": ".connection",
+    "get_pool_stats": ".connection",
+    "get_read_db": ".connection",
+    "get_replica_engine": ".connection",
+    "get_session_factory": ".connection",
+    "ingest_session": ".ingest",
+    "pool_monitor": ".connection",
+})
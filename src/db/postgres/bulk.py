@@ -0,0 +1,215 @@
+"""Core-level bulk ingest sessions without ORM unit-of-work overhead."""
+import json
+from contextlib import asynccontextmanager
+from typing import (
+    Any, AsyncGenerator, Callable, Dict, Iterable, List, Optional, Sequence,
+    Tuple, Union
+)
+
+from sqlalchemy import ARRAY, JSON, Column, Table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from .connection import get_engine
+
+
+Row = Union[Dict[str, Any], Sequence[Any]]
+
+# Rows handed to the driver per execute, counted in bind parameters
+MAX_BIND_PARAMS = 30000
+
+
+class BulkSession:
+    """
+    Write plain dicts or tuples straight through a Core connection.
+
+    There is no identity map, no autoflush and no relationship cascade:
+    rows never become mapped instances. Table metadata is still honoured.
+    Python-side column defaults are filled in, NOT NULL columns without any
+    default are checked before anything is sent, and the database enforces
+    every constraint as usual.
+
+    Tuples are read in the order of `columns`, or of `insertable_columns()`
+    when no columns are given.
+    """
+
+    def __init__(self, conn: AsyncConnection):
+        self.conn = conn
+
+    @staticmethod
+    def table_of(target: Any) -> Table:
+        return target if isinstance(target, Table) else target.__table__
+
+    @classmethod
+    def insertable_columns(cls, target: Any) -> List[str]:
+        """Columns a row may provide: everything but generated ones."""
+        table = cls.table_of(target)
+        return [
+            column.name
+            for column in table.columns
+            if column.computed is None
+            and not (column.primary_key and column.autoincrement is True)
+        ]
+
+    def prepare(
+        self,
+        target: Any,
+        rows: Iterable[Row],
+        columns: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[str], List[tuple]]:
+        """
+        Normalize rows into tuples over a single column list.
+
+        Columns that no row provides but that carry a Python-side default are
+        added and filled; columns with a server default are left to the
+        database.
+        """
+        table = self.table_of(target)
+        rows = list(rows)
+        if columns is None:
+            if rows and isinstance(rows[0], dict):
+                provided = set().union(*(row.keys() for row in rows))
+                columns = [name for name in self.insertable_columns(table) if name in provided]
+                unknown = provided - set(table.c.keys())
+                if unknown:
+                    raise ValueError(f"{table.name}: unknown columns {sorted(unknown)}")
+            else:
+                columns = self.insertable_columns(table)
+        columns = list(columns)
+
+        defaults: Dict[str, Callable[[], Any]] = {}
+        for column in table.columns:
+            if column.name in columns or column.computed is not None:
+                continue
+            if column.default is not None and (column.default.is_scalar or column.default.is_callable):
+                defaults[column.name] = _default_factory(column)
+            elif _required(column):
+                raise ValueError(f"{table.name}.{column.name} is NOT NULL and has no default")
+
+        all_columns = columns + list(defaults)
+        required = [i for i, name in enumerate(columns) if _required(table.c[name])]
+
+        prepared: List[tuple] = []
+        for row in rows:
+            values = (
+                [row.get(name) for name in columns]
+                if isinstance(row, dict) else list(row)
+            )
+            if len(values) != len(columns):
+                raise ValueError(f"{table.name}: expected {len(columns)} values, got {len(values)}")
+            for i in required:
+                if values[i] is None:
+                    raise ValueError(f"{table.name}.{columns[i]} is NOT NULL: {row!r}")
+            values.extend(factory() for factory in defaults.values())
+            prepared.append(tuple(values))
+        return all_columns, prepared
+
+    async def insert(
+        self,
+        target: Any,
+        rows: Iterable[Row],
+        columns: Optional[Sequence[str]] = None,
+        on_conflict_do_nothing: bool = False,
+    ) -> int:
+        """Insert rows as batched multi-row INSERTs; returns rows sent."""
+        table = self.table_of(target)
+        names, prepared = self.prepare(table, rows, columns)
+        if not prepared:
+            return 0
+
+        # One cached statement executed with a parameter list; SQLAlchemy
+        # expands it into multi-row VALUES pages ("insertmanyvalues"), so no
+        # huge per-batch statement has to be compiled.
+        stmt = insert(table)
+        if on_conflict_do_nothing:
+            stmt = stmt.on_conflict_do_nothing()
+        batch_size = max(1, MAX_BIND_PARAMS // len(names))
+        for start in range(0, len(prepared), batch_size):
+            batch = prepared[start:start + batch_size]
+            await self.conn.execute(stmt, [dict(zip(names, values)) for values in batch])
+        return len(prepared)
+
+    async def copy(
+        self,
+        target: Any,
+        rows: Iterable[Row],
+        columns: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Stream rows with binary COPY in one round trip; returns rows copied.
+
+        Requires the asyncpg driver. JSON/JSONB values (including arrays of
+        them) are serialized here, since asyncpg expects them as text.
+        """
+        table = self.table_of(target)
+        names, prepared = self.prepare(table, rows, columns)
+        if not prepared:
+            return 0
+
+        encoders = [_copy_encoder(table.c[name]) for name in names]
+        if any(encoders):
+            prepared = [
+                tuple(
+                    encode(value) if encode and value is not None else value
+                    for encode, value in zip(encoders, values)
+                )
+                for values in prepared
+            ]
+
+        raw = await self.conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=prepared,
+            columns=names,
+            schema_name=table.schema,
+        )
+        return len(prepared)
+
+    async def execute(self, statement: Any, params: Optional[List[Dict[str, Any]]] = None):
+        """Run any Core statement (executemany when `params` is a list)."""
+        return await self.conn.execute(statement, params)
+
+
+@asynccontextmanager
+async def bulk_session(
+    engine: Optional[AsyncEngine] = None,
+    synchronous_commit: bool = True,
+) -> AsyncGenerator[BulkSession, None]:
+    """
+    Open a bulk ingest session on its own connection and transaction.
+
+    The transaction commits when the block exits cleanly and rolls back on
+    error. `synchronous_commit=False` sets it for this transaction only,
+    trading the durability of the last commit on a crash for faster loads.
+    """
+    engine = engine or get_engine()
+    async with engine.begin() as conn:
+        if not synchronous_commit:
+            await conn.execute(text("SET LOCAL synchronous_commit TO OFF"))
+        yield BulkSession(conn)
+
+
+def _required(column: Column) -> bool:
+    return (
+        not column.nullable
+        and column.default is None
+        and column.server_default is None
+        and not (column.primary_key and column.autoincrement is True)
+    )
+
+
+def _default_factory(column: Column) -> Callable[[], Any]:
+    default = column.default
+    if default.is_scalar:
+        return lambda: default.arg
+    # SQLAlchemy wraps plain callables to take an execution context
+    return lambda: default.arg(None)
+
+
+def _copy_encoder(column: Column) -> Optional[Callable[[Any], Any]]:
+    column_type = column.type
+    if isinstance(column_type, JSON):
+        return json.dumps
+    if isinstance(column_type, ARRAY) and isinstance(column_type.item_type, JSON):
+        return lambda values: [None if v is None else json.dumps(v) for v in values]
+    return None
@@ -1,6 +1,6 @@
 """PostgreSQL database connection and session management."""
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, Optional
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
@@ -8,29 +8,132 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy.orm import sessionmaker
 
-from ...config import settings
+from ...config import get_settings
+from .pool import AdaptivePoolSizer, PoolMonitor
+from .routing import ReplicaRouter, make_routing_session_class
 
 
-# Create async engine
-postgres_engine: AsyncEngine = create_async_engine(
-    settings.postgres_async_url,
-    pool_size=settings.POSTGRES_POOL_SIZE,
-    max_overflow=settings.POSTGRES_MAX_OVERFLOW,
-    echo=settings.POSTGRES_ECHO,
-)
+# Engines and the session factory are built on first use, not at import, so
+# processes that never touch the database skip the cost (and the settings).
+_postgres_engine: Optional[AsyncEngine] = None
+_postgres_replica_engine: Optional[AsyncEngine] = None
+_replica_router: Optional[ReplicaRouter] = None
+_session_factory: Optional[sessionmaker] = None
+_pool_monitor: Optional[PoolMonitor] = None
+_replica_pool_monitor: Optional[PoolMonitor] = None
+
+
+def get_pool_monitor(replica: bool = False) -> PoolMonitor:
+    """Pool telemetry, optionally resizing the pool from observed checkout waits."""
+    global _pool_monitor, _replica_pool_monitor
+    if replica:
+        if _replica_pool_monitor is None:
+            _replica_pool_monitor = PoolMonitor()
+        return _replica_pool_monitor
+
+    if _pool_monitor is None:
+        settings = get_settings()
+        _pool_monitor = PoolMonitor(
+            sizer=AdaptivePoolSizer(
+                min_overflow=settings.POSTGRES_MAX_OVERFLOW,
+                max_size=settings.POSTGRES_POOL_MAX_SIZE,
+                grow_wait_ms=settings.POSTGRES_POOL_GROW_WAIT_MS,
+                shrink_wait_ms=settings.POSTGRES_POOL_SHRINK_WAIT_MS,
+            ) if settings.POSTGRES_POOL_ADAPTIVE else None
+        )
+    return _pool_monitor
+
+
+def get_engine() -> AsyncEngine:
+    """Return the primary async engine, creating it on first use."""
+    global _postgres_engine
+    if _postgres_engine is None:
+        settings = get_settings()
+        monitor = get_pool_monitor()
+        _postgres_engine = create_async_engine(
+            settings.postgres_async_url,
+            poolclass=monitor.pool_class,
+            pool_size=settings.POSTGRES_POOL_SIZE,
+            max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+            pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
+            echo=settings.POSTGRES_ECHO,
+        )
+        monitor.attach(_postgres_engine)
+    return _postgres_engine
+
+
+def get_replica_engine() -> Optional[AsyncEngine]:
+    """Return the read replica engine, or None when no replica is configured."""
+    global _postgres_replica_engine
+    settings = get_settings()
+    if _postgres_replica_engine is None and settings.postgres_replica_async_url:
+        monitor = get_pool_monitor(replica=True)
+        _postgres_replica_engine = create_async_engine(
+            settings.postgres_replica_async_url,
+            poolclass=monitor.pool_class,
+            pool_size=settings.POSTGRES_REPLICA_POOL_SIZE,
+            max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+            pool_timeout=settings.POSTGRES_POOL_TIMEOUT,
+            echo=settings.POSTGRES_ECHO,
+        )
+        monitor.attach(_postgres_replica_engine)
+    return _postgres_replica_engine
+
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    """Return the primary/replica router, or None when no replica is configured."""
+    global _replica_router
+    if _replica_router is None:
+        replica = get_replica_engine()
+        if replica is not None:
+            _replica_router = ReplicaRouter(
+                get_engine().sync_engine,
+                replica.sync_engine,
+                lag_check_interval=get_settings().POSTGRES_REPLICA_LAG_CHECK_INTERVAL,
+            )
+    return _replica_router
+
+
+def get_session_factory() -> sessionmaker:
+    """Return the async session factory; with a replica, reads are routed to it."""
+    global _session_factory
+    if _session_factory is None:
+        router = get_replica_router()
+        if router is not None:
+            _session_factory = sessionmaker(
+                class_=AsyncSession,
+                sync_session_class=make_routing_session_class(router),
+                expire_on_commit=False,
+            )
+        else:
+            _session_factory = sessionmaker(
+                bind=get_engine(),
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+    return _session_factory
 
-# Create async session factory
-AsyncSessionLocal = sessionmaker(
-    bind=postgres_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+_LAZY_ATTRIBUTES = {
+    "postgres_engine": get_engine,
+    "postgres_replica_engine": get_replica_engine,
+    "replica_router": get_replica_router,
+    "AsyncSessionLocal": get_session_factory,
+    "pool_monitor": get_pool_monitor,
+}
+
+
+def __getattr__(name: str):
+    # Backwards compatible module attributes, resolved on first access
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Dependency function for FastAPI
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI dependency for getting database session."""
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
             await session.commit()
@@ -40,20 +143,54 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+# Dependency function for read-only work
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency for read-only work such as catalog and job listings.
+
+    Reads go to the replica once it has caught up with this process's
+    writes. Nothing is committed; the transaction is rolled back on close.
+    """
+    async with get_session_factory()() as session:
+        try:
+            yield session
+        finally:
+            await session.rollback()
+            await session.close()
+
 async def check_db():
-    """Check if the database is connected."""
+    """Check if the database (and the read replica, if configured) is connected."""
+    engines = [get_engine()]
+    if get_replica_engine() is not None:
+        engines.append(get_replica_engine())
     try:
-        async with postgres_engine.connect() as conn:
-            await conn.execute(text("SELECT 1"))
+        for engine in engines:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         print(f"Database connection failed: {e}")
         return False
 
+def get_pool_stats(replica: bool = False) -> Dict:
+    """Checked-out count, checkout waits, timeouts and connection ages."""
+    if replica:
+        engine, router = get_replica_engine(), get_replica_router()
+        if engine is None:
+            return {}
+        stats = get_pool_monitor(replica=True).stats(engine.sync_engine.pool)
+        stats["replica_reads"] = router.replica_reads
+        stats["primary_reads"] = router.primary_reads
+        return stats
+    return get_pool_monitor().stats(get_engine().sync_engine.pool)
+
 # Close database connections
 async def close_db():
     """
     Close database connections.
     Call this on application shutdown.
     """
-    await postgres_engine.dispose()
\ No newline at end of file
+    if _postgres_engine is not None:
+        await _postgres_engine.dispose()
+    if _postgres_replica_engine is not None:
+        await _postgres_replica_engine.dispose()
\ No newline at end of file
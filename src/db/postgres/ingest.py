@@ -0,0 +1,221 @@
+"""Chunked, resumable ingest sessions with per-row failure isolation."""
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import (
+    Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Iterable, List,
+    Optional, Union
+)
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...config import get_settings
+from .connection import get_session_factory
+from .models import IngestCheckpoint, IngestQuarantine
+
+
+RowHandler = Callable[[AsyncSession, Any], Awaitable[None]]
+
+
+@dataclass
+class IngestResult:
+    """Counters of one chunked ingest run."""
+
+    job_name: str
+    position: int = -1
+    committed: int = 0
+    quarantined: int = 0
+    skipped: int = 0
+    chunks: int = 0
+
+
+class ChunkedIngest:
+    """
+    Bulk-ingest mode for a session: commit every N rows instead of once.
+
+    Each row is handled inside its own SAVEPOINT. A row whose handler raises
+    is rolled back alone and written to `ingest_quarantine` with its error,
+    and the rest of the chunk carries on. Every commit also upserts the
+    job's `ingest_checkpoint`, so a crashed or restarted run resumes after
+    the last committed chunk instead of starting over.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        job_name: str,
+        chunk_size: Optional[int] = None,
+    ):
+        self.session = session
+        self.job_name = job_name
+        self.chunk_size = chunk_size or get_settings().INGEST_CHUNK_SIZE
+        self._rejected: List[IngestQuarantine] = []
+        self._pending = 0
+
+    async def run(
+        self,
+        rows: Union[Iterable[Any], AsyncIterable[Any]],
+        handler: RowHandler,
+    ) -> IngestResult:
+        """
+        Feed every row to `handler(session, row)` and commit in chunks.
+
+        Rows are numbered by their position in `rows`, which must therefore
+        yield the same sequence when a run is resumed.
+        """
+        result = IngestResult(self.job_name)
+        checkpoint = await self.session.get(IngestCheckpoint, self.job_name)
+        resume_after = checkpoint.position if checkpoint else -1
+        if checkpoint:
+            result.committed = checkpoint.rows_committed
+            result.quarantined = checkpoint.rows_quarantined
+
+        position = -1
+        async for row in _aiter(rows):
+            position += 1
+            if position <= resume_after:
+                result.skipped += 1
+                continue
+
+            await self._handle(row, position, handler, result)
+            if self._pending >= self.chunk_size:
+                await self._commit(position, result)
+
+        if self._pending or self._rejected:
+            await self._commit(position, result)
+        result.position = max(position, resume_after)
+        return result
+
+    async def reset(self) -> None:
+        """Drop the checkpoint so the next run starts from the first row."""
+        await self.session.execute(
+            delete(IngestCheckpoint).where(IngestCheckpoint.job_name == self.job_name)
+        )
+        await self.session.commit()
+
+    async def replay(self, handler: RowHandler) -> IngestResult:
+        """
+        Re-run quarantined rows of this job through `handler`.
+
+        Rows that now succeed are marked as replayed; rows that fail again
+        keep their quarantine entry with the new error.
+        """
+        result = IngestResult(self.job_name)
+        entries = (
+            await self.session.execute(
+                select(IngestQuarantine)
+                .where(
+                    IngestQuarantine.job_name == self.job_name,
+                    IngestQuarantine.replayed_at.is_(None),
+                )
+                .order_by(IngestQuarantine.position)
+            )
+        ).scalars().all()
+
+        for entry in entries:
+            try:
+                async with self.session.begin_nested():
+                    await handler(self.session, entry.payload)
+            except Exception as exc:
+                entry.error = _describe(exc)
+                result.quarantined += 1
+            else:
+                entry.replayed_at = datetime.now(timezone.utc)
+                result.committed += 1
+
+            self._pending += 1
+            if self._pending >= self.chunk_size:
+                await self.session.commit()
+                self._pending = 0
+                result.chunks += 1
+
+        await self.session.commit()
+        self._pending = 0
+        return result
+
+    async def _handle(
+        self, row: Any, position: int, handler: RowHandler, result: IngestResult
+    ) -> None:
+        try:
+            async with self.session.begin_nested():
+                await handler(self.session, row)
+        except Exception as exc:
+            self._rejected.append(
+                IngestQuarantine(
+                    job_name=self.job_name,
+                    position=position,
+                    payload=_to_payload(row),
+                    error=_describe(exc),
+                )
+            )
+            result.quarantined += 1
+        else:
+            result.committed += 1
+        self._pending += 1
+
+    async def _commit(self, position: int, result: IngestResult) -> None:
+        self.session.add_all(self._rejected)
+        stmt = insert(IngestCheckpoint).values(
+            job_name=self.job_name,
+            position=position,
+            rows_committed=result.committed,
+            rows_quarantined=result.quarantined,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IngestCheckpoint.job_name],
+            set_={
+                "position": stmt.excluded.position,
+                "rows_committed": stmt.excluded.rows_committed,
+                "rows_quarantined": stmt.excluded.rows_quarantined,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+        self._rejected = []
+        self._pending = 0
+        result.chunks += 1
+
+
+@asynccontextmanager
+async def ingest_session(
+    job_name: str, chunk_size: Optional[int] = None
+) -> AsyncGenerator[ChunkedIngest, None]:
+    """
+    Open a session in chunked ingest mode.
+
+    Unlike `get_db()`, an exception only rolls back the chunk in progress;
+    every chunk committed before it, and its checkpoint, is kept.
+    """
+    async with get_session_factory()() as session:
+        try:
+            yield ChunkedIngest(session, job_name, chunk_size)
+        except Exception:
+            await session.rollback()
+            raise
+
+
+async def _aiter(rows: Union[Iterable[Any], AsyncIterable[Any]]):
+    if hasattr(rows, "__aiter__"):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+def _to_payload(row: Any) -> dict:
+    """Make a source row storable as JSONB, whatever its shape."""
+    if hasattr(row, "_asdict"):
+        row = row._asdict()
+    elif not isinstance(row, dict):
+        row = {"value": row}
+    return json.loads(json.dumps(row, default=str))
+
+
+def _describe(exc: Exception) -> str:
+    return f"{type(exc).__name__}: {exc}"
@@ -0,0 +1,231 @@
+"""Change notifications and fingerprint checks for caches built from model tables."""
+import asyncio
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional,
+    Type, TypeVar
+)
+
+from sqlalchemy import (
+    ColumnElement, Select, Table, event, func, inspect, literal, literal_column,
+    select
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm import Session
+
+from .connection import get_engine
+from .models import Base
+
+
+# Changed models mapped to snapshots of the changed rows' column values, or
+# to None when a statement changed rows that cannot be listed
+Changes = Dict[Type[Base], Optional[List[Dict]]]
+ChangeCallback = Callable[[Changes], None]
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_callbacks: Dict[Type[Base], List[ChangeCallback]] = {}
+_installed = False
+
+
+def on_model_change(models: Iterable[Type[Base]], callback: ChangeCallback) -> None:
+    """
+    Call `callback(changes)` after a commit that wrote to `models`.
+
+    Covers ORM flushes and ORM-enabled `insert()`/`update()`/`delete()`
+    statements run through any session of this process. Flushed rows are
+    reported with their values before and after the change, so a cache can
+    drop just the entries they affect. Core statements on a bare
+    connection are only seen when their writer calls
+    `notify_model_change`; writes from other processes are never seen, so
+    a cache relying on this still needs a fallback such as a TTL check.
+    """
+    global _installed
+    for model in models:
+        _callbacks.setdefault(model, []).append(callback)
+    if not _installed:
+        event.listen(Session, "after_flush", _record_flush)
+        event.listen(Session, "do_orm_execute", _record_statement)
+        event.listen(Session, "after_commit", _notify)
+        event.listen(Session, "after_rollback", _discard)
+        _installed = True
+
+
+def notify_model_change(changes: Changes) -> None:
+    """Report committed Core writes to the callbacks of the changed models."""
+    callbacks = {cb for model in changes for cb in _callbacks.get(model, [])}
+    for callback in callbacks:
+        callback(changes)
+
+
+def fingerprint_query(
+    table: Table, columns: Iterable[ColumnElement], *criteria: ColumnElement
+) -> Select:
+    """
+    SELECT a cheap content fingerprint of the rows matching `criteria`.
+
+    The fingerprint is the row count plus an md5 over `columns` in primary
+    key order. Comparing it against the one a cache was built from catches
+    writes made by other processes.
+    """
+    row_text = func.concat_ws(literal("|"), *columns)
+    order = list(table.primary_key.columns)
+    return select(
+        func.concat(
+            func.count(),
+            literal(":"),
+            func.md5(func.string_agg(
+                row_text, aggregate_order_by(literal_column("','"), *order)
+            )),
+        )
+    ).select_from(table).where(*criteria)
+
+
+def checksum_query(
+    table: Table, columns: Iterable[ColumnElement], *criteria: ColumnElement
+) -> Select:
+    """
+    SELECT a fingerprint of the rows matching `criteria` for large tables.
+
+    The row count plus the sum of `hashtext` over `columns`: still one scan,
+    but with no sort and no text built from every row, so it stays cheap
+    in memory at any table size. Weaker than `fingerprint_query` (two
+    changes can cancel out in the sum), which is unlikely enough for a
+    staleness check.
+    """
+    row_text = func.concat_ws(literal("|"), *columns)
+    return select(
+        func.concat(
+            func.count(),
+            literal(":"),
+            func.coalesce(func.sum(func.hashtext(row_text)), 0),
+        )
+    ).select_from(table).where(*criteria)
+
+
+@dataclass
+class _CacheEntry(Generic[V]):
+    value: V
+    fingerprint: tuple
+    checked_at: float
+
+
+class FingerprintCache(Generic[K, V]):
+    """
+    Values built per key from the database, in a bounded LRU.
+
+    `fingerprint(key)` is a SELECT of one row fingerprinting the rows a
+    key's value is built from (`fingerprint_query` or `checksum_query`,
+    several as scalar subqueries), and `build(conn, key)` loads and builds
+    the value on the same connection. A value is re-checked at most every
+    `ttl` seconds and rebuilt only when its fingerprint changed, which
+    catches writes from other processes. Owners call `invalidate` from
+    their `on_model_change` callbacks for commits in this process; a load
+    that an invalidation overtakes serves its caller but is not cached.
+    """
+
+    def __init__(
+        self,
+        fingerprint: Callable[[K], Select],
+        build: Callable[[AsyncConnection, K], Awaitable[V]],
+        max_entries: int = 256,
+        ttl: float = 30.0,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.fingerprint = fingerprint
+        self.build = build
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bind = bind
+        self._entries: "OrderedDict[K, _CacheEntry[V]]" = OrderedDict()
+        # Key -> generation of the load in flight, bumped by invalidation
+        self._loading: Dict[K, int] = {}
+        self._lock = asyncio.Lock()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: K) -> V:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.checked_at >= self.ttl:
+            async with self._lock:
+                entry = await self._refresh(key)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        return entry.value
+
+    def invalidate(self, key: K) -> None:
+        self._entries.pop(key, None)
+        if key in self._loading:
+            self._loading[key] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for key in self._loading:
+            self._loading[key] += 1
+
+    async def _refresh(self, key: K) -> _CacheEntry[V]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.checked_at < self.ttl:
+            return entry
+        engine = self.bind or get_engine()
+        self._loading[key] = 0
+        try:
+            async with engine.connect() as conn:
+                fingerprint = tuple((await conn.execute(self.fingerprint(key))).one())
+                if entry is None or entry.fingerprint != fingerprint:
+                    entry = _CacheEntry(await self.build(conn, key), fingerprint, 0.0)
+            entry.checked_at = time.monotonic()
+            if self._loading[key] == 0:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            del self._loading[key]
+        return entry
+
+
+def _changes(session: Session) -> Changes:
+    return session.info.setdefault("changed_models", {})
+
+
+def _record_flush(session: Session, flush_context) -> None:
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        model = type(instance)
+        if model not in _callbacks:
+            continue
+        rows = _changes(session).setdefault(model, [])
+        if rows is None:
+            continue
+        state = inspect(instance)
+        current = {key: value for key, value in state.dict.items() if not key.startswith("_")}
+        rows.append(current)
+        # committed_state keeps the pre-flush values of modified attributes
+        if state.committed_state:
+            rows.append({**current, **state.committed_state})
+
+
+def _record_statement(orm_execute_state) -> None:
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _callbacks:
+        _changes(orm_execute_state.session)[mapper.class_] = None
+
+
+def _notify(session: Session) -> None:
+    changes = session.info.pop("changed_models", None)
+    if changes:
+        notify_model_change(changes)
+
+
+def _discard(session: Session) -> None:
+    session.info.pop("changed_models", None)
@@ -1,29 +1,113 @@
-from .base import Base
-from .company import Company
-from .company_machine_mapping import CompanyMachineMapping
-from .company_tool_mapping import CompanyToolMapping
-from .cutting_tool_taxonomy import CuttingToolTaxonomy
-from .default_policy import DefaultPolicy
-from .disabled_default_policy import DisabledDefaultPolicy
-from .formatted_feature import FormattedFeature
-from .job import Job
-from .machine import Machine
-from .machine_operation_plan import MachineOperationPlan
-from .material import Material
-from .operation_name import OperationName
-from .speed_and_feed import SpeedAndFeed
-from .stock import Stock
-from .tool import Tool
-from .tool_attribute import ToolAttribute
-from .tool_master import ToolMaster
-from .tool_taxonomy import ToolTaxonomy
-from .tool_type import ToolType
-from .user import User
-from .user_role import UserRole
-from .vendor import Vendor
-from .invitation import Invitation
-from .user_feedback import UserFeedback
-from .policy_override import PolicyOverride
+"""
+Mapped models, imported on first use.
+
+Importing this package imports nothing. The first access to any model
+imports every model module, so string based relationships between them
+always resolve; `register_models()` does the same explicitly.
+"""
+import importlib
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import Base
+    from .company import Company
+    from .company_machine_mapping import CompanyMachineMapping
+    from .company_tool_mapping import CompanyToolMapping
+    from .cutting_tool_taxonomy import CuttingToolTaxonomy
+    from .default_policy import DefaultPolicy
+    from .disabled_default_policy import DisabledDefaultPolicy
+    from .formatted_feature import FormattedFeature
+    from .job import Job
+    from .machine import Machine
+    from .machine_operation_plan import MachineOperationPlan
+    from .material import Material
+    from .operation_name import OperationName
+    from .speed_and_feed import SpeedAndFeed
+    from .stock import Stock
+    from .tool import Tool
+    from .tool_attribute import ToolAttribute
+    from .tool_master import ToolMaster
+    from .tool_taxonomy import ToolTaxonomy
+    from .tool_type import ToolType
+    from .user import User
+    from .user_role import UserRole
+    from .vendor import Vendor
+    from .invitation import Invitation
+    from .user_feedback import UserFeedback
+    from .policy_override import PolicyOverride
+    from .default_policy_v2 import DefaultPolicyV2
+    from .user_default_policy_exclusion import UserDefaultPolicyExclusion
+    from .user_policy import UserPolicy
+    from .ingest_quarantine import IngestQuarantine
+    from .ingest_checkpoint import IngestCheckpoint
+    from .tool_type_taxonomy_map import ToolTypeTaxonomyMap
+    from .policy_migration_map import PolicyMigrationMap
+    from .material_alias import MaterialAlias
+    from .material_property_range import MaterialPropertyRange
+    from .operation_plan_cache import OperationPlanCache
+    from .operation_plan_state import OperationPlanState
+    from .job_queue_entry import JobQueueEntry
+
+
+# Model name -> module defining it
+_REGISTRY = {
+    'Company': '.company',
+    'CompanyMachineMapping': '.company_machine_mapping',
+    'CompanyToolMapping': '.company_tool_mapping',
+    'CuttingToolTaxonomy': '.cutting_tool_taxonomy',
+    'DefaultPolicy': '.default_policy',
+    'DisabledDefaultPolicy': '.disabled_default_policy',
+    'FormattedFeature': '.formatted_feature',
+    'Job': '.job',
+    'Machine': '.machine',
+    'MachineOperationPlan': '.machine_operation_plan',
+    'Material': '.material',
+    'OperationName': '.operation_name',
+    'SpeedAndFeed': '.speed_and_feed',
+    'Stock': '.stock',
+    'Tool': '.tool',
+    'ToolAttribute': '.tool_attribute',
+    'ToolMaster': '.tool_master',
+    'ToolTaxonomy': '.tool_taxonomy',
+    'ToolType': '.tool_type',
+    'User': '.user',
+    'UserRole': '.user_role',
+    'Vendor': '.vendor',
+    'Invitation': '.invitation',
+    'UserFeedback': '.user_feedback',
+    'PolicyOverride': '.policy_override',
+    'DefaultPolicyV2': '.default_policy_v2',
+    'UserDefaultPolicyExclusion': '.user_default_policy_exclusion',
+    'UserPolicy': '.user_policy',
+    'IngestQuarantine': '.ingest_quarantine',
+    'IngestCheckpoint': '.ingest_checkpoint',
+    'ToolTypeTaxonomyMap': '.tool_type_taxonomy_map',
+    'PolicyMigrationMap': '.policy_migration_map',
+    'MaterialAlias': '.material_alias',
+    'MaterialPropertyRange': '.material_property_range',
+    'OperationPlanCache': '.operation_plan_cache',
+    'OperationPlanState': '.operation_plan_state',
+    'JobQueueEntry': '.job_queue_entry',
+}
+
+
+def register_models() -> None:
+    """Import every model module so the declarative registry is complete."""
+    package = sys.modules[__name__]
+    for name, module_name in _REGISTRY.items():
+        module = importlib.import_module(module_name, __name__)
+        setattr(package, name, getattr(module, name))
+
+
+def __getattr__(name: str):
+    if name == 'Base':
+        from .base import Base
+        return Base
+    if name in _REGISTRY:
+        register_models()
+        return globals()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 __all__ = [
@@ -53,4 +137,17 @@ __all__ = [
     'Invitation',
     'UserFeedback',
     'PolicyOverride',
+    'DefaultPolicyV2',
+    'UserDefaultPolicyExclusion',
+    'UserPolicy',
+    'IngestQuarantine',
+    'IngestCheckpoint',
+    'ToolTypeTaxonomyMap',
+    'PolicyMigrationMap',
+    'MaterialAlias',
+    'MaterialPropertyRange',
+    'OperationPlanCache',
+    'OperationPlanState',
+    'JobQueueEntry',
+    'register_models',
 ]
@@ -3,7 +3,7 @@ from typing import Optional
 
 from sqlalchemy import (
     ARRAY, BigInteger, DateTime, ForeignKeyConstraint, Index, Integer, 
-    PrimaryKeyConstraint, String, Text
+    LargeBinary, PrimaryKeyConstraint, String, Text
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -61,6 +61,18 @@ class FormattedFeature(Base):
         ARRAY(Integer()), 
         nullable=False
     )
+    # Packed forms of triangle_indices / face_indices (see utils.index_codec);
+    # when set they take precedence over the arrays, which may then be empty.
+    # Added by the "formattedfeature_packed_indices" schema change, not by
+    # Django, so ORM loads leave them out unless asked to undefer them.
+    triangle_indices_packed: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary,
+        deferred=True
+    )
+    face_indices_packed: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary,
+        deferred=True
+    )
     feature_id: Mapped[Optional[str]] = mapped_column(String(40))
     index: Mapped[Optional[int]] = mapped_column(Integer)
     company_id: Mapped[Optional[int]] = mapped_column(BigInteger)
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, PrimaryKeyConstraint, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class IngestCheckpoint(Base):
+    """
+    Resume point of a named chunked ingest.
+
+    `position` is the index of the last source row covered by a committed
+    chunk; a restarted ingest skips every row up to and including it.
+    """
+    __tablename__ = 'ingest_checkpoint'
+    __table_args__ = (
+        PrimaryKeyConstraint('job_name', name='ingest_checkpoint_pkey'),
+    )
+
+    job_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    rows_committed: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    rows_quarantined: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=True,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger, DateTime, Index, PrimaryKeyConstraint, String, Text
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class IngestQuarantine(Base):
+    """
+    Source rows rejected during a chunked ingest.
+
+    Each rejected row is stored with its position in the source and the
+    error it raised, so it can be fixed and replayed without re-running
+    the whole ingest.
+    """
+    __tablename__ = 'ingest_quarantine'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='ingest_quarantine_pkey'),
+        Index('idx_ingest_quarantine_job_replayed', 'job_name', 'replayed_at'),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger, 
+        primary_key=True, 
+        autoincrement=True
+    )
+    job_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    position: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    error: Mapped[str] = mapped_column(Text, nullable=False)
+    replayed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(True))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
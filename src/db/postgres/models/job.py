@@ -21,7 +21,7 @@ class Job(Base):
         ForeignKeyConstraint(['user_id'], ['myapp_user.id'], deferrable=True, initially='DEFERRED', name='myapp_cadfeaturecache_user_id_3c29bddd_fk_myapp_user_id'),
         PrimaryKeyConstraint('id', name='myapp_cadfeaturecache_pkey'),
         Index('idx_job_company_session', 'company_id', 'session_id'),    
-        Index('idx_job_company', 'company_id'),                         
+        Index('idx_job_company_id', 'company_id', 'id'),
         Index('idx_job_session', 'session_id'),                         
         Index('idx_job_machine', 'machine_id'),                         
         Index('idx_job_material', 'material_id'),                       
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger, DateTime, ForeignKey, Index, Integer, PrimaryKeyConstraint,
+    SmallInteger, String, Text, UniqueConstraint, text
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class JobQueueEntry(Base):
+    """
+    One processing stage of a job, queued for a worker.
+
+    Workers claim ready entries with FOR UPDATE SKIP LOCKED and hold them
+    under a lease: `lease_token` identifies the claim and
+    `lease_expires_at` is pushed forward by heartbeats. An entry whose
+    lease runs out is claimable again, and one that has used up
+    `max_attempts` ends as 'failed'. Lower `priority` values are claimed
+    first. Every time is the database's clock, so workers on different
+    nodes agree on it.
+    """
+    __tablename__ = 'job_queue'
+    __table_args__ = (
+        PrimaryKeyConstraint('id', name='job_queue_pkey'),
+        UniqueConstraint('job_id', 'stage', name='job_queue_job_stage_key'),
+        Index(
+            'idx_job_queue_ready', 'priority', 'available_at', 'id',
+            postgresql_where=text("status = 'queued'"),
+        ),
+        Index(
+            'idx_job_queue_lease', 'lease_expires_at',
+            postgresql_where=text("status = 'running'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=True
+    )
+    job_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('myapp_cadfeaturecache.id', ondelete='CASCADE'),
+        nullable=False,
+    )
+    stage: Mapped[str] = mapped_column(String(32), nullable=False)
+    priority: Mapped[int] = mapped_column(SmallInteger, nullable=False, server_default='0')
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default='queued')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default='0')
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(True),
+        nullable=False,
+        server_default=func.now()
+    )
+    worker_id: Mapped[Optional[str]] = mapped_column(String(128))
+    lease_token: Mapped[Optional[str]] = mapped_column(String(32))
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(True))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(True))
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True),
+        nullable=False,
+        server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(True))
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, DateTime, Double, ForeignKey, Index, PrimaryKeyConstraint, String
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class MaterialAlias(Base):
+    """
+    A raw material string resolved to a `Material` row.
+
+    `alias` is the normalized form of the string, so spelling variants that
+    normalize alike share one row. `source` records how it was resolved
+    ('exact', 'fuzzy' or 'manual') and `score` the match score at the time.
+    """
+    __tablename__ = 'material_alias'
+    __table_args__ = (
+        PrimaryKeyConstraint('alias', name='material_alias_pkey'),
+        Index('idx_material_alias_material_id', 'material_id'),
+    )
+
+    alias: Mapped[str] = mapped_column(String(255), primary_key=True)
+    material_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('myapp_material.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    score: Mapped[float] = mapped_column(Double(53), nullable=False)
+    source: Mapped[str] = mapped_column(String(20), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=True,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
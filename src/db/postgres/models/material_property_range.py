@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger, DateTime, Double, ForeignKey, Index, PrimaryKeyConstraint, String
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class MaterialPropertyRange(Base):
+    """
+    Numeric ranges parsed from a material's free-text property columns.
+
+    Values are in canonical units (HB, MPa, %, GPa); a NULL bound is open or
+    unknown. `source_hash` is the content hash of the texts they were parsed
+    from, so only materials whose texts changed are parsed again.
+    """
+    __tablename__ = 'material_property_range'
+    __table_args__ = (
+        PrimaryKeyConstraint('material_id', name='material_property_range_pkey'),
+        Index('idx_material_property_range_hardness', 'hardness_min_hb', 'hardness_max_hb'),
+    )
+
+    material_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('myapp_material.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    hardness_min_hb: Mapped[Optional[float]] = mapped_column(Double(53))
+    hardness_max_hb: Mapped[Optional[float]] = mapped_column(Double(53))
+    yield_strength_min_mpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    yield_strength_max_mpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    tensile_strength_min_mpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    tensile_strength_max_mpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    elongation_min_pct: Mapped[Optional[float]] = mapped_column(Double(53))
+    elongation_max_pct: Mapped[Optional[float]] = mapped_column(Double(53))
+    modulus_elasticity_min_gpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    modulus_elasticity_max_gpa: Mapped[Optional[float]] = mapped_column(Double(53))
+    source_hash: Mapped[str] = mapped_column(String(40), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=True,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
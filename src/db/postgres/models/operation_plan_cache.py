@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, DateTime, Index, PrimaryKeyConstraint, String
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class OperationPlanCache(Base):
+    """
+    Operation plan generated for one combination of planning inputs.
+
+    `plan_key` is the content hash of the inputs (features, machine,
+    material, stock, rigidity and resolved policies); `plans` holds the
+    resulting setups as MachineOperationPlan values. Rows unused for long
+    are evicted by `last_used_at`.
+    """
+    __tablename__ = 'operation_plan_cache'
+    __table_args__ = (
+        PrimaryKeyConstraint('plan_key', name='operation_plan_cache_pkey'),
+        Index('idx_operation_plan_cache_last_used', 'last_used_at'),
+    )
+
+    plan_key: Mapped[str] = mapped_column(String(40), primary_key=True)
+    plans: Mapped[list] = mapped_column(JSONB, nullable=False)
+    hit_count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default='0')
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, PrimaryKeyConstraint, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class OperationPlanState(Base):
+    """
+    Inputs a job's current MachineOperationPlan rows were generated from.
+
+    `inputs` holds the job-level inputs (stock, machine, material,
+    rigidity, policy hash), `feature_hashes` the content hash of every
+    feature by feature id and `flagged` the hash of every flag by feature
+    id. Comparing them with the job's current values tells the replanner
+    which setups need recomputing. `plans_hash` is the hash of the plan
+    rows written with them; rows rewritten by anything else no longer match
+    it and get a full replan.
+    """
+    __tablename__ = 'operation_plan_state'
+    __table_args__ = (
+        PrimaryKeyConstraint('job_id', name='operation_plan_state_pkey'),
+    )
+
+    job_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('myapp_cadfeaturecache.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    inputs: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    feature_hashes: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    flagged: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    plans_hash: Mapped[str] = mapped_column(String(40), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
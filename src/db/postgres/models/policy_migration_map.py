@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, DateTime, Index, PrimaryKeyConstraint, String
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class PolicyMigrationMap(Base):
+    """
+    Which v2 policy row a legacy policy row was migrated to.
+
+    Makes the migration idempotent and lets dual writes carry legacy
+    updates and deletes over to the matching v2 row during cutover.
+    """
+    __tablename__ = 'policy_migration_map'
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            'legacy_table', 'legacy_id', name='policy_migration_map_pkey'
+        ),
+        Index('idx_policy_migration_map_v2', 'v2_table', 'v2_id'),
+    )
+
+    legacy_table: Mapped[str] = mapped_column(String(64), primary_key=True)
+    legacy_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    v2_table: Mapped[str] = mapped_column(String(64), nullable=False)
+    v2_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
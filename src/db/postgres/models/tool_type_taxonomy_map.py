@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger, DateTime, ForeignKey, Index, PrimaryKeyConstraint
+)
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from sqlalchemy_utils import Ltree, LtreeType
+
+from .base import Base
+
+
+class ToolTypeTaxonomyMap(Base):
+    """
+    Taxonomy code standing in for a legacy tool type.
+
+    Legacy policies are scoped by `tool_type_id`; their v2 counterparts by
+    `tool_taxonomy_code`. Tool types without a row here fall back to the
+    taxonomy node of the same name when policies are migrated.
+    """
+    __tablename__ = 'tool_type_taxonomy_map'
+    __table_args__ = (
+        PrimaryKeyConstraint('tool_type_id', name='tool_type_taxonomy_map_pkey'),
+        Index('idx_tool_type_taxonomy_map_code', 'tool_taxonomy_code'),
+    )
+
+    tool_type_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey('myapp_tooltype.id'),
+        primary_key=True,
+    )
+    tool_taxonomy_code: Mapped[Ltree] = mapped_column(
+        LtreeType,
+        ForeignKey('tool_taxonomy.code'),
+        nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(True), 
+        nullable=True,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
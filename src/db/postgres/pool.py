@@ -0,0 +1,235 @@
+"""Connection pool telemetry and adaptive pool sizing."""
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Sequence, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+
+# Histogram bucket upper bounds; a final overflow bucket catches the rest
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+AGE_BUCKETS_S = (1, 10, 60, 300, 900, 1800, 3600, 7200, 14400)
+
+
+class Histogram:
+    """Fixed bucket histogram with count, sum, max and bucket quantiles."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class AdaptivePoolSizer:
+    """
+    Grow and shrink a QueuePool's overflow allowance from observed waits.
+
+    Every `window` checkouts the p95 checkout wait is compared against the
+    thresholds: slow checkouts or timeouts raise `max_overflow` by `step`,
+    consistently instant checkouts with idle headroom lower it again. The
+    pool never goes below `pool_size + min_overflow` or above `max_size`
+    connections. Overflow connections are opened on demand and closed when
+    returned to a full pool, so shrinking needs no extra bookkeeping.
+    """
+
+    def __init__(
+        self,
+        min_overflow: int,
+        max_size: int,
+        grow_wait_ms: float = 50.0,
+        shrink_wait_ms: float = 1.0,
+        window: int = 200,
+        step: int = 2,
+    ):
+        self.min_overflow = min_overflow
+        self.max_size = max_size
+        self.grow_wait_ms = grow_wait_ms
+        self.shrink_wait_ms = shrink_wait_ms
+        self.window = window
+        self.step = step
+        self.resizes = 0
+        self._waits = Histogram(WAIT_BUCKETS_MS)
+        self._timeouts = 0
+        self._peak_checked_out = 0
+
+    def observe(self, pool: Pool, wait_ms: float, timed_out: bool) -> None:
+        self._waits.observe(wait_ms)
+        self._timeouts += timed_out
+        self._peak_checked_out = max(self._peak_checked_out, pool.checkedout())
+        if self._waits.count >= self.window:
+            self.adjust(pool)
+
+    def adjust(self, pool: Pool) -> None:
+        # pool_size=0 means "no limit" and max_overflow is then meaningless
+        if not isinstance(pool, AsyncAdaptedQueuePool) or not pool.size():
+            return
+
+        current = pool._max_overflow
+        max_overflow = max(self.max_size - pool.size(), self.min_overflow)
+        p95 = self._waits.quantile(0.95)
+
+        target = current
+        if self._timeouts or p95 >= self.grow_wait_ms:
+            target = min(current + self.step, max_overflow)
+        elif (
+            p95 <= self.shrink_wait_ms
+            and self._peak_checked_out <= pool.size() + current - self.step
+        ):
+            target = max(current - self.step, self.min_overflow)
+
+        if target != current:
+            pool._max_overflow = target
+            self.resizes += 1
+
+        self._waits.reset()
+        self._timeouts = 0
+        self._peak_checked_out = 0
+
+
+class PoolMonitor:
+    """
+    Collect checkout telemetry for one engine's connection pool.
+
+    Reports the checked-out count, a checkout wait-time histogram, checkout
+    timeouts and the age of pooled connections. Wait time covers the whole
+    `Pool.connect()` call: queueing for a free connection plus opening a new
+    one when the pool grows.
+    """
+
+    def __init__(self, sizer: Optional[AdaptivePoolSizer] = None):
+        self.sizer = sizer
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.age_at_checkout_s = Histogram(AGE_BUCKETS_S)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.peak_checked_out = 0
+        self._opened_at: Dict[int, float] = {}
+
+    @property
+    def pool_class(self) -> Type[AsyncAdaptedQueuePool]:
+        """Pool class to pass as `poolclass=` when creating the engine."""
+        return type(
+            "InstrumentedAsyncAdaptedQueuePool",
+            (_InstrumentedPool,),
+            {"monitor": self},
+        )
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Listen to connection lifecycle events of the engine's pool."""
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "close", self._on_close)
+        event.listen(pool, "close_detached", self._on_close_detached)
+
+    def record_checkout(self, pool: Pool, wait_ms: float, timed_out: bool) -> None:
+        self.wait_ms.observe(wait_ms)
+        self.timeouts += timed_out
+        self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+        if self.sizer is not None:
+            self.sizer.observe(pool, wait_ms, timed_out)
+
+    def stats(self, pool: Pool) -> Dict:
+        """Point-in-time pool status together with cumulative telemetry."""
+        now = time.monotonic()
+        ages = [now - opened for opened in self._opened_at.values()]
+        stats = {
+            "pool": pool.status(),
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "closes": self.closes,
+            "wait_ms": self.wait_ms.snapshot(),
+            "connection_age_s": {
+                "open": len(ages),
+                "oldest": max(ages, default=0.0),
+                "mean": sum(ages) / len(ages) if ages else 0.0,
+                "at_checkout": self.age_at_checkout_s.snapshot(),
+            },
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats["size"] = pool.size()
+            stats["overflow"] = pool.overflow()
+            stats["max_overflow"] = pool._max_overflow
+        if self.sizer is not None:
+            stats["adaptive_resizes"] = self.sizer.resizes
+        return stats
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        opened = time.monotonic()
+        connection_record.info["opened_at"] = opened
+        self._opened_at[id(connection_record)] = opened
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+        opened = connection_record.info.get("opened_at")
+        if opened is not None:
+            self.age_at_checkout_s.observe(time.monotonic() - opened)
+
+    def _on_close(self, dbapi_connection, connection_record) -> None:
+        self._opened_at.pop(id(connection_record), None)
+        self.closes += 1
+
+    def _on_close_detached(self, dbapi_connection) -> None:
+        self.closes += 1
+
+
+class _InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times every checkout for its monitor."""
+
+    monitor: PoolMonitor
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            wait_ms = (time.perf_counter() - start) * 1000
+            self.monitor.record_checkout(self, wait_ms, timed_out)
@@ -0,0 +1,126 @@
+"""Primary/replica session routing with read-your-writes consistency."""
+import time
+from typing import Optional, Type
+
+from sqlalchemy import Engine, event, exc, text
+from sqlalchemy.orm import Session
+
+
+def parse_lsn(lsn: Optional[str]) -> int:
+    """Convert a Postgres LSN such as '16/B374D848' into a comparable int."""
+    if not lsn:
+        return 0
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+class ReplicaRouter:
+    """
+    Decide whether a read may go to the replica.
+
+    The router keeps the highest primary WAL position this process has
+    committed writes up to. A read goes to the replica only once the
+    replica has replayed past that position; until then it goes to the
+    primary. The replica's replay position is cached and re-read at most
+    every `lag_check_interval` seconds, and only while it is behind.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replica: Engine,
+        lag_check_interval: float = 0.05,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.lag_check_interval = lag_check_interval
+        self.committed_lsn = 0
+        self.replayed_lsn = 0
+        self._checked_at = 0.0
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def record_commit(self) -> None:
+        """Remember the primary's WAL position right after a write commit."""
+        with self.primary.connect() as conn:
+            lsn = parse_lsn(conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar())
+        self.committed_lsn = max(self.committed_lsn, lsn)
+
+    def replica_caught_up(self) -> bool:
+        if self.replayed_lsn >= self.committed_lsn:
+            return True
+
+        now = time.monotonic()
+        if now - self._checked_at < self.lag_check_interval:
+            return False
+        self._checked_at = now
+
+        try:
+            with self.replica.connect() as conn:
+                lsn = conn.execute(text("SELECT pg_last_wal_replay_lsn()::text")).scalar()
+        except exc.DBAPIError:
+            return False
+        # NULL means the replica is not in recovery, i.e. it is a primary
+        self.replayed_lsn = parse_lsn(lsn) if lsn else self.committed_lsn
+        return self.replayed_lsn >= self.committed_lsn
+
+    def bind_for_read(self) -> Engine:
+        if self.replica_caught_up():
+            self.replica_reads += 1
+            return self.replica
+        self.primary_reads += 1
+        return self.primary
+
+
+class RoutingSession(Session):
+    """
+    Session sending plain SELECTs to the replica and everything else to the
+    primary.
+
+    Flushes, DML, textual SQL and SELECT ... FOR UPDATE always use the
+    primary. Once a session has written, it stays on the primary for the
+    rest of its life, so it always reads its own writes. Other sessions see
+    those writes through the router, which keeps reads on the primary until
+    the replica has replayed past the commit.
+    """
+
+    router: ReplicaRouter
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or self.info.get("wrote"):
+            return self.router.primary
+
+        # DML, textual SQL, unknown statements and locking reads are writes
+        if (
+            clause is None
+            or not getattr(clause, "is_select", False)
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            _mark_written(self)
+            return self.router.primary
+
+        return self.router.bind_for_read()
+
+
+def make_routing_session_class(router: ReplicaRouter) -> Type[RoutingSession]:
+    """Build a RoutingSession subclass bound to `router`."""
+    session_class = type("RoutingSession", (RoutingSession,), {"router": router})
+    event.listen(session_class, "after_flush", _mark_written)
+    event.listen(session_class, "after_commit", _record_commit)
+    event.listen(session_class, "after_rollback", _forget_write)
+    return session_class
+
+
+def _mark_written(session: RoutingSession, flush_context=None) -> None:
+    session.info["wrote"] = True
+    session.info["uncommitted_write"] = True
+
+
+def _record_commit(session: RoutingSession) -> None:
+    if session.info.pop("uncommitted_write", False):
+        session.router.record_commit()
+
+
+
+def _forget_write(session: RoutingSession) -> None:
+    session.info.pop("uncommitted_write", None)
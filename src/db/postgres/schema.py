@@ -0,0 +1,51 @@
+"""Columns and indexes this service adds to tables owned by the Django app."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .connection import get_engine
+
+
+# Named change -> idempotent DDL statements, applied in order. The Django
+# app owns these tables and never creates what only this service maps, so
+# every change here must be applied before code that reads it is deployed.
+SCHEMA_CHANGES: Dict[str, Tuple[str, ...]] = {
+    "formattedfeature_packed_indices": (
+        "ALTER TABLE myapp_formattedfeature"
+        " ADD COLUMN IF NOT EXISTS triangle_indices_packed bytea,"
+        " ADD COLUMN IF NOT EXISTS face_indices_packed bytea",
+    ),
+    # Keyset job listings; (company_id, id) also serves company_id lookups.
+    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS
+    # skips: drop it before re-applying.
+    "cadfeaturecache_company_keyset": (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_job_company_id"
+        " ON myapp_cadfeaturecache (company_id, id)",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_job_company",
+    ),
+}
+
+
+async def apply_schema_changes(
+    names: Optional[Iterable[str]] = None, bind: Optional[AsyncEngine] = None
+) -> List[str]:
+    """
+    Run the DDL of the named changes (all when None); returns their names.
+
+    Statements run in autocommit mode, one at a time, so that CREATE INDEX
+    CONCURRENTLY is allowed and a long index build holds no transaction
+    open. Every statement is a no-op when its change is already in place.
+    """
+    names = list(SCHEMA_CHANGES if names is None else names)
+    unknown = [name for name in names if name not in SCHEMA_CHANGES]
+    if unknown:
+        raise ValueError(f"unknown schema changes: {', '.join(unknown)}")
+
+    engine = bind or get_engine()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name in names:
+            for statement in SCHEMA_CHANGES[name]:
+                await conn.execute(text(statement))
+    return names
@@ -1,7 +1,143 @@
-from .data_loader_service import DataLoaderService
-from .llm_service import TempLLM
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .data_loader_service import DataLoaderService
+    from .feature_spatial_index_service import (
+        FeatureHit, FeatureSpatialIndex, FeatureSpatialIndexService,
+        get_feature_spatial_index_service
+    )
+    from .job_queue_service import (
+        JobQueueService, QueueLease, get_job_queue_service
+    )
+    from .llm_service import TempLLM
+    from .machine_capability_service import (
+        MachineCapabilityIndex, MachineCapabilityService, MachineRequirement,
+        get_machine_capability_service
+    )
+    from .material_index_service import (
+        MaterialIndex, MaterialIndexService, MaterialMatch,
+        get_material_index_service
+    )
+    from .plan_cache_service import (
+        PlanCacheService, PlanResult, PlanWriteConflict, get_plan_cache_service,
+        plan_key
+    )
+    from .policy_resolution_service import (
+        PolicyResolutionService, PolicySet, ResolvedPolicy,
+        get_policy_resolution_service
+    )
+    from .replan_service import (
+        ReplanResult, ReplanScope, ReplanService, get_replan_service
+    )
+    from .speed_feed_index_service import (
+        SpeedFeedIndex, SpeedFeedIndexService, SpeedFeedMatch,
+        get_speed_feed_index_service
+    )
+    from .speed_feed_limit_service import (
+        SpeedFeedLimitService, get_speed_feed_limit_service
+    )
+    from .taxonomy_index_service import (
+        TaxonomyIndex, TaxonomyIndexService, get_taxonomy_index_service
+    )
+    from .tool_index_service import (
+        ToolCandidates, ToolIndex, ToolIndexService, ToolQuery,
+        get_tool_index_service
+    )
 
 __all__ = [
     "DataLoaderService",
+    "FeatureHit",
+    "FeatureSpatialIndex",
+    "FeatureSpatialIndexService",
+    "JobQueueService",
+    "MachineCapabilityIndex",
+    "MachineCapabilityService",
+    "MachineRequirement",
+    "MaterialIndex",
+    "MaterialIndexService",
+    "MaterialMatch",
+    "PlanCacheService",
+    "PlanResult",
+    "PlanWriteConflict",
+    "PolicyResolutionService",
+    "PolicySet",
+    "QueueLease",
+    "ReplanResult",
+    "ReplanScope",
+    "ReplanService",
+    "ResolvedPolicy",
+    "SpeedFeedIndex",
+    "SpeedFeedIndexService",
+    "SpeedFeedLimitService",
+    "SpeedFeedMatch",
+    "TaxonomyIndex",
+    "TaxonomyIndexService",
     "TempLLM",
+    "ToolCandidates",
+    "ToolIndex",
+    "ToolIndexService",
+    "ToolQuery",
+    "get_feature_spatial_index_service",
+    "get_job_queue_service",
+    "get_machine_capability_service",
+    "get_material_index_service",
+    "get_plan_cache_service",
+    "get_policy_resolution_service",
+    "get_replan_service",
+    "get_speed_feed_index_service",
+    "get_speed_feed_limit_service",
+    "get_taxonomy_index_service",
+    "get_tool_index_service",
+    "plan_key",
 ]
+
+# Services are imported on first access so process-pool workers only pay
+# for the services they actually use
+__getattr__ = lazy_exports(__name__, {
+    "DataLoaderService": ".data_loader_service",
+    "FeatureHit": ".feature_spatial_index_service",
+    "FeatureSpatialIndex": ".feature_spatial_index_service",
+    "FeatureSpatialIndexService": ".feature_spatial_index_service",
+    "JobQueueService": ".job_queue_service",
+    "MachineCapabilityIndex": ".machine_capability_service",
+    "MachineCapabilityService": ".machine_capability_service",
+    "MachineRequirement": ".machine_capability_service",
+    "MaterialIndex": ".material_index_service",
+    "MaterialIndexService": ".material_index_service",
+    "MaterialMatch": ".material_index_service",
+    "PlanCacheService": ".plan_cache_service",
+    "PlanResult": ".plan_cache_service",
+    "PlanWriteConflict": ".plan_cache_service",
+    "PolicyResolutionService": ".policy_resolution_service",
+    "PolicySet": ".policy_resolution_service",
+    "QueueLease": ".job_queue_service",
+    "ReplanResult": ".replan_service",
+    "ReplanScope": ".replan_service",
+    "ReplanService": ".replan_service",
+    "ResolvedPolicy": ".policy_resolution_service",
+    "SpeedFeedIndex": ".speed_feed_index_service",
+    "SpeedFeedIndexService": ".speed_feed_index_service",
+    "SpeedFeedLimitService": ".speed_feed_limit_service",
+    "SpeedFeedMatch": ".speed_feed_index_service",
+    "TaxonomyIndex": ".taxonomy_index_service",
+    "TaxonomyIndexService": ".taxonomy_index_service",
+    "TempLLM": ".llm_service",
+    "ToolCandidates": ".tool_index_service",
+    "ToolIndex": ".tool_index_service",
+    "ToolIndexService": ".tool_index_service",
+    "ToolQuery": ".tool_index_service",
+    "get_feature_spatial_index_service": ".feature_spatial_index_service",
+    "get_job_queue_service": ".job_queue_service",
+    "get_machine_capability_service": ".machine_capability_service",
+    "get_material_index_service": ".material_index_service",
+    "get_plan_cache_service": ".plan_cache_service",
+    "get_policy_resolution_service": ".policy_resolution_service",
+    "get_replan_service": ".replan_service",
+    "get_speed_feed_index_service": ".speed_feed_index_service",
+    "get_speed_feed_limit_service": ".speed_feed_limit_service",
+    "get_taxonomy_index_service": ".taxonomy_index_service",
+    "get_tool_index_service": ".tool_index_service",
+    "plan_key": ".plan_cache_service",
+})
@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.postgres.invalidation import (
+    Changes, FingerprintCache, fingerprint_query, on_model_change
+)
+from ..db.postgres.models import FormattedFeature, Job
+
+
+Box = Tuple[float, float, float, float, float, float]
+
+# Chunk of (queries x features) distances computed at once by `nearest`
+_NEAREST_CELLS = 4_000_000
+
+
+def parse_bounding_box(value: Any) -> Optional[Box]:
+    """
+    (xmin, ymin, zmin, xmax, ymax, zmax) of a stored bounding box.
+
+    Accepts {"min": [x, y, z], "max": [x, y, z]}, flat {"xmin": ...} or
+    {"min_x": ...} keys, and a plain six-number list. Returns None for
+    anything else.
+    """
+    try:
+        if isinstance(value, dict):
+            if "min" in value and "max" in value:
+                low, high = value["min"], value["max"]
+                if isinstance(low, dict):
+                    low = [low[axis] for axis in "xyz"]
+                    high = [high[axis] for axis in "xyz"]
+                box = [*low, *high]
+            elif "xmin" in value:
+                box = [value[f"{axis}{end}"] for end in ("min", "max") for axis in "xyz"]
+            else:
+                box = [value[f"{end}_{axis}"] for end in ("min", "max") for axis in "xyz"]
+        elif isinstance(value, (list, tuple)):
+            box = list(value)
+        else:
+            return None
+        box = [float(v) for v in box]
+    except (KeyError, TypeError, ValueError):
+        return None
+    if len(box) != 6:
+        return None
+    # Normalize inverted axes rather than dropping the feature
+    low, high = np.minimum(box[:3], box[3:]), np.maximum(box[:3], box[3:])
+    return (*low.tolist(), *high.tolist())
+
+
+@dataclass(frozen=True)
+class FeatureHit:
+    """A feature returned by a spatial query; `distance` is 0 when inside."""
+
+    row_id: int
+    feature_id: Optional[str]
+    distance: float = 0.0
+
+
+class FeatureSpatialIndex:
+    """
+    Sorted-sweep index over the bounding boxes of one job's features.
+
+    Boxes are kept as (N, 3) min/max arrays sorted by xmin. A box query
+    binary-searches the x range that can overlap (xmin within the query's
+    x extent widened by the widest box) and checks the remaining axes on
+    that slice only. Nearest-feature queries compute point-to-box
+    distances for a batch of points at once.
+    """
+
+    def __init__(self, job_id: int, rows: Iterable[Tuple[int, Optional[str], Any]]):
+        self.job_id = job_id
+        parsed = [
+            (row_id, feature_id, box)
+            for row_id, feature_id, raw in rows
+            if (box := parse_bounding_box(raw)) is not None
+        ]
+        boxes = np.array([box for _, _, box in parsed], dtype=np.float64).reshape(-1, 6)
+        order = np.argsort(boxes[:, 0], kind="stable")
+        self.row_ids = np.array([p[0] for p in parsed], dtype=np.int64)[order]
+        self.feature_ids = [parsed[i][1] for i in order]
+        self.mins = np.ascontiguousarray(boxes[order, :3])
+        self.maxs = np.ascontiguousarray(boxes[order, 3:])
+        self._max_width = float((self.maxs[:, 0] - self.mins[:, 0]).max(initial=0.0))
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def intersecting(
+        self, boxes: Sequence[Any], tolerance: float = 0.0
+    ) -> List[List[FeatureHit]]:
+        """
+        Features whose box intersects each query box, grown by `tolerance`.
+
+        Touching boxes count as intersecting, so a face's own box with a
+        small tolerance finds the features on it.
+        """
+        result: List[List[FeatureHit]] = []
+        xmins = self.mins[:, 0]
+        for raw in boxes:
+            box = raw if isinstance(raw, tuple) and len(raw) == 6 else parse_bounding_box(raw)
+            if box is None:
+                raise ValueError(f"Not a bounding box: {raw!r}")
+            low = np.asarray(box[:3]) - tolerance
+            high = np.asarray(box[3:]) + tolerance
+            start = np.searchsorted(xmins, low[0] - self._max_width, side="left")
+            stop = np.searchsorted(xmins, high[0], side="right")
+            hit = (
+                (self.maxs[start:stop] >= low).all(axis=1)
+                & (self.mins[start:stop] <= high).all(axis=1)
+            )
+            result.append([self._hit(start + i) for i in np.flatnonzero(hit)])
+        return result
+
+    def nearest(
+        self, points: Sequence[Sequence[float]], k: int = 1
+    ) -> List[List[FeatureHit]]:
+        """The `k` features closest to each point, nearest first."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        if not len(self) or k < 1:
+            return [[] for _ in range(len(points))]
+        k = min(k, len(self))
+
+        result: List[List[FeatureHit]] = []
+        chunk = max(1, _NEAREST_CELLS // len(self))
+        for start in range(0, len(points), chunk):
+            block = points[start:start + chunk]
+            # Squared distance, one axis at a time to keep temporaries 2-D
+            squared = np.zeros((len(block), len(self)))
+            for axis in range(3):
+                p = block[:, axis, None]
+                gap = np.maximum(np.maximum(self.mins[:, axis] - p, p - self.maxs[:, axis]), 0.0)
+                squared += gap * gap
+            nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+            for row, candidates in zip(squared, nearest):
+                ranked = candidates[np.argsort(row[candidates], kind="stable")]
+                result.append([self._hit(i, float(np.sqrt(row[i]))) for i in ranked])
+        return result
+
+    def _hit(self, position: int, distance: float = 0.0) -> FeatureHit:
+        return FeatureHit(int(self.row_ids[position]), self.feature_ids[position], distance)
+
+
+class FeatureSpatialIndexService:
+    """
+    Per-job FeatureSpatialIndex objects in a bounded LRU.
+
+    An index is built from the job's FormattedFeature rows on first use.
+    Commits in this process that touch a job's features, including the
+    bulk fan-out, drop that job's index; statements that cannot list the
+    rows they changed drop them all. Writes from other processes are
+    caught by a fingerprint of the job's features (see FingerprintCache).
+    """
+
+    def __init__(
+        self, max_jobs: int = 256, ttl: float = 30.0, bind: Optional[AsyncEngine] = None
+    ):
+        self._indexes: FingerprintCache[int, FeatureSpatialIndex] = FingerprintCache(
+            self._fingerprint, self._load, max_jobs, ttl, bind
+        )
+        on_model_change((FormattedFeature, Job), self._on_change)
+
+    async def get(self, job_id: int) -> FeatureSpatialIndex:
+        return await self._indexes.get(job_id)
+
+    async def intersecting(self, job_id: int, boxes: Sequence[Any], tolerance: float = 0.0):
+        return (await self.get(job_id)).intersecting(boxes, tolerance)
+
+    async def nearest(self, job_id: int, points: Sequence[Sequence[float]], k: int = 1):
+        return (await self.get(job_id)).nearest(points, k)
+
+    def invalidate_job(self, job_id: int) -> None:
+        self._indexes.invalidate(job_id)
+
+    def invalidate(self) -> None:
+        self._indexes.clear()
+
+    def _on_change(self, changes: Changes) -> None:
+        for model, key in ((FormattedFeature, "cad_feature_cache_id"), (Job, "id")):
+            if model not in changes:
+                continue
+            rows = changes[model]
+            if rows is None:
+                self.invalidate()
+                return
+            for row in rows:
+                self.invalidate_job(row.get(key))
+
+    @staticmethod
+    def _fingerprint(job_id: int) -> Select:
+        table = FormattedFeature.__table__
+        return fingerprint_query(
+            table,
+            [table.c.id, table.c.feature_id, table.c.bounding_box],
+            table.c.cad_feature_cache_id == job_id,
+        )
+
+    @staticmethod
+    async def _load(conn: AsyncConnection, job_id: int) -> FeatureSpatialIndex:
+        table = FormattedFeature.__table__
+        rows = await conn.execute(
+            select(table.c.id, table.c.feature_id, table.c.bounding_box)
+            .where(table.c.cad_feature_cache_id == job_id)
+        )
+        return FeatureSpatialIndex(job_id, rows.all())
+
+
+@lru_cache
+def get_feature_spatial_index_service() -> FeatureSpatialIndexService:
+    """Shared feature spatial index service of this process."""
+    return FeatureSpatialIndexService()
@@ -0,0 +1,503 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import (
+    Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set
+)
+from uuid import uuid4
+
+from sqlalchemy import (
+    Interval, and_, case, delete, false, func, literal, null, or_, select, update
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..config import get_settings
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import notify_model_change
+from ..db.postgres.models import Job, JobQueueEntry
+from ..db.postgres.pool import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# Stage -> default priority; lower values are claimed first
+STAGE_PRIORITIES = {
+    "deterministic": 0,
+    "ai_strategy": 10,
+}
+
+# Stage -> Job flag set when the stage completes
+STAGE_FLAGS = {
+    "deterministic": "deterministic_completed",
+    "ai_strategy": "ai_strategy_completed",
+}
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS_S = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+Handler = Callable[["QueueLease"], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class QueueLease:
+    """A claimed queue entry; `token` proves the claim is still ours."""
+
+    id: int
+    job_id: int
+    stage: str
+    attempts: int
+    max_attempts: int
+    token: str
+    waited: float
+
+
+class JobQueueService:
+    """
+    Durable work queue of job stages, kept in the `job_queue` table.
+
+    Any number of workers, on any number of nodes, claim ready entries
+    with FOR UPDATE SKIP LOCKED, so each entry goes to exactly one of them.
+    A claim is a lease: the worker heartbeats to extend it, and completing
+    or failing the entry only counts while its lease token still matches.
+    An entry whose worker died is claimed again once its lease expires;
+    handlers therefore run at least once and should be idempotent. Failed
+    attempts are retried with exponential backoff until `max_attempts`.
+
+    Completing a stage also sets its Job flag (`deterministic_completed`,
+    `ai_strategy_completed`) in the same transaction.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 900.0,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        settings = get_settings() if lease_seconds is None or max_attempts is None else None
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = timedelta(seconds=lease_seconds or settings.JOB_QUEUE_LEASE_SECONDS)
+        self.max_attempts = max_attempts or settings.JOB_QUEUE_MAX_ATTEMPTS
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.bind = bind
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._waits: Dict[str, Histogram] = {}
+        self._runs: Dict[str, Histogram] = {}
+
+    async def enqueue(
+        self,
+        job_ids: Iterable[int],
+        stage: str,
+        priority: Optional[int] = None,
+        delay: Optional[timedelta] = None,
+    ) -> int:
+        """
+        Queue `stage` of each job. A job already queued or running for the
+        stage is left alone; a finished or failed one is queued again with
+        fresh attempts. Returns the number of entries queued.
+        """
+        priority = _stage_priority(stage) if priority is None else priority
+        available_at = func.now() + delay if delay else func.now()
+        # ON CONFLICT DO UPDATE rejects a statement touching a row twice
+        rows = [
+            {
+                "job_id": job_id, "stage": stage, "priority": priority,
+                "max_attempts": self.max_attempts, "available_at": available_at,
+            }
+            for job_id in dict.fromkeys(job_ids)
+        ]
+        if not rows:
+            return 0
+        table = JobQueueEntry.__table__
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.job_id, table.c.stage],
+            set_={
+                "status": "queued",
+                "priority": stmt.excluded.priority,
+                "attempts": 0,
+                "max_attempts": stmt.excluded.max_attempts,
+                "available_at": available_at,
+                "last_error": None,
+                "started_at": None,
+                "finished_at": None,
+            },
+            where=table.c.status.in_(("done", "failed")),
+        ).returning(table.c.id)
+        async with self._engine().begin() as conn:
+            return len((await conn.execute(stmt)).all())
+
+    async def enqueue_incomplete(self, stage: str, priority: Optional[int] = None) -> int:
+        """Queue `stage` of every job whose flag for it is not set yet."""
+        priority = _stage_priority(stage) if priority is None else priority
+        table = JobQueueEntry.__table__
+        jobs = Job.__table__
+        stmt = insert(table).from_select(
+            ["job_id", "stage", "priority", "max_attempts"],
+            select(
+                jobs.c.id, literal(stage), literal(priority), literal(self.max_attempts)
+            ).where(jobs.c[STAGE_FLAGS[stage]] == false()),
+        ).on_conflict_do_nothing(index_elements=[table.c.job_id, table.c.stage]).returning(table.c.id)
+        async with self._engine().begin() as conn:
+            return len((await conn.execute(stmt)).all())
+
+    async def claim(self, stages: Optional[Iterable[str]] = None, limit: int = 1) -> List[QueueLease]:
+        """
+        Lease up to `limit` ready entries of `stages` (all when None),
+        highest priority and longest waiting first. Entries locked by
+        another worker's claim are skipped, not waited on.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        table = JobQueueEntry.__table__
+        ready = select(table.c.id).where(
+            or_(
+                and_(table.c.status == "queued", table.c.available_at <= func.now()),
+                and_(
+                    table.c.status == "running",
+                    table.c.lease_expires_at < func.now(),
+                    table.c.attempts < table.c.max_attempts,
+                ),
+            )
+        )
+        if stages is not None:
+            stages = list(stages)
+            for stage in stages:
+                _stage_priority(stage)
+            ready = ready.where(table.c.stage.in_(stages))
+        claimable = (
+            ready.order_by(table.c.priority, table.c.available_at, table.c.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("claimable")
+        )
+        token = uuid4().hex
+        stmt = (
+            update(table)
+            .where(table.c.id.in_(select(claimable.c.id)))
+            .values(
+                status="running",
+                attempts=table.c.attempts + 1,
+                worker_id=self.worker_id,
+                lease_token=token,
+                lease_expires_at=func.now() + self.lease,
+                heartbeat_at=func.now(),
+                started_at=func.now(),
+            )
+            .returning(
+                table.c.id, table.c.job_id, table.c.stage, table.c.attempts,
+                table.c.max_attempts,
+                func.extract("epoch", func.now() - table.c.available_at),
+            )
+        )
+        async with self._engine().begin() as conn:
+            rows = (await conn.execute(stmt)).all()
+        leases = [
+            QueueLease(row[0], row[1], row[2], row[3], row[4], token, float(row[5]))
+            for row in sorted(rows, key=lambda row: row[0])
+        ]
+        for lease in leases:
+            self._count(lease.stage, "claimed")
+            self._histogram(self._waits, lease.stage).observe(lease.waited)
+        return leases
+
+    async def heartbeat(self, lease: QueueLease) -> bool:
+        """Extend the lease; False when it was lost to another worker."""
+        table = JobQueueEntry.__table__
+        stmt = (
+            update(table)
+            .where(*_held(table, lease))
+            .values(lease_expires_at=func.now() + self.lease, heartbeat_at=func.now())
+            .returning(table.c.id)
+        )
+        async with self._engine().begin() as conn:
+            held = (await conn.execute(stmt)).first() is not None
+        if not held:
+            self._count(lease.stage, "lease_lost")
+        return held
+
+    async def complete(self, lease: QueueLease) -> bool:
+        """
+        Mark the entry done and set its stage's Job flag; False, and
+        nothing written, when the lease was lost.
+        """
+        table = JobQueueEntry.__table__
+        jobs = Job.__table__
+        async with self._engine().begin() as conn:
+            done = (await conn.execute(
+                update(table)
+                .where(*_held(table, lease))
+                .values(
+                    status="done", finished_at=func.now(), last_error=None,
+                    lease_token=None, lease_expires_at=None,
+                )
+                .returning(table.c.id)
+            )).first()
+            if done is None:
+                self._count(lease.stage, "lease_lost")
+                return False
+            await conn.execute(
+                update(jobs)
+                .where(jobs.c.id == lease.job_id)
+                .values({STAGE_FLAGS[lease.stage]: True, "updated_at": func.now()})
+            )
+        notify_model_change({Job: [{"id": lease.job_id}]})
+        self._count(lease.stage, "completed")
+        return True
+
+    async def fail(self, lease: QueueLease, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Record a failed attempt. The entry is queued again after a backoff
+        while it has attempts left and `retry` is set, otherwise it ends
+        as 'failed'. Returns the new status, or None when the lease was
+        lost.
+        """
+        table = JobQueueEntry.__table__
+        retrying = and_(literal(retry), table.c.attempts < table.c.max_attempts)
+        backoff = literal(timedelta(seconds=1), Interval) * func.least(
+            self.retry_max_seconds,
+            self.retry_base_seconds * func.power(2, table.c.attempts - 1),
+        )
+        stmt = (
+            update(table)
+            .where(*_held(table, lease))
+            .values(
+                status=case((retrying, "queued"), else_="failed"),
+                available_at=case((retrying, func.now() + backoff), else_=table.c.available_at),
+                finished_at=case((retrying, null()), else_=func.now()),
+                last_error=error,
+                lease_token=None,
+                lease_expires_at=None,
+            )
+            .returning(table.c.status)
+        )
+        async with self._engine().begin() as conn:
+            status = (await conn.execute(stmt)).scalar_one_or_none()
+        if status is None:
+            self._count(lease.stage, "lease_lost")
+        else:
+            self._count(lease.stage, "retried" if status == "queued" else "failed")
+        return status
+
+    async def release(self, lease: QueueLease) -> bool:
+        """Give a claimed entry back without using up an attempt."""
+        table = JobQueueEntry.__table__
+        stmt = (
+            update(table)
+            .where(*_held(table, lease))
+            .values(
+                status="queued", attempts=table.c.attempts - 1,
+                lease_token=None, lease_expires_at=None,
+            )
+            .returning(table.c.id)
+        )
+        async with self._engine().begin() as conn:
+            return (await conn.execute(stmt)).first() is not None
+
+    async def reap(self) -> int:
+        """
+        Fail entries whose lease expired on their last attempt; claiming
+        skips them, so they would otherwise stay 'running'.
+        """
+        table = JobQueueEntry.__table__
+        stmt = (
+            update(table)
+            .where(
+                table.c.status == "running",
+                table.c.lease_expires_at < func.now(),
+                table.c.attempts >= table.c.max_attempts,
+            )
+            .values(
+                status="failed", finished_at=func.now(), last_error="lease expired",
+                lease_token=None, lease_expires_at=None,
+            )
+            .returning(table.c.id)
+        )
+        async with self._engine().begin() as conn:
+            return len((await conn.execute(stmt)).all())
+
+    async def purge(self, older_than: timedelta) -> int:
+        """Delete entries that finished more than `older_than` ago."""
+        table = JobQueueEntry.__table__
+        stmt = delete(table).where(
+            table.c.status.in_(("done", "failed")),
+            table.c.finished_at < func.now() - older_than,
+        )
+        async with self._engine().begin() as conn:
+            return (await conn.execute(stmt)).rowcount
+
+    async def depth(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per stage: ready, delayed, running, expired-lease and failed entry
+        counts, and the age in seconds of the longest waiting ready entry.
+        Finished entries are not scanned.
+        """
+        table = JobQueueEntry.__table__
+        ready = and_(table.c.status == "queued", table.c.available_at <= func.now())
+        stmt = (
+            select(
+                table.c.stage,
+                func.count().filter(ready),
+                func.count().filter(and_(table.c.status == "queued", ~ready)),
+                func.count().filter(table.c.status == "running"),
+                func.count().filter(and_(
+                    table.c.status == "running", table.c.lease_expires_at < func.now()
+                )),
+                func.count().filter(table.c.status == "failed"),
+                func.extract("epoch", func.max(func.now() - table.c.available_at).filter(ready)),
+            )
+            .where(table.c.status.in_(("queued", "running", "failed")))
+            .group_by(table.c.stage)
+        )
+        async with self._engine().connect() as conn:
+            rows = (await conn.execute(stmt)).all()
+        return {
+            stage: {
+                "ready": ready_count,
+                "delayed": delayed,
+                "running": running,
+                "expired": expired,
+                "failed": failed,
+                "oldest_ready_s": float(oldest or 0.0),
+            }
+            for stage, ready_count, delayed, running, expired, failed, oldest in rows
+        }
+
+    async def metrics(self) -> Dict[str, Any]:
+        """Queue depth from the database plus this process's counters and latencies."""
+        return {
+            "worker_id": self.worker_id,
+            "depth": await self.depth(),
+            "counters": {stage: dict(counts) for stage, counts in self._counters.items()},
+            "queue_wait_s": {stage: h.snapshot() for stage, h in self._waits.items()},
+            "run_time_s": {stage: h.snapshot() for stage, h in self._runs.items()},
+        }
+
+    async def run(
+        self,
+        handlers: Mapping[str, Handler],
+        stop: asyncio.Event,
+        concurrency: int = 1,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        Work the queue until `stop` is set, running up to `concurrency`
+        handlers at once; `handlers` maps each stage to serve to an async
+        callable taking the QueueLease. A handler that raises fails the
+        attempt. Running handlers are awaited before returning.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        for stage in handlers:
+            _stage_priority(stage)
+        tasks: Set[asyncio.Task] = set()
+        reap_every = self.lease.total_seconds()
+        reaped = 0.0
+        stopping = asyncio.ensure_future(stop.wait())
+        try:
+            while not stop.is_set():
+                leases: List[QueueLease] = []
+                if len(tasks) < concurrency:
+                    try:
+                        leases = await self.claim(handlers, concurrency - len(tasks))
+                    except Exception:
+                        logger.exception("Claiming queue entries failed")
+                for lease in leases:
+                    tasks.add(asyncio.ensure_future(self._process(lease, handlers[lease.stage])))
+                if leases and len(tasks) < concurrency:
+                    continue
+                if not leases and time.monotonic() - reaped >= reap_every:
+                    reaped = time.monotonic()
+                    try:
+                        await self.reap()
+                    except Exception:
+                        logger.exception("Reaping expired queue entries failed")
+                done, _ = await asyncio.wait(
+                    tasks | {stopping}, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                tasks -= done
+        finally:
+            stopping.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _process(self, lease: QueueLease, handler: Handler) -> None:
+        work = asyncio.ensure_future(handler(lease))
+        beat = asyncio.ensure_future(self._keep_alive(lease, work))
+        start = time.perf_counter()
+        try:
+            await work
+        except asyncio.CancelledError:
+            if not beat.done() or not beat.result():
+                raise
+            logger.warning("Lost the lease of queue entry %s; handler cancelled", lease.id)
+            return
+        except Exception as e:
+            logger.exception("Queue entry %s (%s of job %s) failed", lease.id, lease.stage, lease.job_id)
+            await self.fail(lease, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            beat.cancel()
+            self._histogram(self._runs, lease.stage).observe(time.perf_counter() - start)
+        await self.complete(lease)
+
+    async def _keep_alive(self, lease: QueueLease, work: asyncio.Future) -> bool:
+        """Heartbeat until `work` ends; cancel it and return True if the lease is lost."""
+        interval = self.lease.total_seconds() / 3
+        while not work.done():
+            await asyncio.sleep(interval)
+            try:
+                held = await self.heartbeat(lease)
+            except Exception:
+                logger.exception("Heartbeat of queue entry %s failed", lease.id)
+                continue
+            if not held:
+                work.cancel()
+                return True
+        return False
+
+    def _count(self, stage: str, name: str) -> None:
+        counts = self._counters.setdefault(stage, {})
+        counts[name] = counts.get(name, 0) + 1
+
+    def _histogram(self, histograms: Dict[str, Histogram], stage: str) -> Histogram:
+        histogram = histograms.get(stage)
+        if histogram is None:
+            histogram = histograms[stage] = Histogram(LATENCY_BUCKETS_S)
+        return histogram
+
+    def _engine(self) -> AsyncEngine:
+        return self.bind or get_engine()
+
+
+def _held(table, lease: QueueLease) -> tuple:
+    return (
+        table.c.id == lease.id,
+        table.c.lease_token == lease.token,
+        table.c.status == "running",
+    )
+
+
+def _stage_priority(stage: str) -> int:
+    try:
+        return STAGE_PRIORITIES[stage]
+    except KeyError:
+        raise ValueError(
+            f"Unknown queue stage {stage!r}; expected one of {', '.join(STAGE_PRIORITIES)}"
+        ) from None
+
+
+@lru_cache
+def get_job_queue_service() -> JobQueueService:
+    """Shared job queue service of this process."""
+    return JobQueueService()
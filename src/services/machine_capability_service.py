@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import Select, select, union
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.postgres.invalidation import (
+    Changes, FingerprintCache, fingerprint_query, on_model_change
+)
+from ..db.postgres.models import CompanyMachineMapping, Machine
+from ..utils.machine_specs import CAPABILITIES, UNITS, machine_specs
+from .feature_spatial_index_service import parse_bounding_box
+
+
+# Machine columns machine_specs reads
+SPEC_COLUMNS = tuple(sorted(
+    {column for column, _, _ in CAPABILITIES.values()}
+    | {"axis", "a_axis", "b_axis_tilt", "c_axis_rotation"}
+))
+
+
+@dataclass(frozen=True)
+class MachineRequirement:
+    """
+    What a job needs from a machine; None means no requirement.
+
+    `size` is the part or stock envelope in mm. With `any_orientation` the
+    part may be fixtured along any axis, so it fits when its sorted sizes
+    are within the machine's sorted travels.
+    """
+
+    size: Optional[Tuple[float, float, float]] = None
+    spindle_rpm: Optional[float] = None
+    cutting_feed: Optional[float] = None
+    axes: Optional[int] = None
+    tool_count: Optional[int] = None
+    tool_diameter: Optional[float] = None
+    any_orientation: bool = True
+
+    @classmethod
+    def from_stock(cls, stock: Any, unit: str = "mm", **kwargs) -> "MachineRequirement":
+        """Requirement for a `Stock` row or object (x, y, z in `unit`)."""
+        factor = UNITS["length"][unit]
+        size = tuple(float(getattr(stock, axis) or 0.0) * factor for axis in "xyz")
+        return cls(size=size, **kwargs)
+
+    @classmethod
+    def from_bounding_box(cls, bounding_box: Any, unit: str = "mm", **kwargs) -> "MachineRequirement":
+        """Requirement for a `Job.bounding_box` value."""
+        box = parse_bounding_box(bounding_box)
+        if box is None:
+            raise ValueError(f"Not a bounding box: {bounding_box!r}")
+        factor = UNITS["length"][unit]
+        size = tuple((high - low) * factor for low, high in zip(box[:3], box[3:]))
+        return cls(size=size, **kwargs)
+
+
+class MachineCapabilityIndex:
+    """
+    Typed capability arrays of a set of machines.
+
+    Every capability of `machine_specs` is one float64 array, NaN where
+    the machine's spec does not say. Feasibility for any number of
+    requirements is computed against all machines in one pass; an unknown
+    capability passes unless `strict` is set.
+    """
+
+    def __init__(self, machines: Iterable[Any]):
+        machines = list(machines)
+        self.machine_ids = np.array([m.id for m in machines], dtype=np.int64)
+        specs = [machine_specs(m) for m in machines]
+        names = list(CAPABILITIES) + ["axes", "rotary_range", "tilt_limit"]
+        self.specs = {
+            name: np.array([s[name] for s in specs], dtype=np.float64) for name in names
+        }
+        self.travels = np.column_stack(
+            [self.specs[f"travel_{axis}"] for axis in "xyz"]
+        ).reshape(-1, 3)
+
+    def __len__(self) -> int:
+        return len(self.machine_ids)
+
+    def feasible(
+        self, requirements: Sequence[MachineRequirement], strict: bool = False
+    ) -> np.ndarray:
+        """(requirements x machines) boolean matrix."""
+        count = len(requirements)
+        result = np.ones((count, len(self)), dtype=bool)
+        if not count or not len(self):
+            return result
+
+        def column(values: Sequence[Optional[float]]) -> np.ndarray:
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)[:, None]
+
+        def at_least(capability: np.ndarray, required: np.ndarray) -> np.ndarray:
+            ok = capability[None, :] >= required
+            if not strict:
+                ok |= np.isnan(capability)[None, :]
+            return ok | np.isnan(required)
+
+        checks = (
+            ("spindle_rpm", [r.spindle_rpm for r in requirements]),
+            ("cutting_feed", [r.cutting_feed for r in requirements]),
+            ("axes", [r.axes for r in requirements]),
+            ("tool_capacity", [r.tool_count for r in requirements]),
+            ("max_tool_diameter", [r.tool_diameter for r in requirements]),
+        )
+        for name, values in checks:
+            required = column(values)
+            if not np.isnan(required).all():
+                result &= at_least(self.specs[name], required)
+
+        sized = [i for i, r in enumerate(requirements) if r.size is not None]
+        if sized:
+            result[sized] &= self._fits([requirements[i] for i in sized], strict)
+        return result
+
+    def candidates(self, requirement: MachineRequirement, strict: bool = False) -> List[int]:
+        """Ids of the machines meeting `requirement`."""
+        return self.machine_ids[self.feasible([requirement], strict)[0]].tolist()
+
+    def _fits(self, requirements: Sequence[MachineRequirement], strict: bool) -> np.ndarray:
+        sizes = np.array([r.size for r in requirements], dtype=np.float64).reshape(-1, 3)
+        rotated = np.array([r.any_orientation for r in requirements])
+        unknown = np.nan if strict else np.inf
+        travels = np.where(np.isnan(self.travels), unknown, self.travels)
+        sorted_travels = np.sort(travels, axis=1)
+
+        # (requirements x machines x axes)
+        as_given = (travels[None, :, :] >= sizes[:, None, :]).all(axis=2)
+        any_axis = (sorted_travels[None, :, :] >= np.sort(sizes, axis=1)[:, None, :]).all(axis=2)
+        return np.where(rotated[:, None], any_axis, as_given)
+
+
+class MachineCapabilityService:
+    """
+    Per-company MachineCapabilityIndex objects in a bounded LRU.
+
+    A company's machines are those it owns (`Machine.company_id`) plus
+    those mapped to it through CompanyMachineMapping. Commits in this
+    process touching a company's mappings drop its index; machine edits
+    drop every index, since a machine can be mapped to many companies.
+    Writes from other processes are caught by fingerprints of the
+    company's machines and mappings (see FingerprintCache).
+    """
+
+    def __init__(
+        self, max_companies: int = 256, ttl: float = 30.0, bind: Optional[AsyncEngine] = None
+    ):
+        self._indexes: FingerprintCache[int, MachineCapabilityIndex] = FingerprintCache(
+            self._fingerprint, self._load, max_companies, ttl, bind
+        )
+        on_model_change((Machine, CompanyMachineMapping), self._on_change)
+
+    async def get(self, company_id: int) -> MachineCapabilityIndex:
+        return await self._indexes.get(company_id)
+
+    async def feasible(
+        self, company_id: int, requirements: Sequence[MachineRequirement], strict: bool = False
+    ) -> np.ndarray:
+        return (await self.get(company_id)).feasible(requirements, strict)
+
+    async def candidates(
+        self, company_id: int, requirement: MachineRequirement, strict: bool = False
+    ) -> List[int]:
+        return (await self.get(company_id)).candidates(requirement, strict)
+
+    def invalidate_company(self, company_id: int) -> None:
+        self._indexes.invalidate(company_id)
+
+    def invalidate(self) -> None:
+        self._indexes.clear()
+
+    def _on_change(self, changes: Changes) -> None:
+        if Machine in changes:
+            self.invalidate()
+            return
+        if CompanyMachineMapping not in changes:
+            return
+        rows = changes[CompanyMachineMapping]
+        if rows is None:
+            self.invalidate()
+            return
+        for row in rows:
+            self.invalidate_company(row.get("company_id"))
+
+    @staticmethod
+    def _fingerprint(company_id: int) -> Select:
+        machines = Machine.__table__
+        mappings = CompanyMachineMapping.__table__
+        return select(
+            fingerprint_query(
+                machines, _machine_columns(), _in_company(company_id)
+            ).scalar_subquery(),
+            fingerprint_query(
+                mappings, [mappings.c.id, mappings.c.machine_id],
+                mappings.c.company_id == company_id,
+            ).scalar_subquery(),
+        )
+
+    @staticmethod
+    async def _load(conn: AsyncConnection, company_id: int) -> MachineCapabilityIndex:
+        rows = await conn.execute(
+            select(*_machine_columns())
+            .where(_in_company(company_id))
+            .order_by(Machine.__table__.c.id)
+        )
+        return MachineCapabilityIndex(rows.all())
+
+
+def _machine_columns() -> List[Any]:
+    machines = Machine.__table__
+    return [machines.c.id, *(machines.c[name] for name in SPEC_COLUMNS)]
+
+
+def _in_company(company_id: int) -> Any:
+    """Machines the company owns or has mapped."""
+    machines = Machine.__table__
+    mappings = CompanyMachineMapping.__table__
+    machine_ids = union(
+        select(machines.c.id).where(machines.c.company_id == company_id),
+        select(mappings.c.machine_id).where(mappings.c.company_id == company_id),
+    ).subquery()
+    return machines.c.id.in_(select(machine_ids.c[0]))
+
+
+@lru_cache
+def get_machine_capability_service() -> MachineCapabilityService:
+    """Shared machine capability service of this process."""
+    return MachineCapabilityService()
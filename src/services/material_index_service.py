@@ -0,0 +1,352 @@
+import asyncio
+import re
+import time
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import (
+    Changes, checksum_query, fingerprint_query, on_model_change
+)
+from ..db.postgres.models import Material, MaterialAlias
+
+
+# Columns a raw string may match, in order of preference on ties
+MATCH_FIELDS = ("name", "en_number_1", "en_number_2", "composition_or_iso")
+
+# Longest alias the material_alias key column holds
+MAX_ALIAS_LENGTH = 255
+
+# Standard prefixes that carry no identity ("AISI 304", "W.Nr. 1.4301")
+_NOISE = frozenset({
+    "AISI", "SAE", "ASTM", "UNS", "DIN", "EN", "ISO", "JIS", "GB",
+    "W", "NR", "WNR", "WERKSTOFF", "GRADE", "TYPE", "MATERIAL",
+})
+_EXPANSIONS = {
+    "SS": ("STAINLESS", "STEEL"),
+    "SST": ("STAINLESS", "STEEL"),
+    "STAINLESS": ("STAINLESS", "STEEL"),
+    "ALUMINIUM": ("ALUMINUM",),
+    "ALU": ("ALUMINUM",),
+    "AL": ("ALUMINUM",),
+    "TI": ("TITANIUM",),
+}
+_TOKEN = re.compile(r"[A-Z0-9]+")
+# "304SS" and "SS304" are "304 SS"
+_GLUED = re.compile(r"(?<=\d)(?=SST?\b)|\b(?=SST?\d)(SST?)")
+
+
+def material_tokens(value: str, expand: bool = True) -> List[str]:
+    """Uppercased tokens with standard prefixes dropped and abbreviations expanded."""
+    tokens: List[str] = []
+    for token in _TOKEN.findall(_GLUED.sub(lambda m: f" {m.group(1) or ''} ", value.upper())):
+        if token in _NOISE:
+            continue
+        for expanded in _EXPANSIONS.get(token, (token,)) if expand else (token,):
+            if not tokens or tokens[-1] != expanded:
+                tokens.append(expanded)
+    return tokens
+
+
+def normalize_material(value: str) -> str:
+    """Order-insensitive key of a raw string; also the persisted alias."""
+    return " ".join(sorted(set(material_tokens(value))))
+
+
+def _exact_keys(value: str) -> Tuple[str, ...]:
+    tokens = material_tokens(value)
+    if not tokens:
+        return ()
+    # "1.4301" and "14301", "Ti-6Al-4V" and "Ti6Al4V" compact alike
+    return ("".join(material_tokens(value, expand=False)), " ".join(sorted(set(tokens))))
+
+
+def _trigrams(value: str) -> Set[str]:
+    """pg_trgm style trigrams: each token padded with two spaces before, one after."""
+    grams: Set[str] = set()
+    for token in material_tokens(value):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class MaterialMatch:
+    """Best material for one raw string."""
+
+    material_id: int
+    name: str
+    score: float
+    source: str  # "alias", "exact" or "fuzzy"
+    matched: str  # the alias or column value that matched
+
+
+class MaterialIndex:
+    """
+    Resolve raw material strings against the material table in memory.
+
+    Every non-empty name, EN number and composition/ISO value becomes an
+    entry. A string is resolved by, in order: a manual alias of its
+    normalized form, an exact match on the compact or token-sorted form of
+    any entry (score 1.0), a learned alias, and otherwise the best trigram
+    score. Exact matches come before learned aliases, so data added later
+    overrides an earlier guess. The trigram score is the mean of the Dice
+    coefficient and the share of the string's trigrams found in the entry,
+    so a bare grade such as "304" still reaches "Stainless Steel 304".
+    Trigram scoring uses an inverted index, so a query only touches
+    entries sharing at least one trigram with it.
+    """
+
+    def __init__(
+        self,
+        materials: Iterable[Sequence],
+        aliases: Iterable[Tuple[str, int, float, str]] = (),
+    ):
+        # materials: (id, name, en_number_1, en_number_2, composition_or_iso)
+        # aliases: (alias, material_id, score, source)
+        self.names: Dict[int, str] = {}
+        self.aliases: Dict[str, Tuple[int, float, str]] = {}
+        self._exact: Dict[str, Tuple[int, str]] = {}
+
+        entry_material: List[int] = []
+        entry_value: List[str] = []
+        entry_size: List[int] = []
+        postings: Dict[str, List[int]] = {}
+
+        materials = sorted(materials, key=lambda row: row[0])
+        for position in range(len(MATCH_FIELDS)):
+            for row in materials:
+                material_id, value = row[0], row[1 + position]
+                self.names.setdefault(material_id, row[1])
+                if not value:
+                    continue
+                for key in _exact_keys(value):
+                    self._exact.setdefault(key, (material_id, value))
+                grams = _trigrams(value)
+                if not grams:
+                    continue
+                entry = len(entry_material)
+                entry_material.append(material_id)
+                entry_value.append(value)
+                entry_size.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(entry)
+
+        self._entry_material = np.asarray(entry_material, dtype=np.int64)
+        self._entry_value = entry_value
+        self._entry_size = np.asarray(entry_size, dtype=np.float64)
+        self._postings = {gram: np.asarray(entries, dtype=np.int64) for gram, entries in postings.items()}
+
+        for alias, material_id, score, source in aliases:
+            if material_id in self.names:
+                self.aliases[alias] = (material_id, score, source)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve(
+        self, values: Sequence[Optional[str]], min_score: float = 0.5
+    ) -> List[Optional[MaterialMatch]]:
+        """
+        Best match for each value, or None below `min_score`.
+
+        Values that normalize alike are resolved once per call.
+        """
+        resolved: Dict[str, Optional[MaterialMatch]] = {}
+        result: List[Optional[MaterialMatch]] = []
+        for value in values:
+            key = normalize_material(value) if value else ""
+            if key not in resolved:
+                resolved[key] = self._resolve(value, key, min_score) if key else None
+            result.append(resolved[key])
+        return result
+
+    def _resolve(self, value: str, key: str, min_score: float) -> Optional[MaterialMatch]:
+        alias = self.aliases.get(key)
+        if alias is not None and alias[2] == "manual":
+            return MaterialMatch(alias[0], self.names[alias[0]], alias[1], "alias", key)
+
+        for exact_key in _exact_keys(value):
+            hit = self._exact.get(exact_key)
+            if hit is not None:
+                return MaterialMatch(hit[0], self.names[hit[0]], 1.0, "exact", hit[1])
+
+        if alias is not None:
+            return MaterialMatch(alias[0], self.names[alias[0]], alias[1], "alias", key)
+
+        grams = _trigrams(value)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return None
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._entry_material))
+        scores = shared / (len(grams) + self._entry_size) + 0.5 * shared / len(grams)
+        # argmax keeps the first maximum: preferred column, then lowest id
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < min_score:
+            return None
+        material_id = int(self._entry_material[best])
+        return MaterialMatch(
+            material_id, self.names[material_id], round(score, 4), "fuzzy", self._entry_value[best]
+        )
+
+
+class MaterialIndexService:
+    """
+    Process-local MaterialIndex that remembers what it resolved.
+
+    Fuzzy resolutions scoring at least `learn_min_score` are written to
+    `material_alias`, so any process meets a confidently matched string's
+    normalized form through the trigram search at most once. A later,
+    better scoring match replaces a learned alias, manual aliases are never
+    replaced, and learned ones below `learn_min_score` are ignored when
+    loading. Exact matches always come from the current data and are not
+    stored. The index is rebuilt when this process commits material or
+    alias changes through the ORM, or when the fingerprint of the
+    materials or the checksum of the loaded aliases moves; checked at
+    most every `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        min_score: float = 0.5,
+        learn_min_score: float = 0.9,
+        ttl: float = 300.0,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.min_score = min_score
+        self.learn_min_score = learn_min_score
+        self.ttl = ttl
+        self.bind = bind
+        self._index: Optional[MaterialIndex] = None
+        self._fingerprint: Optional[Tuple[str, str]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        on_model_change((Material, MaterialAlias), self._on_change)
+
+    async def get(self) -> MaterialIndex:
+        if self._index is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._index
+        async with self._lock:
+            if self._index is None or time.monotonic() - self._checked_at >= self.ttl:
+                await self._load()
+            return self._index
+
+    async def resolve(
+        self,
+        values: Sequence[Optional[str]],
+        min_score: Optional[float] = None,
+        learn: bool = True,
+    ) -> List[Optional[MaterialMatch]]:
+        """
+        Resolve a batch of raw strings, persisting confident fuzzy matches
+        as aliases when `learn` is set.
+        """
+        index = await self.get()
+        matches = index.resolve(values, self.min_score if min_score is None else min_score)
+        if learn:
+            learned = {}
+            for value, match in zip(values, matches):
+                if (
+                    match is not None
+                    and match.source == "fuzzy"
+                    and match.score >= self.learn_min_score
+                ):
+                    alias = normalize_material(value)
+                    if len(alias) <= MAX_ALIAS_LENGTH:
+                        learned[alias] = match
+            if learned:
+                await self._save(index, learned)
+        return matches
+
+    async def resolve_one(self, value: Optional[str], **kwargs) -> Optional[MaterialMatch]:
+        return (await self.resolve([value], **kwargs))[0]
+
+    async def add_alias(self, value: str, material_id: int) -> None:
+        """Pin a raw string to a material, replacing any learned alias."""
+        alias = normalize_material(value)
+        if not alias:
+            raise ValueError(f"Material alias {value!r} has no usable tokens")
+        if len(alias) > MAX_ALIAS_LENGTH:
+            raise ValueError(f"Material alias {value!r} is longer than {MAX_ALIAS_LENGTH} characters")
+        table = MaterialAlias.__table__
+        stmt = insert(table).values(alias=alias, material_id=material_id, score=1.0, source="manual")
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.alias],
+            set_={
+                "material_id": stmt.excluded.material_id,
+                "score": stmt.excluded.score,
+                "source": stmt.excluded.source,
+                "updated_at": func.now(),
+            },
+        )
+        engine = self.bind or get_engine()
+        async with engine.begin() as conn:
+            await conn.execute(stmt)
+        if self._index is not None:
+            self._index.aliases[alias] = (material_id, 1.0, "manual")
+
+    def invalidate(self) -> None:
+        self._index = None
+        self._fingerprint = None
+
+    def _on_change(self, changes: Changes) -> None:
+        self.invalidate()
+
+    async def _save(self, index: MaterialIndex, learned: Dict[str, MaterialMatch]) -> None:
+        table = MaterialAlias.__table__
+        rows = [
+            {"alias": alias, "material_id": match.material_id, "score": match.score, "source": match.source}
+            for alias, match in sorted(learned.items())
+        ]
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.alias],
+            set_={
+                "material_id": stmt.excluded.material_id,
+                "score": stmt.excluded.score,
+                "source": stmt.excluded.source,
+                "updated_at": func.now(),
+            },
+            where=(table.c.source != "manual") & (table.c.score < stmt.excluded.score),
+        )
+        engine = self.bind or get_engine()
+        async with engine.begin() as conn:
+            await conn.execute(stmt, rows)
+        for alias, match in learned.items():
+            current = index.aliases.get(alias)
+            if current is None or (current[2] != "manual" and current[1] < match.score):
+                index.aliases[alias] = (match.material_id, match.score, match.source)
+
+    async def _load(self) -> None:
+        materials = Material.__table__
+        aliases = MaterialAlias.__table__
+        columns = [materials.c.id, *(materials.c[name] for name in MATCH_FIELDS)]
+        alias_columns = [aliases.c.alias, aliases.c.material_id, aliases.c.score, aliases.c.source]
+        loaded = (aliases.c.source == "manual") | (aliases.c.score >= self.learn_min_score)
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            fingerprint = tuple((await conn.execute(select(
+                fingerprint_query(materials, columns).scalar_subquery(),
+                checksum_query(aliases, alias_columns, loaded).scalar_subquery(),
+            ))).one())
+            if self._index is None or fingerprint != self._fingerprint:
+                rows = (await conn.execute(select(*columns))).all()
+                alias_rows = (await conn.execute(select(*alias_columns).where(loaded))).all()
+                self._index = MaterialIndex(rows, alias_rows)
+                self._fingerprint = fingerprint
+        self._checked_at = time.monotonic()
+
+
+@lru_cache
+def get_material_index_service() -> MaterialIndexService:
+    """Shared material index service of this process."""
+    return MaterialIndexService()
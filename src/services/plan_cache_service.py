@@ -0,0 +1,457 @@
+import inspect
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.controllers.formatted_feature_controller import iter_job_features
+from ..db.controllers.operation_plan_controller import plan_values, replace_job_plans
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import notify_model_change
+from ..db.postgres.models import (
+    Job, Machine, MachineOperationPlan, Material, OperationPlanCache,
+    OperationPlanState, Stock
+)
+from ..utils import content_hash
+from ..utils.plan_dependencies import INPUT_SCOPES, ChangeSet, diff_hashes, flagged_feature_ids
+from .policy_resolution_service import get_policy_resolution_service
+from .speed_feed_limit_service import get_speed_feed_limit_service
+
+
+# Job columns a plan is generated from
+PLAN_INPUT_COLUMNS = (
+    "id", "user_id", "features", "machine_id", "material_id", "stock_id",
+    "machine_rigidity", "policy",
+)
+
+# ... plus what OperationPlanState records about them
+SNAPSHOT_COLUMNS = PLAN_INPUT_COLUMNS + ("flagged_features",)
+
+# Snapshot input -> (model, Job column) of the row whose content it hashes
+INPUT_ROWS = {
+    "stock": (Stock, "stock_id"),
+    "machine": (Machine, "machine_id"),
+    "material": (Material, "material_id"),
+}
+
+# Row columns that say nothing about the row's content
+_UNHASHED_COLUMNS = frozenset({"id", "created_at", "updated_at"})
+
+# Attempts at writing a job's plans before giving up on a job whose rows
+# keep being rewritten concurrently
+MAX_WRITE_ATTEMPTS = 3
+
+PlanBuilder = Callable[[Any], Union[List[Any], Awaitable[List[Any]]]]
+
+
+class PlanWriteConflict(Exception):
+    """A job's plan rows were rewritten between reading and writing them."""
+
+
+def plan_key(
+    features_hash: str,
+    machine_id: Optional[int],
+    material_id: Optional[int],
+    stock_id: Optional[int],
+    machine_rigidity: Optional[str],
+    policy_hash: Optional[str],
+    version: str = "1",
+    row_hashes: Optional[Dict[str, Optional[str]]] = None,
+) -> str:
+    """
+    Content address of a plan: the hash of everything it is generated from.
+
+    `row_hashes` are the content hashes of the stock, machine and material
+    rows (JobSnapshot inputs), so in-place edits to them change the key.
+    """
+    key = {
+        "version": version,
+        "features": features_hash,
+        "machine_id": machine_id,
+        "material_id": material_id,
+        "stock_id": stock_id,
+        "machine_rigidity": machine_rigidity,
+        "policy": policy_hash,
+    }
+    if row_hashes is not None:
+        key["rows"] = row_hashes
+    return content_hash(key)
+
+
+async def resolved_policy_hash(user_id: Optional[int], policy: Any) -> Optional[str]:
+    """Hash of the policies a job is planned under: the user's set plus `Job.policy`."""
+    policy_hash = None
+    if user_id is not None:
+        policy_set = await get_policy_resolution_service().get(user_id)
+        policy_hash = policy_set.fingerprint
+    if policy:
+        policy_hash = content_hash([policy_hash, policy])
+    return policy_hash
+
+
+@dataclass
+class JobSnapshot:
+    """Hashes of a job's planning inputs, as stored in OperationPlanState."""
+
+    inputs: Dict[str, Any]
+    feature_hashes: Dict[str, str]
+    flagged: Dict[str, str]
+
+    def changes_since(self, state: OperationPlanState) -> ChangeSet:
+        return ChangeSet(
+            feature_ids=frozenset(
+                diff_hashes(state.feature_hashes, self.feature_hashes)
+                | diff_hashes(state.flagged, self.flagged)
+            ),
+            inputs=frozenset(
+                name for name in INPUT_SCOPES
+                if state.inputs.get(name) != self.inputs.get(name)
+            ),
+        )
+
+
+async def job_snapshot(
+    conn: AsyncConnection, job: Any, policy_hash: Optional[str] = None
+) -> JobSnapshot:
+    """
+    Input hashes of a job row carrying SNAPSHOT_COLUMNS.
+
+    Besides the ids, the stock, machine and material rows are hashed by
+    content, so editing one in place (new stock dimensions) shows up as a
+    change. `policy_hash` saves resolving the policies again when the
+    caller already has it.
+    """
+    feature_hashes = {}
+    for position, feature in enumerate(iter_job_features(job.features)):
+        feature_id = feature.get("feature_id", feature.get("id"))
+        feature_id = str(feature_id) if feature_id is not None else f"#{position}"
+        feature_hashes[feature_id] = content_hash(feature)
+    if policy_hash is None:
+        policy_hash = await resolved_policy_hash(job.user_id, job.policy)
+    inputs = {
+        "stock_id": job.stock_id,
+        "machine_id": job.machine_id,
+        "material_id": job.material_id,
+        "machine_rigidity": job.machine_rigidity,
+        "policy": policy_hash,
+    }
+    for name, (model, column) in INPUT_ROWS.items():
+        row_id = getattr(job, column)
+        row = None
+        if row_id is not None:
+            table = model.__table__
+            row = (await conn.execute(
+                select(*(c for c in table.columns if c.key not in _UNHASHED_COLUMNS))
+                .where(table.c.id == row_id)
+            )).one_or_none()
+        inputs[name] = content_hash(dict(row._mapping)) if row is not None else None
+    return JobSnapshot(inputs, feature_hashes, flagged_feature_ids(job.flagged_features))
+
+
+def plans_hash(plans: Sequence[Any]) -> str:
+    """Order-independent hash of plan contents (sequence included)."""
+    return content_hash(sorted(content_hash(plan_values(plan)) for plan in plans))
+
+
+async def lock_plan_state(
+    conn: AsyncConnection, job_id: int, expected_hash: Optional[str]
+) -> None:
+    """
+    Lock a job's OperationPlanState row until the end of the transaction
+    and check that its `plans_hash` is still `expected_hash` (None: no
+    state recorded), raising PlanWriteConflict otherwise.
+
+    Every writer of a job's plan rows takes this lock first, so writes
+    from different processes are serialized. A job without state gets an
+    empty placeholder row to lock, which the caller must overwrite with
+    `save_plan_state` before committing.
+    """
+    states = OperationPlanState.__table__
+    locked = select(states.c.plans_hash).where(states.c.job_id == job_id).with_for_update()
+    row = (await conn.execute(locked)).one_or_none()
+    if row is None:
+        inserted = await conn.execute(
+            insert(states)
+            .values(job_id=job_id, inputs={}, feature_hashes={}, flagged={}, plans_hash="")
+            .on_conflict_do_nothing(index_elements=[states.c.job_id])
+            .returning(states.c.job_id)
+        )
+        if inserted.first() is None:
+            # Another writer recorded a state first
+            row = (await conn.execute(locked)).one()
+    current_hash = row.plans_hash if row is not None else None
+    if current_hash != expected_hash:
+        raise PlanWriteConflict(f"Job {job_id}: plan rows were rewritten concurrently")
+
+
+async def save_plan_state(
+    conn: AsyncConnection, job_id: int, snapshot: JobSnapshot, plans: Sequence[Any]
+) -> None:
+    """Record in OperationPlanState the inputs `plans`, just written, came from."""
+    states = OperationPlanState.__table__
+    stmt = insert(states).values(
+        job_id=job_id,
+        inputs=snapshot.inputs,
+        feature_hashes=snapshot.feature_hashes,
+        flagged=snapshot.flagged,
+        plans_hash=plans_hash(plans),
+    )
+    await conn.execute(stmt.on_conflict_do_update(
+        index_elements=[states.c.job_id],
+        set_={
+            name: stmt.excluded[name]
+            for name in ("inputs", "feature_hashes", "flagged", "plans_hash")
+        },
+    ))
+
+
+@dataclass
+class PlanResult:
+    """Plans written for a job and whether they came from the cache."""
+
+    job_id: int
+    plan_key: str
+    plans: List[Dict[str, Any]]
+    cached: bool
+
+
+class PlanCacheService:
+    """
+    Content-addressed cache of generated operation plans.
+
+    A job's plan key hashes its features, machine, material and stock
+    (ids and row contents), rigidity and resolved policies (the user's
+    effective PolicySet plus the job's own `policy`), so a re-run or a
+    duplicate upload finds the plans of the first run and only rewrites
+    its MachineOperationPlan rows.
+    Entries live in `operation_plan_cache`, shared by every process, with
+    the `max_entries` most recently used also kept in memory.
+
+    Because keys are content hashes nothing needs invalidating; stale
+    entries age out instead. The table is trimmed to `max_rows` by last
+    use every `evict_every` stores, and `evict` can also drop entries by
+    age. Bump `version` when the plan generator changes what plans
+    should be.
+
+    Built plans go through the speed and feed limit stage
+    (SpeedFeedLimitService) before they are stored, so cached plans are
+    already capped to their machine; `apply_limits` turns it off. Every
+    write also records the job's OperationPlanState, so ReplanService can
+    replan only what a later edit affects.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_rows: Optional[int] = 100_000,
+        evict_every: int = 500,
+        version: str = "1",
+        apply_limits: bool = True,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self.version = version
+        self.apply_limits = apply_limits
+        self.bind = bind
+        self._memory: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._memory_hits = 0
+        self._store_hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    async def job_key(self, job: Any) -> str:
+        """Plan key of a job row carrying PLAN_INPUT_COLUMNS."""
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            snapshot = await job_snapshot(conn, job)
+        return self.snapshot_key(job, snapshot)
+
+    def snapshot_key(self, job: Any, snapshot: JobSnapshot) -> str:
+        """Plan key of a job row from its JobSnapshot."""
+        return plan_key(
+            content_hash(job.features),
+            job.machine_id,
+            job.material_id,
+            job.stock_id,
+            job.machine_rigidity,
+            snapshot.inputs["policy"],
+            self.version,
+            {name: snapshot.inputs[name] for name in INPUT_ROWS},
+        )
+
+    async def plan_job(self, job_id: int, builder: PlanBuilder) -> PlanResult:
+        """
+        Write a job's MachineOperationPlan rows, generating them only on a miss.
+
+        `builder` receives the job row (SNAPSHOT_COLUMNS) and returns the
+        plans, each a mapping or object with `setup_name`, `sequence` and
+        `operations`; it may be a coroutine function. It runs outside any
+        transaction.
+
+        The rows are written under `lock_plan_state`. If another writer
+        got there between reading the job and writing, planning starts over
+        from the job's new state (built plans are reused through the
+        in-memory cache), at most MAX_WRITE_ATTEMPTS times before
+        PlanWriteConflict is raised.
+        """
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            try:
+                return await self._plan_job(job_id, builder)
+            except PlanWriteConflict:
+                if attempt == MAX_WRITE_ATTEMPTS - 1:
+                    raise
+
+    async def _plan_job(self, job_id: int, builder: PlanBuilder) -> PlanResult:
+        table = Job.__table__
+        states = OperationPlanState.__table__
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            job = (await conn.execute(
+                select(*(table.c[name] for name in SNAPSHOT_COLUMNS))
+                .where(table.c.id == job_id)
+            )).one_or_none()
+            if job is None:
+                raise ValueError(f"Job {job_id} does not exist")
+            written_hash = (await conn.execute(
+                select(states.c.plans_hash).where(states.c.job_id == job_id)
+            )).scalar_one_or_none()
+            snapshot = await job_snapshot(conn, job)
+        key = self.snapshot_key(job, snapshot)
+
+        plans = self._memory.get(key)
+        async with engine.begin() as conn:
+            stored = await self._touch(conn, key)
+            if plans is not None:
+                self._memory_hits += 1
+                if stored is None:
+                    # Evicted from the table but not from memory
+                    await self._store(conn, key, plans)
+            elif stored is not None:
+                self._store_hits += 1
+                plans = stored
+            if plans is not None:
+                await lock_plan_state(conn, job_id, written_hash)
+                await replace_job_plans(conn, job_id, plans)
+                await save_plan_state(conn, job_id, snapshot, plans)
+        cached = plans is not None
+
+        if not cached:
+            self._misses += 1
+            built = builder(job)
+            if inspect.isawaitable(built):
+                built = await built
+            plans = [plan_values(plan) for plan in built]
+            if self.apply_limits:
+                plans = await get_speed_feed_limit_service().apply(job, plans)
+            # A retry after a conflict finds these instead of building again
+            self._remember(key, plans)
+            async with engine.begin() as conn:
+                await lock_plan_state(conn, job_id, written_hash)
+                await self._store(conn, key, plans)
+                await replace_job_plans(conn, job_id, plans)
+                await save_plan_state(conn, job_id, snapshot, plans)
+            self._stores += 1
+            if self.max_rows is not None and self._stores % self.evict_every == 0:
+                await self.evict(max_rows=self.max_rows)
+
+        self._remember(key, plans)
+        notify_model_change({MachineOperationPlan: [{"cad_feature_cache_id": job_id}]})
+        return PlanResult(job_id, key, plans, cached)
+
+    async def evict(
+        self,
+        max_rows: Optional[int] = None,
+        max_age: Optional[timedelta] = None,
+    ) -> int:
+        """
+        Drop stored entries unused for `max_age`, then all but the `max_rows`
+        most recently used. Returns the number of entries dropped.
+        """
+        table = OperationPlanCache.__table__
+        engine = self.bind or get_engine()
+        dropped = 0
+        async with engine.begin() as conn:
+            if max_age is not None:
+                result = await conn.execute(
+                    delete(table).where(table.c.last_used_at < func.now() - max_age)
+                )
+                dropped += result.rowcount
+            if max_rows is not None:
+                stale = (
+                    select(table.c.plan_key)
+                    .order_by(table.c.last_used_at.desc())
+                    .offset(max_rows)
+                )
+                result = await conn.execute(delete(table).where(table.c.plan_key.in_(stale)))
+                dropped += result.rowcount
+        if dropped:
+            self._memory.clear()
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups served by this process since start, and its hit rate."""
+        hits = self._memory_hits + self._store_hits
+        lookups = hits + self._misses
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "memory_hits": self._memory_hits,
+            "store_hits": self._store_hits,
+            "misses": self._misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+    async def store_stats(self) -> Dict[str, int]:
+        """Entries in the shared table and the hits recorded on them."""
+        table = OperationPlanCache.__table__
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            row = (await conn.execute(select(
+                func.count().label("entries"),
+                func.coalesce(func.sum(table.c.hit_count), 0).label("hits"),
+            ))).one()
+        return {"entries": row.entries, "hits": int(row.hits)}
+
+    def invalidate(self) -> None:
+        """Forget the in-memory entries; the table is left alone."""
+        self._memory.clear()
+
+    def _remember(self, key: str, plans: List[Dict[str, Any]]) -> None:
+        self._memory[key] = plans
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _touch(self, conn: AsyncConnection, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Record a use of a stored entry and return its plans, if stored."""
+        table = OperationPlanCache.__table__
+        result = await conn.execute(
+            update(table)
+            .where(table.c.plan_key == key)
+            .values(hit_count=table.c.hit_count + 1, last_used_at=func.now())
+            .returning(table.c.plans)
+        )
+        return result.scalar_one_or_none()
+
+    async def _store(self, conn: AsyncConnection, key: str, plans: List[Dict[str, Any]]) -> None:
+        table = OperationPlanCache.__table__
+        stmt = insert(table).values(plan_key=key, plans=plans)
+        await conn.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.plan_key],
+            set_={"plans": stmt.excluded.plans, "last_used_at": func.now()},
+        ))
+
+
+@lru_cache
+def get_plan_cache_service() -> PlanCacheService:
+    """Shared plan cache service of this process."""
+    return PlanCacheService()
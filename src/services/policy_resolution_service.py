@@ -0,0 +1,330 @@
+import asyncio
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import Changes, fingerprint_query, on_model_change
+from ..db.postgres.models import DefaultPolicyV2, UserDefaultPolicyExclusion, UserPolicy
+from ..utils import content_hash
+from ..utils.predicates import Predicate, compile_predicate
+from .taxonomy_index_service import TaxonomyIndex
+
+
+PolicyKey = Tuple[int, str, str]
+
+
+@dataclass(frozen=True)
+class ResolvedPolicy:
+    """One policy of a user's effective set, from either source."""
+
+    id: int
+    source: str  # "default" or "user"
+    operation_id: int
+    tier: str
+    tool_taxonomy_code: str
+    applies_if: Dict
+    constraints: Dict
+    preferences: Dict
+
+    @property
+    def key(self) -> PolicyKey:
+        return (self.operation_id, self.tier, self.tool_taxonomy_code)
+
+    @property
+    def predicate(self) -> Predicate:
+        """Compiled `applies_if`, shared by every policy with the same one."""
+        return compile_predicate(self.applies_if)
+
+
+class PolicySet:
+    """
+    A user's effective policies indexed by (operation_id, tier, taxonomy code).
+
+    Within a key the user's own policies come before the defaults, each in
+    id order.
+    """
+
+    def __init__(self, user_id: int, policies: Iterable[ResolvedPolicy]):
+        self.user_id = user_id
+        self.policies = sorted(policies, key=lambda p: (p.source != "user", p.id))
+        self._by_key: Dict[PolicyKey, List[ResolvedPolicy]] = {}
+        for policy in self.policies:
+            self._by_key.setdefault(policy.key, []).append(policy)
+        self._fingerprint: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.policies)
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the effective policies, for keying derived results."""
+        if self._fingerprint is None:
+            self._fingerprint = content_hash([
+                (p.source, p.id, *p.key, p.applies_if, p.constraints, p.preferences)
+                for p in self.policies
+            ])
+        return self._fingerprint
+
+    def keys(self) -> List[PolicyKey]:
+        return list(self._by_key)
+
+    def get(self, operation_id: int, tier: str, tool_taxonomy_code) -> List[ResolvedPolicy]:
+        """Policies registered for exactly this key."""
+        return self._by_key.get((operation_id, tier, str(tool_taxonomy_code)), [])
+
+    def resolve(
+        self,
+        operation_id: int,
+        tier: str,
+        tool_taxonomy_code,
+        taxonomy: Optional[TaxonomyIndex] = None,
+    ) -> List[ResolvedPolicy]:
+        """
+        Policies for a key, falling back to the nearest taxonomy ancestor
+        that has any when `taxonomy` is given.
+        """
+        code = str(tool_taxonomy_code)
+        policies = self.get(operation_id, tier, code)
+        if policies or taxonomy is None or code not in taxonomy:
+            return policies
+        for ancestor in reversed(taxonomy.ancestors(code)):
+            policies = self.get(operation_id, tier, ancestor)
+            if policies:
+                return policies
+        return []
+
+
+@dataclass
+class _UserEntry:
+    excluded: FrozenSet[int]
+    policies: List[ResolvedPolicy]
+    fingerprint: str
+    checked_at: float
+    defaults_version: int = -1
+    merged: Optional[PolicySet] = field(default=None, repr=False)
+
+
+class PolicyResolutionService:
+    """
+    Build and cache each user's effective policy set.
+
+    Defaults are loaded once and shared by every user; per user only the
+    exclusions and own policies are loaded, and the merged set is rebuilt
+    from memory when either side changes. At most `max_users` users are
+    kept, least recently used first out.
+
+    Commits in this process that touch a user's exclusions or policies drop
+    only that user's entry; a change to the defaults rebuilds every merged
+    set on next access. Writes from other processes are caught by content
+    fingerprints, re-checked at most every `ttl` seconds. A load that such
+    a commit overtakes is used for the call that made it but not cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_users: int = 1024,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.bind = bind
+        self._defaults: Optional[Dict[int, ResolvedPolicy]] = None
+        self._defaults_fingerprint: Optional[str] = None
+        self._defaults_checked_at = 0.0
+        self._defaults_version = 0
+        # Bumped by every invalidation of the defaults; a defaults load
+        # caches its result only if this did not move while it ran
+        self._defaults_generation = 0
+        self._users: "OrderedDict[int, _UserEntry]" = OrderedDict()
+        # User id -> generation of the load in flight, bumped by invalidation
+        self._loading: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        on_model_change(
+            (DefaultPolicyV2, UserDefaultPolicyExclusion, UserPolicy), self._on_change
+        )
+
+    async def get(self, user_id: int) -> PolicySet:
+        """Return the user's effective policy set."""
+        now = time.monotonic()
+        entry = self._users.get(user_id)
+        defaults, version = self._defaults, self._defaults_version
+        if (
+            entry is None
+            or now - entry.checked_at >= self.ttl
+            or defaults is None
+            or now - self._defaults_checked_at >= self.ttl
+        ):
+            async with self._lock:
+                entry, defaults, version = await self._refresh(user_id)
+
+        if entry.merged is None or entry.defaults_version != version:
+            merged = [
+                policy for policy_id, policy in defaults.items()
+                if policy_id not in entry.excluded
+            ]
+            entry.merged = PolicySet(user_id, merged + entry.policies)
+            entry.defaults_version = version
+
+        if user_id in self._users:
+            self._users.move_to_end(user_id)
+        return entry.merged
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+        if user_id in self._loading:
+            self._loading[user_id] += 1
+
+    def invalidate(self) -> None:
+        """Forget the defaults and every user."""
+        self._invalidate_defaults()
+        self._defaults_fingerprint = None
+        self._invalidate_users()
+
+    def _invalidate_defaults(self) -> None:
+        self._defaults = None
+        self._defaults_generation += 1
+
+    def _invalidate_users(self) -> None:
+        self._users.clear()
+        for user_id in self._loading:
+            self._loading[user_id] += 1
+
+    def _on_change(self, changes: Changes) -> None:
+        if DefaultPolicyV2 in changes:
+            self._invalidate_defaults()
+        for model in (UserDefaultPolicyExclusion, UserPolicy):
+            if model not in changes:
+                continue
+            rows = changes[model]
+            if rows is None:
+                self._invalidate_users()
+                continue
+            for row in rows:
+                self.invalidate_user(row.get("user_id"))
+
+    async def _refresh(
+        self, user_id: int
+    ) -> Tuple[_UserEntry, Dict[int, ResolvedPolicy], int]:
+        """
+        The user's entry with the defaults to merge it with and their
+        version; the defaults are returned rather than read back from the
+        service, which a commit may have cleared in the meantime.
+        """
+        engine = self.bind or get_engine()
+        self._loading[user_id] = 0
+        try:
+            async with engine.connect() as conn:
+                now = time.monotonic()
+                defaults, version = self._defaults, self._defaults_version
+                if defaults is None or now - self._defaults_checked_at >= self.ttl:
+                    defaults, version = await self._refresh_defaults(conn)
+
+                entry = self._users.get(user_id)
+                if entry is None or now - entry.checked_at >= self.ttl:
+                    fingerprint = (await conn.execute(self._user_fingerprint(user_id))).scalar()
+                    if entry is None or entry.fingerprint != fingerprint:
+                        entry = await self._load_user(conn, user_id, fingerprint)
+                    entry.checked_at = time.monotonic()
+                    if self._loading[user_id] == 0:
+                        self._users[user_id] = entry
+                        while len(self._users) > self.max_users:
+                            self._users.popitem(last=False)
+        finally:
+            del self._loading[user_id]
+        return entry, defaults, version
+
+    async def _refresh_defaults(
+        self, conn: AsyncConnection
+    ) -> Tuple[Dict[int, ResolvedPolicy], int]:
+        generation = self._defaults_generation
+        defaults, version = self._defaults, self._defaults_version
+        table = DefaultPolicyV2.__table__
+        fingerprint = (await conn.execute(
+            fingerprint_query(table, [
+                table.c.id, table.c.tier, table.c.operation_id, table.c.tool_taxonomy_code,
+                table.c.applies_if, table.c.constraints, table.c.preferences,
+            ])
+        )).scalar()
+        if defaults is None or fingerprint != self._defaults_fingerprint:
+            rows = await conn.execute(select(table))
+            defaults = {row.id: _to_policy(row, "default") for row in rows}
+            self._defaults_version += 1
+            version = self._defaults_version
+        if generation == self._defaults_generation:
+            self._defaults, self._defaults_fingerprint = defaults, fingerprint
+            self._defaults_checked_at = time.monotonic()
+        return defaults, version
+
+    def _user_fingerprint(self, user_id: int):
+        exclusions = UserDefaultPolicyExclusion.__table__
+        policies = UserPolicy.__table__
+        return select(
+            fingerprint_query(
+                exclusions,
+                [exclusions.c.default_policy_id, exclusions.c.is_active],
+                exclusions.c.user_id == user_id,
+            ).scalar_subquery().concat("/").concat(
+                fingerprint_query(
+                    policies,
+                    [
+                        policies.c.id, policies.c.tier, policies.c.operation_id,
+                        policies.c.tool_taxonomy_code, policies.c.is_active,
+                        policies.c.is_deleted, policies.c.applies_if,
+                        policies.c.constraints, policies.c.preferences,
+                    ],
+                    policies.c.user_id == user_id,
+                ).scalar_subquery()
+            )
+        )
+
+    async def _load_user(
+        self, conn: AsyncConnection, user_id: int, fingerprint: str
+    ) -> _UserEntry:
+        exclusions = UserDefaultPolicyExclusion.__table__
+        policies = UserPolicy.__table__
+        excluded = await conn.execute(
+            select(exclusions.c.default_policy_id).where(
+                exclusions.c.user_id == user_id,
+                exclusions.c.is_active.is_(True),
+            )
+        )
+        rows = await conn.execute(
+            select(policies).where(
+                policies.c.user_id == user_id,
+                policies.c.is_active.is_(True),
+                policies.c.is_deleted.is_(False),
+            )
+        )
+        return _UserEntry(
+            excluded=frozenset(excluded.scalars()),
+            policies=[_to_policy(row, "user") for row in rows],
+            fingerprint=fingerprint,
+            checked_at=time.monotonic(),
+        )
+
+
+def _to_policy(row, source: str) -> ResolvedPolicy:
+    return ResolvedPolicy(
+        id=row.id,
+        source=source,
+        operation_id=row.operation_id,
+        tier=row.tier,
+        tool_taxonomy_code=str(row.tool_taxonomy_code),
+        applies_if=row.applies_if,
+        constraints=row.constraints,
+        preferences=row.preferences,
+    )
+
+
+@lru_cache
+def get_policy_resolution_service() -> PolicyResolutionService:
+    """Shared policy resolution service of this process."""
+    return PolicyResolutionService()
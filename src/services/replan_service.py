@@ -0,0 +1,193 @@
+import asyncio
+import inspect
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import (
+    Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Union
+)
+from weakref import WeakValueDictionary
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.controllers.operation_plan_controller import (
+    load_job_plans, plan_values, write_plan_diff
+)
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import notify_model_change
+from ..db.postgres.models import Job, MachineOperationPlan, OperationPlanState
+from ..utils.plan_dependencies import ChangeSet, PlanDependencies, merge_plans
+from .plan_cache_service import (
+    MAX_WRITE_ATTEMPTS, SNAPSHOT_COLUMNS, JobSnapshot, PlanWriteConflict,
+    job_snapshot, lock_plan_state, plans_hash, save_plan_state
+)
+from .speed_feed_limit_service import get_speed_feed_limit_service
+
+
+REPLAN_COLUMNS = SNAPSHOT_COLUMNS
+
+
+@dataclass(frozen=True)
+class ReplanScope:
+    """
+    What a partial replan must produce.
+
+    The builder returns replacement setups for `setups` covering
+    `feature_ids`: the features of those setups that still exist plus
+    features no setup machined yet.
+    """
+
+    feature_ids: FrozenSet[str]
+    setups: List[Dict[str, Any]]
+    changes: ChangeSet
+
+
+# builder(job, scope) -> plans; scope is None for a full plan
+ReplanBuilder = Callable[
+    [Any, Optional[ReplanScope]], Union[List[Any], Awaitable[List[Any]]]
+]
+
+
+@dataclass
+class ReplanResult:
+    job_id: int
+    full: bool
+    changes: ChangeSet
+    # Sequences, before the replan, of the setups that were recomputed
+    replanned: List[int] = field(default_factory=list)
+    written: Dict[str, int] = field(default_factory=dict)
+
+
+class ReplanService:
+    """
+    Recompute only the setups of a job's plan that its edits affect.
+
+    Every write, here or through PlanCacheService, records the job's input
+    hashes in OperationPlanState; the stock, machine and material count by
+    the content of their rows, so editing them in place is a change. On the
+    next replan they are compared with the job's current features, flags
+    and inputs; the changed feature ids and inputs are mapped through the
+    plan's dependencies (PlanDependencies) to the setups that use them, and
+    the builder is asked for replacements of those setups only. The merged
+    plan is written back as a row-level diff, so untouched setups keep
+    their rows.
+
+    Changes to the machine, material, rigidity or policies, plans with no
+    recorded state, and plan rows rewritten by anything else get a full
+    replan. The diff is written under `lock_plan_state`, after checking
+    that the rows are still the ones it was computed from; if another
+    process rewrote them meanwhile, the replan starts over. Built setups
+    go through the speed and feed limit stage unless `apply_limits` is off.
+    """
+
+    def __init__(self, apply_limits: bool = True, bind: Optional[AsyncEngine] = None):
+        self.apply_limits = apply_limits
+        self.bind = bind
+        self._locks: "WeakValueDictionary[int, asyncio.Lock]" = WeakValueDictionary()
+
+    async def snapshot(self, job: Any, conn: Optional[AsyncConnection] = None) -> JobSnapshot:
+        """Input hashes of a job row carrying REPLAN_COLUMNS."""
+        if conn is not None:
+            return await job_snapshot(conn, job)
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            return await job_snapshot(conn, job)
+
+    async def replan(
+        self, job_id: int, builder: ReplanBuilder, full: bool = False
+    ) -> ReplanResult:
+        """
+        Bring a job's plan up to date with its current inputs.
+
+        `builder(job, scope)` gets the job row (REPLAN_COLUMNS) and either
+        None, meaning plan the whole job, or a ReplanScope; it returns plans
+        as mappings or objects with `setup_name`, `sequence` and
+        `operations`, and may be a coroutine function. With `full` the whole
+        job is replanned regardless of what changed. Raises
+        PlanWriteConflict if the job's rows were rewritten concurrently on
+        each of MAX_WRITE_ATTEMPTS attempts.
+        """
+        # Saves replans in this process from building only to conflict
+        lock = self._locks.get(job_id)
+        if lock is None:
+            lock = self._locks[job_id] = asyncio.Lock()
+        async with lock:
+            for attempt in range(MAX_WRITE_ATTEMPTS):
+                try:
+                    return await self._replan(job_id, builder, full)
+                except PlanWriteConflict:
+                    if attempt == MAX_WRITE_ATTEMPTS - 1:
+                        raise
+
+    async def _replan(self, job_id: int, builder: ReplanBuilder, full: bool) -> ReplanResult:
+        jobs = Job.__table__
+        states = OperationPlanState.__table__
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            job = (await conn.execute(
+                select(*(jobs.c[name] for name in REPLAN_COLUMNS)).where(jobs.c.id == job_id)
+            )).one_or_none()
+            if job is None:
+                raise ValueError(f"Job {job_id} does not exist")
+            current = await load_job_plans(conn, job_id)
+            state = (await conn.execute(
+                select(states).where(states.c.job_id == job_id)
+            )).one_or_none()
+            snapshot = await self.snapshot(job, conn)
+
+        stale = state is None or state.plans_hash != plans_hash(current)
+        changes = ChangeSet() if stale else snapshot.changes_since(state)
+        if full or stale or not current or changes.replans_all:
+            plans = await self._build(builder, job, None)
+            result = ReplanResult(job_id, True, changes, [p["sequence"] for p in current])
+        elif not changes:
+            return ReplanResult(job_id, False, changes)
+        else:
+            deps = PlanDependencies.of(current)
+            affected = deps.affected(changes)
+            unplanned = (changes.feature_ids - deps.features.keys()) & snapshot.feature_hashes.keys()
+            plans = current
+            if affected or unplanned:
+                in_affected = {
+                    feature_id for feature_id, positions in deps.features.items()
+                    if positions & affected
+                }
+                scope = ReplanScope(
+                    feature_ids=frozenset(
+                        (in_affected & snapshot.feature_hashes.keys()) | unplanned
+                    ),
+                    setups=[current[position] for position in sorted(affected)],
+                    changes=changes,
+                )
+                plans = merge_plans(current, affected, await self._build(builder, job, scope))
+            result = ReplanResult(
+                job_id, False, changes, [current[position]["sequence"] for position in sorted(affected)]
+            )
+
+        async with engine.begin() as conn:
+            await lock_plan_state(conn, job_id, state.plans_hash if state is not None else None)
+            if await load_job_plans(conn, job_id) != current:
+                raise PlanWriteConflict(f"Job {job_id}: plan rows changed while replanning")
+            result.written = await write_plan_diff(conn, job_id, current, plans)
+            await save_plan_state(conn, job_id, snapshot, plans)
+        if any(result.written[name] for name in ("inserted", "updated", "deleted")):
+            notify_model_change({MachineOperationPlan: [{"cad_feature_cache_id": job_id}]})
+        return result
+
+    async def _build(
+        self, builder: ReplanBuilder, job: Any, scope: Optional[ReplanScope]
+    ) -> List[Dict[str, Any]]:
+        built = builder(job, scope)
+        if inspect.isawaitable(built):
+            built = await built
+        plans = [plan_values(plan) for plan in built]
+        if self.apply_limits:
+            plans = await get_speed_feed_limit_service().apply(job, plans)
+        return plans
+
+
+@lru_cache
+def get_replan_service() -> ReplanService:
+    """Shared replan service of this process."""
+    return ReplanService()
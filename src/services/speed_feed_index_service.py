@@ -0,0 +1,378 @@
+import asyncio
+import time
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import Changes, checksum_query, on_model_change
+from ..db.postgres.models import SpeedAndFeed, Tool
+
+
+# Cutting data columns, interpolated by diameter when no row covers a tool
+VALUE_FIELDS = (
+    "spindle_speed",
+    "surface_speed",
+    "cutting_feedrate",
+    "feed_per_tooth",
+    "stepdown",
+    "stepover",
+    "plunge_feedrate",
+    "retract_feedrate",
+)
+
+PRESET_DTYPE = np.dtype(
+    [
+        ("id", np.int64),
+        ("tool_id", np.int64),
+        ("operation_id", np.int64),
+        # Codes into SpeedFeedIndex.strings, -1 for NULL
+        ("material", np.int32),
+        ("preset_name", np.int32),
+        # NULL bounds are stored as -inf / +inf: open ended
+        ("hardness_min_hb", np.float64),
+        ("hardness_max_hb", np.float64),
+        ("diameter", np.float64),
+    ]
+    + [(name, np.float64) for name in VALUE_FIELDS]
+)
+
+
+@dataclass
+class SpeedFeedMatch:
+    """Presets covering one query; synthesized when `interpolated` is set."""
+
+    tool_id: int
+    operation_id: int
+    hardness_hb: float
+    rows: np.ndarray
+    interpolated: bool = False
+    # Tools whose rows were blended for an interpolated match
+    source_tool_ids: Tuple[int, ...] = ()
+
+    def __bool__(self) -> bool:
+        return len(self.rows) > 0
+
+    def best(self) -> Optional[np.void]:
+        """The matching row with the narrowest hardness range."""
+        if not len(self.rows):
+            return None
+        width = self.rows["hardness_max_hb"] - self.rows["hardness_min_hb"]
+        return self.rows[int(np.argmin(width))]
+
+
+class SpeedFeedIndex:
+    """
+    Columnar store of speed and feed presets with hardness interval lookups.
+
+    All presets live in one NumPy structured array sorted by tool,
+    operation and lower hardness bound; each (tool, operation) group is a
+    contiguous slice. A stabbing query binary-searches the group's sorted
+    lower bounds and filters the candidates by upper bound, and queries
+    hitting the same group are answered together as one broadcast.
+
+    When a tool has no covering preset, the nearest smaller and larger
+    diameter tools of the same tool type that do are blended linearly by
+    diameter.
+    """
+
+    def __init__(
+        self,
+        presets: np.ndarray,
+        strings: Sequence[str],
+        tools: np.ndarray,
+    ):
+        order = np.lexsort((presets["hardness_min_hb"], presets["operation_id"], presets["tool_id"]))
+        self.presets = presets[order]
+        self.strings = list(strings)
+        self._codes = {value: code for code, value in enumerate(self.strings)}
+
+        self._groups: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if len(self.presets):
+            keys = np.stack([self.presets["tool_id"], self.presets["operation_id"]], axis=1)
+            starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+            ends = np.r_[starts[1:], len(self.presets)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._groups[(int(keys[start, 0]), int(keys[start, 1]))] = (start, end)
+
+        # tools: structured array of (id, tool_type_id, diameter)
+        self._tool_row = {int(tool_id): i for i, tool_id in enumerate(tools["id"])}
+        self._tools = tools
+        # (tool_type_id, operation_id) -> tool ids and diameters with presets, by diameter
+        neighbours: Dict[Tuple[int, int], List[Tuple[float, int]]] = {}
+        for tool_id, operation_id in self._groups:
+            row = self._tool_row.get(tool_id)
+            if row is None or np.isnan(tools["diameter"][row]):
+                continue
+            key = (int(tools["tool_type_id"][row]), operation_id)
+            neighbours.setdefault(key, []).append((float(tools["diameter"][row]), tool_id))
+        self._neighbours = {
+            key: (
+                np.array([d for d, _ in sorted(pairs)]),
+                np.array([t for _, t in sorted(pairs)], dtype=np.int64),
+            )
+            for key, pairs in neighbours.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.presets)
+
+    def material_code(self, material: Optional[str]) -> Optional[int]:
+        """Code of a material name; None for "any material", -2 if unknown."""
+        if material is None:
+            return None
+        return self._codes.get(material, -2)
+
+    def decode(self, row: np.void) -> Dict:
+        """A preset record as a plain dict with its strings restored."""
+        values = {name: row[name].item() for name in PRESET_DTYPE.names}
+        for name in ("material", "preset_name"):
+            values[name] = self.strings[values[name]] if values[name] >= 0 else None
+        for name in ("hardness_min_hb", "hardness_max_hb", *VALUE_FIELDS):
+            if not np.isfinite(values[name]):
+                values[name] = None
+        return values
+
+    def lookup(
+        self,
+        tool_ids: Sequence[int],
+        operation_ids: Sequence[int],
+        hardness_hb: Sequence[float],
+        materials: Optional[Sequence[Optional[str]]] = None,
+        interpolate: bool = True,
+    ) -> List[SpeedFeedMatch]:
+        """
+        Presets covering each (tool, operation, hardness[, material]) query.
+
+        A `None` material matches presets of any material. Queries sharing
+        a (tool, operation) group are evaluated together.
+        """
+        tool_ids = np.asarray(tool_ids, dtype=np.int64)
+        operation_ids = np.asarray(operation_ids, dtype=np.int64)
+        hardness = np.asarray(hardness_hb, dtype=np.float64)
+        codes = [self.material_code(m) for m in materials] if materials is not None else [None] * len(tool_ids)
+
+        rows = self._stab_batch(tool_ids, operation_ids, hardness, codes)
+        matches = [
+            SpeedFeedMatch(int(t), int(o), float(h), self.presets[r])
+            for t, o, h, r in zip(tool_ids, operation_ids, hardness, rows)
+        ]
+        if interpolate:
+            for i, match in enumerate(matches):
+                if not match:
+                    blended = self._interpolate(match.tool_id, match.operation_id, match.hardness_hb, codes[i])
+                    if blended is not None:
+                        matches[i] = blended
+        return matches
+
+    def _stab_batch(
+        self,
+        tool_ids: np.ndarray,
+        operation_ids: np.ndarray,
+        hardness: np.ndarray,
+        codes: Sequence[Optional[int]],
+    ) -> List[np.ndarray]:
+        by_group: Dict[Tuple[int, int], List[int]] = {}
+        for i, key in enumerate(zip(tool_ids.tolist(), operation_ids.tolist())):
+            by_group.setdefault(key, []).append(i)
+
+        empty = np.empty(0, dtype=np.int64)
+        result: List[np.ndarray] = [empty] * len(tool_ids)
+        for key, queries in by_group.items():
+            span = self._groups.get(key)
+            if span is None:
+                continue
+            start, end = span
+            group = self.presets[start:end]
+            q = np.asarray(queries)
+            h = hardness[q]
+            # Lower bounds are sorted: candidates are a prefix of the group
+            limit = np.searchsorted(group["hardness_min_hb"], h, side="right")
+            covered = (
+                (np.arange(end - start)[None, :] < limit[:, None])
+                & (group["hardness_max_hb"][None, :] >= h[:, None])
+            )
+            wanted = np.array([-3 if codes[i] is None else codes[i] for i in queries])
+            covered &= (wanted[:, None] == -3) | (group["material"][None, :] == wanted[:, None])
+            for query, mask in zip(queries, covered):
+                result[query] = start + np.flatnonzero(mask)
+        return result
+
+    def _interpolate(
+        self, tool_id: int, operation_id: int, hardness: float, code: Optional[int]
+    ) -> Optional[SpeedFeedMatch]:
+        row = self._tool_row.get(tool_id)
+        if row is None:
+            return None
+        diameter = float(self._tools["diameter"][row])
+        key = (int(self._tools["tool_type_id"][row]), operation_id)
+        if np.isnan(diameter) or key not in self._neighbours:
+            return None
+
+        diameters, tools = self._neighbours[key]
+        lower = int(np.searchsorted(diameters, diameter, side="right")) - 1
+        upper = lower + 1
+        # Walk outwards to the nearest neighbours that actually cover the query
+        below = above = None
+        while lower >= 0 and below is None:
+            below = self._best_row(int(tools[lower]), operation_id, hardness, code)
+            lower -= 1
+        while upper < len(tools) and above is None:
+            above = self._best_row(int(tools[upper]), operation_id, hardness, code)
+            upper += 1
+        if below is None or above is None:
+            return None
+
+        low, high = self.presets[below], self.presets[above]
+        span = high["diameter"] - low["diameter"]
+        weight = 0.0 if span == 0 else (diameter - low["diameter"]) / span
+
+        blended = np.zeros(1, dtype=PRESET_DTYPE)
+        blended["id"] = -1
+        blended["tool_id"] = tool_id
+        blended["operation_id"] = operation_id
+        blended["material"] = low["material"] if low["material"] == high["material"] else -1
+        blended["preset_name"] = -1
+        blended["hardness_min_hb"] = max(low["hardness_min_hb"], high["hardness_min_hb"])
+        blended["hardness_max_hb"] = min(low["hardness_max_hb"], high["hardness_max_hb"])
+        blended["diameter"] = diameter
+        for name in VALUE_FIELDS:
+            a, b = low[name], high[name]
+            if np.isnan(a) or np.isnan(b):
+                blended[name] = b if np.isnan(a) else a
+            else:
+                blended[name] = a + (b - a) * weight
+        return SpeedFeedMatch(
+            tool_id, operation_id, hardness, blended,
+            interpolated=True,
+            source_tool_ids=(int(low["tool_id"]), int(high["tool_id"])),
+        )
+
+    def _best_row(
+        self, tool_id: int, operation_id: int, hardness: float, code: Optional[int]
+    ) -> Optional[int]:
+        rows = self._stab_batch(
+            np.array([tool_id]), np.array([operation_id]), np.array([hardness]), [code]
+        )[0]
+        if not len(rows):
+            return None
+        width = self.presets["hardness_max_hb"][rows] - self.presets["hardness_min_hb"][rows]
+        return int(rows[np.argmin(width)])
+
+
+class SpeedFeedIndexService:
+    """
+    Process-local SpeedFeedIndex, loaded in one pass over the table.
+
+    Dropped when this process commits a change to presets or tools; other
+    writers are caught by a checksum (`checksum_query`) of the indexed
+    columns of both tables, checked at most every `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 60.0, bind: Optional[AsyncEngine] = None):
+        self.ttl = ttl
+        self.bind = bind
+        self._index: Optional[SpeedFeedIndex] = None
+        self._fingerprint: Optional[Tuple[str, str]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        on_model_change((SpeedAndFeed, Tool), self._on_change)
+
+    async def get(self) -> SpeedFeedIndex:
+        if self._index is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._index
+        async with self._lock:
+            if self._index is None or time.monotonic() - self._checked_at >= self.ttl:
+                await self._load()
+            return self._index
+
+    async def lookup(self, *args, **kwargs) -> List[SpeedFeedMatch]:
+        """`SpeedFeedIndex.lookup` on the current index."""
+        return (await self.get()).lookup(*args, **kwargs)
+
+    def invalidate(self) -> None:
+        self._index = None
+        self._fingerprint = None
+
+    def _on_change(self, changes: Changes) -> None:
+        self.invalidate()
+
+    async def _load(self) -> None:
+        presets, tools = SpeedAndFeed.__table__, Tool.__table__
+        preset_columns = [
+            presets.c.id, presets.c.tool_id, presets.c.operation_id,
+            presets.c.material, presets.c.preset_name,
+            presets.c.hardness_min_hb, presets.c.hardness_max_hb,
+            *(presets.c[name] for name in VALUE_FIELDS),
+        ]
+        tool_columns = [tools.c.id, tools.c.tool_type_id, tools.c.diameter]
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            fingerprint = tuple((await conn.execute(select(
+                checksum_query(presets, preset_columns).scalar_subquery(),
+                checksum_query(tools, tool_columns).scalar_subquery(),
+            ))).one())
+            if self._index is None or fingerprint != self._fingerprint:
+                preset_rows = (await conn.execute(
+                    select(*preset_columns[:7], tools.c.diameter, *preset_columns[7:])
+                    .join(tools, tools.c.id == presets.c.tool_id)
+                )).all()
+                tool_rows = (await conn.execute(select(*tool_columns))).all()
+                self._index = build_index(preset_rows, tool_rows)
+                self._fingerprint = fingerprint
+        self._checked_at = time.monotonic()
+
+
+def build_index(preset_rows: Iterable[Sequence], tool_rows: Iterable[Sequence]) -> SpeedFeedIndex:
+    """
+    Build an index from plain rows.
+
+    `preset_rows` hold (id, tool_id, operation_id, material, preset_name,
+    hardness_min_hb, hardness_max_hb, diameter, *VALUE_FIELDS) and
+    `tool_rows` hold (id, tool_type_id, diameter).
+    """
+    strings: List[str] = []
+    codes: Dict[str, int] = {}
+
+    def encode(value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(strings)
+            strings.append(value)
+        return code
+
+    def number(value, missing=np.nan) -> float:
+        return missing if value is None else float(value)
+
+    preset_rows = list(preset_rows)
+    presets = np.zeros(len(preset_rows), dtype=PRESET_DTYPE)
+    for i, row in enumerate(preset_rows):
+        id_, tool_id, operation_id, material, preset_name, low, high, diameter, *values = row
+        presets[i] = (
+            id_, tool_id, operation_id, encode(material), encode(preset_name),
+            number(low, -np.inf), number(high, np.inf), number(diameter),
+            *(number(value) for value in values),
+        )
+
+    tool_rows = list(tool_rows)
+    tools = np.zeros(
+        len(tool_rows),
+        dtype=[("id", np.int64), ("tool_type_id", np.int64), ("diameter", np.float64)],
+    )
+    for i, (tool_id, tool_type_id, diameter) in enumerate(tool_rows):
+        tools[i] = (tool_id, tool_type_id, number(diameter))
+    return SpeedFeedIndex(presets, strings, tools)
+
+
+@lru_cache
+def get_speed_feed_index_service() -> SpeedFeedIndexService:
+    """Shared speed and feed index service of this process."""
+    return SpeedFeedIndexService()
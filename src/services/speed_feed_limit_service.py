@@ -0,0 +1,122 @@
+import asyncio
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import Changes, on_model_change
+from ..db.postgres.models import Machine
+from ..utils.machine_specs import UNITS, machine_specs
+from ..utils.speed_feed_limits import (
+    VALUE_FIELDS, MachineLimits, clamp_plan_operations, clamp_presets
+)
+from .machine_capability_service import SPEC_COLUMNS
+
+
+class SpeedFeedLimitService:
+    """
+    Planning stage capping a plan's speeds and feeds to its machine.
+
+    Machine specs are parsed once per machine and kept in a bounded LRU,
+    dropped when a commit in this process touches the machine. The job's
+    `machine_rigidity` level takes precedence over the machine's own
+    rigidity. Feeds in the plans are taken to be in `feed_unit`.
+
+    `apply` is the stage PlanCacheService and ReplanService run on every
+    built plan; `apply_presets` does the same for preset arrays.
+    """
+
+    def __init__(
+        self,
+        feed_unit: str = "mm/min",
+        max_machines: int = 1024,
+        bind: Optional[AsyncEngine] = None,
+    ):
+        self.feed_factor = 1.0 / UNITS["feed"][feed_unit]
+        self.max_machines = max_machines
+        self.bind = bind
+        self._machines: "OrderedDict[int, Tuple[Dict[str, float], Any]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        on_model_change((Machine,), self._on_change)
+
+    async def limits(self, machine_id: int, rigidity: Any = None) -> MachineLimits:
+        specs, machine_rigidity = await self._machine(machine_id)
+        return MachineLimits.from_specs(
+            specs,
+            rigidity if rigidity is not None else machine_rigidity,
+            self.feed_factor,
+        )
+
+    async def apply(self, job: Any, plans: Sequence[Any]) -> List[Dict[str, Any]]:
+        """
+        Plans of `job` (a row with `machine_id` and `machine_rigidity`)
+        with machine limits applied; unchanged when it has no machine.
+        """
+        plans = [dict(plan) for plan in plans]
+        if job.machine_id is None:
+            return plans
+        limits = await self.limits(job.machine_id, job.machine_rigidity)
+        clamped, _ = clamp_plan_operations(plans, limits)
+        return clamped
+
+    async def apply_presets(self, job: Any, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `SpeedFeedIndex` rows (e.g. `SpeedFeedMatch.rows`) capped for
+        `job`'s machine in one array pass, with their flag bits; builders
+        can cap presets here before spreading them into plan entries.
+        """
+        if job.machine_id is None:
+            return rows, np.zeros((len(rows), len(VALUE_FIELDS)), dtype=np.int8)
+        limits = await self.limits(job.machine_id, job.machine_rigidity)
+        return clamp_presets(rows, limits)
+
+    def invalidate(self) -> None:
+        self._machines.clear()
+
+    def _on_change(self, changes: Changes) -> None:
+        rows = changes[Machine]
+        if rows is None:
+            self.invalidate()
+            return
+        for row in rows:
+            self._machines.pop(row.get("id"), None)
+
+    async def _machine(self, machine_id: int) -> Tuple[Dict[str, float], Any]:
+        entry = self._machines.get(machine_id)
+        if entry is None:
+            async with self._lock:
+                entry = self._machines.get(machine_id)
+                if entry is None:
+                    entry = await self._load(machine_id)
+                    self._machines[machine_id] = entry
+                    while len(self._machines) > self.max_machines:
+                        self._machines.popitem(last=False)
+        if machine_id in self._machines:
+            self._machines.move_to_end(machine_id)
+        return entry
+
+    async def _load(self, machine_id: int) -> Tuple[Dict[str, float], Any]:
+        table = Machine.__table__
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            row = (await conn.execute(
+                select(
+                    table.c.id, table.c.machine_rigidity,
+                    *(table.c[name] for name in SPEC_COLUMNS)
+                ).where(table.c.id == machine_id)
+            )).one_or_none()
+        if row is None:
+            return {}, None
+        return machine_specs(row), row.machine_rigidity
+
+
+@lru_cache
+def get_speed_feed_limit_service() -> SpeedFeedLimitService:
+    """Shared speed and feed limit service of this process."""
+    return SpeedFeedLimitService()
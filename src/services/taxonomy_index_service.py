@@ -0,0 +1,200 @@
+import asyncio
+import time
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..db.postgres.connection import get_engine
+from ..db.postgres.invalidation import Changes, fingerprint_query, on_model_change
+from ..db.postgres.models import CuttingToolTaxonomy, ToolTaxonomy
+
+
+TaxonomyModel = Union[Type[ToolTaxonomy], Type[CuttingToolTaxonomy]]
+TAXONOMY_MODELS = (ToolTaxonomy, CuttingToolTaxonomy)
+
+
+class TaxonomyNode:
+    __slots__ = ("code", "label", "name", "depth", "parent", "children", "order", "end", "exists")
+
+    def __init__(self, code: str, parent: Optional["TaxonomyNode"]):
+        self.code = code
+        self.label = code.rsplit(".", 1)[-1]
+        self.name: Optional[str] = None
+        self.depth = code.count(".") + 1
+        self.parent = parent
+        self.children: Dict[str, TaxonomyNode] = {}
+        self.order = 0
+        self.end = 0
+        # False for path prefixes that have no row of their own
+        self.exists = False
+
+
+class TaxonomyIndex:
+    """
+    Trie over ltree codes, keyed by label.
+
+    Nodes are numbered in pre-order, so every subtree is a contiguous range
+    of that numbering: subtree listing is a slice and descendant checks are
+    two integer comparisons. Ancestors walk parent links, at most the depth
+    of the tree. Unknown codes raise KeyError.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str]]]):
+        self.roots: Dict[str, TaxonomyNode] = {}
+        self._nodes: Dict[str, TaxonomyNode] = {}
+        for code, name in rows:
+            node = self._insert(str(code))
+            node.name = name
+            node.exists = True
+
+        self._preorder: List[TaxonomyNode] = []
+        stack = [self.roots[label] for label in sorted(self.roots, reverse=True)]
+        while stack:
+            node = stack.pop()
+            node.order = len(self._preorder)
+            self._preorder.append(node)
+            stack.extend(node.children[label] for label in sorted(node.children, reverse=True))
+        # A subtree ends where the next node at the same or lower depth starts
+        open_nodes: List[TaxonomyNode] = []
+        for node in self._preorder:
+            while open_nodes and open_nodes[-1].depth >= node.depth:
+                open_nodes.pop().end = node.order
+            open_nodes.append(node)
+        for node in open_nodes:
+            node.end = len(self._preorder)
+
+    def __len__(self) -> int:
+        return sum(node.exists for node in self._preorder)
+
+    def __contains__(self, code) -> bool:
+        node = self._nodes.get(str(code))
+        return node is not None and node.exists
+
+    def node(self, code) -> TaxonomyNode:
+        return self._nodes[str(code)]
+
+    def name(self, code) -> Optional[str]:
+        return self.node(code).name
+
+    def children(self, code) -> List[str]:
+        return [child.code for child in self.node(code).children.values()]
+
+    def subtree(self, code, include_self: bool = True) -> List[str]:
+        """Codes at or below `code` in pre-order, like `code @> x` in SQL."""
+        node = self.node(code)
+        start = node.order if include_self else node.order + 1
+        return [n.code for n in self._preorder[start:node.end] if n.exists]
+
+    def ancestors(self, code, include_self: bool = False) -> List[str]:
+        """Codes above `code`, root first."""
+        node = self.node(code)
+        if not include_self:
+            node = node.parent
+        chain = []
+        while node is not None:
+            if node.exists:
+                chain.append(node.code)
+            node = node.parent
+        chain.reverse()
+        return chain
+
+    def is_descendant(self, code, ancestor) -> bool:
+        """True when `code` is at or below `ancestor`, like `code <@ ancestor`."""
+        node, top = self.node(code), self.node(ancestor)
+        return top.order <= node.order < top.end
+
+    def lowest_common_ancestor(self, *codes) -> Optional[str]:
+        """Deepest code that is an ancestor of (or equal to) all `codes`."""
+        nodes = [self.node(code) for code in codes]
+        if not nodes:
+            return None
+        lca: Optional[TaxonomyNode] = nodes[0]
+        for node in nodes[1:]:
+            while lca is not None and not (lca.order <= node.order < lca.end):
+                lca = lca.parent
+        while lca is not None and not lca.exists:
+            lca = lca.parent
+        return lca.code if lca is not None else None
+
+    def _insert(self, code: str) -> TaxonomyNode:
+        node = self._nodes.get(code)
+        if node is not None:
+            return node
+        parent_code, _, _ = code.rpartition(".")
+        parent = self._insert(parent_code) if parent_code else None
+        node = TaxonomyNode(code, parent)
+        siblings = parent.children if parent else self.roots
+        siblings[node.label] = node
+        self._nodes[code] = node
+        return node
+
+
+class TaxonomyIndexService:
+    """
+    Process-local taxonomy indexes, loaded once per table.
+
+    An index is dropped as soon as this process commits a change to its
+    table. Changes made elsewhere are caught by a fingerprint of the table
+    (row count plus a hash of its contents), re-checked at most every
+    `ttl` seconds when the index is asked for.
+    """
+
+    def __init__(self, ttl: float = 30.0, bind: Optional[AsyncEngine] = None):
+        self.ttl = ttl
+        self.bind = bind
+        self._indexes: Dict[TaxonomyModel, TaxonomyIndex] = {}
+        self._fingerprints: Dict[TaxonomyModel, str] = {}
+        self._checked_at: Dict[TaxonomyModel, float] = {}
+        self._lock = asyncio.Lock()
+        on_model_change(TAXONOMY_MODELS, self._on_change)
+
+    async def get(self, model: TaxonomyModel = ToolTaxonomy) -> TaxonomyIndex:
+        index = self._indexes.get(model)
+        if index is not None and time.monotonic() - self._checked_at[model] < self.ttl:
+            return index
+
+        async with self._lock:
+            index = self._indexes.get(model)
+            if index is not None and time.monotonic() - self._checked_at[model] < self.ttl:
+                return index
+            await self._load(model, index)
+            return self._indexes[model]
+
+    async def tools(self) -> TaxonomyIndex:
+        return await self.get(ToolTaxonomy)
+
+    async def cutting_tools(self) -> TaxonomyIndex:
+        return await self.get(CuttingToolTaxonomy)
+
+    def invalidate(self, model: Optional[TaxonomyModel] = None) -> None:
+        """Drop one index, or all, so the next `get` reloads it."""
+        for key in [model] if model else list(self._indexes):
+            self._indexes.pop(key, None)
+            self._fingerprints.pop(key, None)
+            self._checked_at.pop(key, None)
+
+    def _on_change(self, changes: Changes) -> None:
+        for model in TAXONOMY_MODELS:
+            if model in changes:
+                self.invalidate(model)
+
+    async def _load(self, model: TaxonomyModel, current: Optional[TaxonomyIndex]) -> None:
+        table = model.__table__
+        query = fingerprint_query(table, [table.c.code, table.c.parent_code, table.c.name])
+        engine = self.bind or get_engine()
+        async with engine.connect() as conn:
+            fingerprint = (await conn.execute(query)).scalar()
+            if current is None or fingerprint != self._fingerprints.get(model):
+                rows = await conn.execute(select(table.c.code, table.c.name))
+                self._indexes[model] = TaxonomyIndex(rows.all())
+                self._fingerprints[model] = fingerprint
+        self._checked_at[model] = time.monotonic()
+
+
+@lru_cache
+def get_taxonomy_index_service() -> TaxonomyIndexService:
+    """Shared taxonomy index service of this process."""
+    return TaxonomyIndexService()
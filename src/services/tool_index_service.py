@@ -0,0 +1,296 @@
+import math
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from ..db.postgres.invalidation import (
+    Changes, FingerprintCache, fingerprint_query, on_model_change
+)
+from ..db.postgres.models import CompanyToolMapping, Tool, ToolMaster, ToolTypeTaxonomyMap
+
+
+TOOL = 0
+TOOL_MASTER = 1
+
+# Secondary columns kept next to the sorted diameters
+SECONDARY_FIELDS = ("cutting_length", "flute_count", "corner_radius")
+
+
+@dataclass(frozen=True)
+class ToolQuery:
+    """
+    Dimensions a feature needs from a tool; None means any.
+
+    Ranges are inclusive. `taxonomy_codes` accepts tools in the subtree of
+    any of the codes.
+    """
+
+    min_diameter: Optional[float] = None
+    max_diameter: Optional[float] = None
+    min_cutting_length: Optional[float] = None
+    min_corner_radius: Optional[float] = None
+    max_corner_radius: Optional[float] = None
+    min_flutes: Optional[int] = None
+    max_flutes: Optional[int] = None
+    taxonomy_codes: Tuple[str, ...] = ()
+
+
+@dataclass
+class ToolCandidates:
+    """Usable tools for one query, in ascending diameter order."""
+
+    tool_ids: List[int] = field(default_factory=list)
+    tool_master_ids: List[int] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.tool_ids) + len(self.tool_master_ids)
+
+
+class ToolIndex:
+    """
+    A company's tools sorted by diameter, with secondary arrays and
+    taxonomy bitsets.
+
+    Tools and ToolMaster records share one set of arrays: `Tool.diameter`
+    and `ToolMaster.max_diameter` sorted ascending (unknown last), and
+    cutting length, flute count and corner radius in the same order (NaN
+    when unknown). Every taxonomy code a tool sits under, ancestors
+    included, has a packed bitset over the sorted tools.
+
+    A query binary-searches its diameter range, then filters that slice
+    with vectorized masks on the secondary arrays and the OR of its
+    taxonomy bitsets. Unknown secondary values pass unless `strict` is set;
+    tools of unknown diameter never match a diameter range.
+    """
+
+    def __init__(self, company_id: int, tools: Iterable[Tuple[int, int, Any, Any, Any, Any, Any]]):
+        """`tools`: (source, id, diameter, cutting_length, flute_count, corner_radius, code)."""
+        self.company_id = company_id
+        rows = list(tools)
+        diameters = np.array([_number(row[2]) for row in rows], dtype=np.float64)
+        # NaN sorts last
+        order = np.argsort(diameters, kind="stable")
+        self.diameters = diameters[order]
+        self._known = int(np.count_nonzero(~np.isnan(self.diameters)))
+        self.sources = np.array([row[0] for row in rows], dtype=np.int8)[order]
+        self.ids = np.array([row[1] for row in rows], dtype=np.int64)[order]
+        self.secondary = {
+            name: np.array([_number(row[3 + i]) for row in rows], dtype=np.float64)[order]
+            for i, name in enumerate(SECONDARY_FIELDS)
+        }
+
+        codes = [str(rows[i][6]) if rows[i][6] is not None else None for i in order]
+        masks: Dict[str, np.ndarray] = {}
+        for position, code in enumerate(codes):
+            if not code:
+                continue
+            labels = code.split(".")
+            for depth in range(1, len(labels) + 1):
+                prefix = ".".join(labels[:depth])
+                mask = masks.get(prefix)
+                if mask is None:
+                    mask = masks[prefix] = np.zeros(len(rows), dtype=bool)
+                mask[position] = True
+        self.taxonomy_bits = {code: np.packbits(mask) for code, mask in masks.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def taxonomy_mask(self, codes: Sequence[str]) -> np.ndarray:
+        """Tools in the subtree of any of `codes`, as a boolean mask."""
+        bits = np.zeros((len(self) + 7) // 8, dtype=np.uint8)
+        for code in codes:
+            code_bits = self.taxonomy_bits.get(str(code))
+            if code_bits is not None:
+                bits |= code_bits
+        return np.unpackbits(bits, count=len(self)).view(bool)
+
+    def candidates(
+        self, queries: Sequence[ToolQuery], strict: bool = False
+    ) -> List[ToolCandidates]:
+        """Candidate tools of each query."""
+        if not queries:
+            return []
+        known = self.diameters[:self._known]
+        lows = np.array([-np.inf if q.min_diameter is None else q.min_diameter for q in queries])
+        highs = np.array([np.inf if q.max_diameter is None else q.max_diameter for q in queries])
+        starts = np.searchsorted(known, lows, side="left")
+        stops = np.searchsorted(known, highs, side="right")
+
+        taxonomy_masks: Dict[Tuple[str, ...], np.ndarray] = {}
+        result: List[ToolCandidates] = []
+        for query, start, stop in zip(queries, starts.tolist(), stops.tolist()):
+            if query.min_diameter is None and query.max_diameter is None:
+                # No diameter requirement: tools of unknown diameter too
+                stop = len(self)
+            keep = np.ones(stop - start, dtype=bool)
+            for name, bound, at_least in (
+                ("cutting_length", query.min_cutting_length, True),
+                ("corner_radius", query.min_corner_radius, True),
+                ("corner_radius", query.max_corner_radius, False),
+                ("flute_count", query.min_flutes, True),
+                ("flute_count", query.max_flutes, False),
+            ):
+                if bound is None:
+                    continue
+                values = self.secondary[name][start:stop]
+                ok = values >= bound if at_least else values <= bound
+                if not strict:
+                    ok |= np.isnan(values)
+                keep &= ok
+            if query.taxonomy_codes:
+                codes = tuple(sorted(set(map(str, query.taxonomy_codes))))
+                mask = taxonomy_masks.get(codes)
+                if mask is None:
+                    mask = taxonomy_masks[codes] = self.taxonomy_mask(codes)
+                keep &= mask[start:stop]
+
+            positions = start + np.flatnonzero(keep)
+            sources = self.sources[positions]
+            ids = self.ids[positions]
+            result.append(ToolCandidates(
+                tool_ids=ids[sources == TOOL].tolist(),
+                tool_master_ids=ids[sources == TOOL_MASTER].tolist(),
+            ))
+        return result
+
+
+class ToolIndexService:
+    """
+    Per-company ToolIndex objects in a bounded LRU.
+
+    A company's tools are its CompanyToolMapping rows, each pointing at a
+    Tool (taxonomy through ToolTypeTaxonomyMap) or a ToolMaster record.
+    Commits in this process that touch a company's mappings drop its
+    index; edits to tools, tool masters or the tool type taxonomy map drop
+    every index. Writes from other processes are caught by fingerprints
+    of the company's mappings, tools, tool masters and taxonomy rows (see
+    FingerprintCache).
+    """
+
+    def __init__(
+        self, max_companies: int = 256, ttl: float = 30.0, bind: Optional[AsyncEngine] = None
+    ):
+        self._indexes: FingerprintCache[int, ToolIndex] = FingerprintCache(
+            self._fingerprint, self._load, max_companies, ttl, bind
+        )
+        on_model_change(
+            (CompanyToolMapping, Tool, ToolMaster, ToolTypeTaxonomyMap), self._on_change
+        )
+
+    async def get(self, company_id: int) -> ToolIndex:
+        return await self._indexes.get(company_id)
+
+    async def candidates(
+        self, company_id: int, queries: Sequence[ToolQuery], strict: bool = False
+    ) -> List[ToolCandidates]:
+        return (await self.get(company_id)).candidates(queries, strict)
+
+    def invalidate_company(self, company_id: int) -> None:
+        self._indexes.invalidate(company_id)
+
+    def invalidate(self) -> None:
+        self._indexes.clear()
+
+    def _on_change(self, changes: Changes) -> None:
+        if any(model in changes for model in (Tool, ToolMaster, ToolTypeTaxonomyMap)):
+            self.invalidate()
+            return
+        if CompanyToolMapping not in changes:
+            return
+        rows = changes[CompanyToolMapping]
+        if rows is None:
+            self.invalidate()
+            return
+        for row in rows:
+            self.invalidate_company(row.get("company_id"))
+
+    @staticmethod
+    def _fingerprint(company_id: int) -> Select:
+        mappings = CompanyToolMapping.__table__
+        tools = Tool.__table__
+        masters = ToolMaster.__table__
+        taxonomy = ToolTypeTaxonomyMap.__table__
+        in_company = mappings.c.company_id == company_id
+        tool_ids = select(mappings.c.tool_id).where(in_company)
+        return select(
+            fingerprint_query(
+                mappings,
+                [mappings.c.id, mappings.c.tool_id, mappings.c.tool_master_id],
+                in_company,
+            ).scalar_subquery(),
+            fingerprint_query(
+                tools,
+                [tools.c.id, tools.c.tool_type_id, tools.c.diameter,
+                 *(tools.c[name] for name in SECONDARY_FIELDS)],
+                tools.c.id.in_(tool_ids),
+            ).scalar_subquery(),
+            fingerprint_query(
+                masters,
+                [masters.c.id, masters.c.max_diameter, masters.c.attributes,
+                 masters.c.tool_taxonomy_code],
+                masters.c.id.in_(select(mappings.c.tool_master_id).where(in_company)),
+            ).scalar_subquery(),
+            fingerprint_query(
+                taxonomy,
+                [taxonomy.c.tool_type_id, taxonomy.c.tool_taxonomy_code],
+                taxonomy.c.tool_type_id.in_(
+                    select(tools.c.tool_type_id).where(tools.c.id.in_(tool_ids))
+                ),
+            ).scalar_subquery(),
+        )
+
+    @staticmethod
+    async def _load(conn: AsyncConnection, company_id: int) -> ToolIndex:
+        mappings = CompanyToolMapping.__table__
+        tools = Tool.__table__
+        masters = ToolMaster.__table__
+        taxonomy = ToolTypeTaxonomyMap.__table__
+        tool_rows = await conn.execute(
+            select(
+                tools.c.id, tools.c.diameter, tools.c.cutting_length,
+                tools.c.flute_count, tools.c.corner_radius, taxonomy.c.tool_taxonomy_code,
+            )
+            .select_from(
+                mappings.join(tools, tools.c.id == mappings.c.tool_id)
+                .outerjoin(taxonomy, taxonomy.c.tool_type_id == tools.c.tool_type_id)
+            )
+            .where(mappings.c.company_id == company_id)
+        )
+        entries = [(TOOL, row[0], *row[1:]) for row in tool_rows]
+        master_rows = await conn.execute(
+            select(
+                masters.c.id, masters.c.max_diameter, masters.c.attributes,
+                masters.c.tool_taxonomy_code,
+            )
+            .select_from(mappings.join(masters, masters.c.id == mappings.c.tool_master_id))
+            .where(mappings.c.company_id == company_id)
+        )
+        for master_id, max_diameter, attributes, code in master_rows:
+            attributes = attributes or {}
+            entries.append((
+                TOOL_MASTER, master_id, max_diameter,
+                *(attributes.get(name) for name in SECONDARY_FIELDS), code,
+            ))
+        return ToolIndex(company_id, entries)
+
+
+def _number(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+@lru_cache
+def get_tool_index_service() -> ToolIndexService:
+    """Shared tool index service of this process."""
+    return ToolIndexService()
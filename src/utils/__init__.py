@@ -0,0 +1,8 @@
+from .helpers import canonical_json, content_hash, normalize_value, slugify
+
+__all__ = [
+    "canonical_json",
+    "content_hash",
+    "normalize_value",
+    "slugify",
+]
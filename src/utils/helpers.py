@@ -0,0 +1,52 @@
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+
+def slugify(value: str, max_length: int = 100) -> str:
+    """Convert a display name into a lowercase, hyphen separated slug."""
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode()
+    value = re.sub(r"[^\w\s-]", "", value.lower())
+    value = re.sub(r"[-\s_]+", "-", value).strip("-")
+    return value[:max_length]
+
+
+def normalize_value(value: Any) -> Any:
+    """
+    Normalize a scalar so equal data compares and hashes equal.
+
+    Strings are whitespace trimmed (blank becomes None), floats are rounded
+    to 12 significant digits to absorb float/Double round trips, and
+    containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (float, Decimal)):
+        value = float(f"{float(value):.12g}")
+        return int(value) if value.is_integer() else value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def canonical_json(value: Any) -> str:
+    """Serialize a value to JSON with a stable key order and no whitespace."""
+    return json.dumps(
+        normalize_value(value), sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+def content_hash(value: Any) -> str:
+    """Stable SHA-1 hex digest of a value's normalized content."""
+    return hashlib.sha1(canonical_json(value).encode()).hexdigest()
@@ -0,0 +1,102 @@
+"""
+Pack integer index arrays (triangle and face indices) into bytes.
+
+Every packed value starts with a 4 byte header: the codec id and three
+reserved zero bytes, which keeps the payload 4 byte aligned.
+
+    INT32   little-endian int32 values. Unpacking is a zero-copy NumPy
+            view over the bytes.
+    VARINT  successive differences, zigzag mapped to unsigned and written
+            as LEB128 varints. Sorted or clustered indices take one or two
+            bytes per value; unpacking decodes with a few vectorized passes.
+"""
+from typing import Iterable, Union
+
+import numpy as np
+
+
+INT32 = 1
+VARINT = 2
+
+CODECS = {"int32": INT32, "varint": VARINT}
+
+_HEADER = 4
+
+Indices = Union[np.ndarray, Iterable[int]]
+
+
+def pack_indices(values: Indices, codec: str = "int32") -> bytes:
+    """Pack an index array with the named codec ("int32" or "varint")."""
+    try:
+        codec_id = CODECS[codec]
+    except KeyError:
+        raise ValueError(f"Unknown index codec {codec!r}; expected one of {', '.join(CODECS)}") from None
+
+    array = np.asarray(values if isinstance(values, np.ndarray) else list(values), dtype=np.int64)
+    if array.ndim != 1:
+        raise ValueError("Index arrays must be one dimensional")
+    if array.size and (array.min() < np.iinfo(np.int32).min or array.max() > np.iinfo(np.int32).max):
+        raise ValueError("Index values must fit in int32")
+
+    header = bytes((codec_id, 0, 0, 0))
+    if codec_id == INT32:
+        return header + array.astype("<i4").tobytes()
+    return header + _varint_encode(array).tobytes()
+
+
+def unpack_indices(data: Union[bytes, bytearray, memoryview, None]) -> np.ndarray:
+    """
+    Unpack bytes from `pack_indices` into an int32 array.
+
+    INT32 payloads come back as a read-only view sharing memory with
+    `data`; copy it before modifying.
+    """
+    if data is None:
+        return np.empty(0, dtype=np.int32)
+    view = memoryview(data)
+    if len(view) < _HEADER:
+        raise ValueError("Packed indices are missing their header")
+    codec_id = view[0]
+    if codec_id == INT32:
+        return np.frombuffer(view, dtype="<i4", offset=_HEADER)
+    if codec_id == VARINT:
+        return _varint_decode(np.frombuffer(view, dtype=np.uint8, offset=_HEADER))
+    raise ValueError(f"Unknown index codec id {codec_id}")
+
+
+def _varint_encode(values: np.ndarray) -> np.ndarray:
+    deltas = np.diff(values, prepend=0)
+    zigzag = ((deltas << 1) ^ (deltas >> 63)).astype(np.uint64)
+
+    # 7 payload bits per byte
+    lengths = np.ones(zigzag.size, dtype=np.int64)
+    remaining = zigzag >> np.uint64(7)
+    while remaining.any():
+        lengths += remaining > 0
+        remaining >>= np.uint64(7)
+
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        has = lengths > k
+        byte = (zigzag[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = (byte | more).astype(np.uint8)
+    return out
+
+
+def _varint_decode(data: np.ndarray) -> np.ndarray:
+    if not data.size:
+        return np.empty(0, dtype=np.int32)
+    ends = np.flatnonzero(data < 0x80)
+    if not ends.size or ends[-1] != data.size - 1:
+        raise ValueError("Truncated varint index payload")
+
+    starts = np.r_[0, ends[:-1] + 1]
+    group = np.repeat(np.arange(ends.size), ends - starts + 1)
+    shift = (np.arange(data.size) - starts[group]) * 7
+    parts = (data & 0x7F).astype(np.uint64) << shift.astype(np.uint64)
+    zigzag = np.add.reduceat(parts, starts)
+
+    deltas = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    return np.cumsum(deltas).astype(np.int32)
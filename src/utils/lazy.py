@@ -0,0 +1,23 @@
+import importlib
+import sys
+from typing import Any, Callable, Dict
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Build a module level `__getattr__` that imports re-exports on first use.
+
+    `exports` maps each public name to the relative module defining it, so
+    importing a package costs nothing until one of its names is touched.
+    """
+    def __getattr__(name: str) -> Any:
+        try:
+            module_name = exports[name]
+        except KeyError:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}") from None
+        value = getattr(importlib.import_module(module_name, package), name)
+        # Cache on the package so later lookups skip __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
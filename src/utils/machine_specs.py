@@ -0,0 +1,145 @@
+"""
+Flatten the free-form JSONB specs of `Machine` into typed numbers.
+
+Each capability is read from the first matching key of its spec column
+(keys are compared lowercased with punctuation as "_") and converted to a
+canonical unit:
+
+    travel_x/y/z       mm       travels
+    spindle_rpm        rpm      spindle
+    spindle_power      kW       spindle
+    cutting_feed       mm/min   feedrates
+    rapid_feed         mm/min   feedrates
+    table_length/width mm       table
+    table_load         kg       table
+    tool_capacity      tools    tool_changer
+    max_tool_diameter  mm       tool_changer
+
+A value may be a number, a string with a unit ("30 in", "8,100 rpm",
+'30" (762 mm)'), a {"value", "unit"} dict or a dict of the same quantity
+in several units ({"in": 30, "mm": 762}, canonical unit preferred). A
+bare number is in the spec's own "unit"/"units" key when it has one, the
+canonical unit otherwise. Anything unreadable is NaN.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .setup_grouping import MachineKinematics
+
+
+# Quantity kind -> unit -> factor to the canonical unit (listed first)
+UNITS: Dict[str, Dict[str, float]] = {
+    "length": {"mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4, "inch": 25.4, "inches": 25.4, '"': 25.4, "ft": 304.8},
+    "speed": {"rpm": 1.0, "min-1": 1.0, "r/min": 1.0, "1/min": 1.0},
+    "feed": {
+        "mm/min": 1.0, "m/min": 1000.0, "ipm": 25.4, "in/min": 25.4,
+        "ft/min": 304.8, "fpm": 304.8,
+    },
+    "power": {"kw": 1.0, "w": 0.001, "hp": 0.7457},
+    "mass": {"kg": 1.0, "t": 1000.0, "lb": 0.45359237, "lbs": 0.45359237},
+    "count": {"": 1.0},
+}
+
+# Capability -> (Machine column, quantity kind, candidate keys)
+CAPABILITIES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "travel_x": ("travels", "length", ("x", "x_axis", "x_travel", "travel_x")),
+    "travel_y": ("travels", "length", ("y", "y_axis", "y_travel", "travel_y")),
+    "travel_z": ("travels", "length", ("z", "z_axis", "z_travel", "travel_z")),
+    "spindle_rpm": ("spindle", "speed", ("max_speed", "max_rpm", "speed", "rpm", "max_spindle_speed")),
+    "spindle_power": ("spindle", "power", ("max_rating", "max_power", "power", "rating")),
+    "cutting_feed": ("feedrates", "feed", ("max_cutting", "max_cutting_feed", "cutting", "cutting_feed", "max_feed", "feed")),
+    "rapid_feed": ("feedrates", "feed", ("rapids", "max_rapid", "rapid", "rapids_x", "rapid_x")),
+    "table_length": ("table", "length", ("length", "x", "table_length")),
+    "table_width": ("table", "length", ("width", "y", "table_width")),
+    "table_load": ("table", "mass", ("max_weight", "max_weight_on_table", "max_load", "load", "max_table_load")),
+    "tool_capacity": ("tool_changer", "count", ("capacity", "tool_capacity", "tools", "pockets")),
+    "max_tool_diameter": ("tool_changer", "length", ("max_tool_diameter", "max_tool_dia", "tool_diameter")),
+}
+
+_NUMBER = re.compile(r"[-+]?\d+(?:,\d{3})*(?:\.\d+)?|[-+]?\.\d+")
+
+
+def _key(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+
+def parse_quantity(value: Any, kind: str, default_unit: Optional[str] = None) -> float:
+    """`value` in the canonical unit of `kind`, or NaN."""
+    units = UNITS[kind]
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        factor = units.get((default_unit or "").lower(), 1.0)
+        return float(value) * factor
+    if isinstance(value, str):
+        return _parse_text(value, kind, (default_unit or "").lower())
+    if isinstance(value, Mapping):
+        normalized = {_key(str(k)): v for k, v in value.items()}
+        if "value" in normalized:
+            unit = normalized.get("unit", normalized.get("units", default_unit))
+            return parse_quantity(normalized["value"], kind, unit)
+        # The same quantity in several units: canonical first
+        for unit in units:
+            if unit and _key(unit) in normalized:
+                parsed = parse_quantity(normalized[_key(unit)], kind, unit)
+                if not math.isnan(parsed):
+                    return parsed
+        for item in value.values():
+            parsed = parse_quantity(item, kind, default_unit)
+            if not math.isnan(parsed):
+                return parsed
+        return math.nan
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            parsed = parse_quantity(item, kind, default_unit)
+            if not math.isnan(parsed):
+                return parsed
+    return math.nan
+
+
+@lru_cache(maxsize=4096)
+def _parse_text(text: str, kind: str, default_unit: str) -> float:
+    units = UNITS[kind]
+    # Longest unit first so "mm/min" wins over "mm" and "in/min" over "in"
+    ordered = sorted((u for u in units if u), key=len, reverse=True)
+    first = math.nan
+    for match in _NUMBER.finditer(text):
+        number = float(match.group().replace(",", ""))
+        rest = text[match.end():].lstrip().lower()
+        for unit in ordered:
+            if rest.startswith(unit) and not rest[len(unit):len(unit) + 1].isalpha():
+                return number * units[unit]
+        if math.isnan(first):
+            first = number * units.get(default_unit, 1.0)
+    return first
+
+
+def machine_specs(machine: Any) -> Dict[str, float]:
+    """
+    Capability -> canonical value of a `Machine` row or object, plus
+    `axes`, `rotary_range` and `tilt_limit` (degrees) from its kinematics.
+    """
+    specs: Dict[str, float] = {}
+    for name, (column, kind, keys) in CAPABILITIES.items():
+        specs[name] = _spec_value(getattr(machine, column, None), kind, keys)
+    kinematics = MachineKinematics.from_machine(machine)
+    specs["axes"] = float(kinematics.axes)
+    specs["rotary_range"] = kinematics.rotary_range_deg if kinematics.axes == 4 else 0.0
+    specs["tilt_limit"] = kinematics.tilt_limit_deg
+    return specs
+
+
+def _spec_value(spec: Any, kind: str, keys: Tuple[str, ...]) -> float:
+    if not isinstance(spec, Mapping):
+        return math.nan
+    normalized = {_key(str(k)): v for k, v in spec.items()}
+    default_unit = normalized.get("unit", normalized.get("units"))
+    default_unit = default_unit if isinstance(default_unit, str) else None
+    for key in keys:
+        if key in normalized:
+            value = parse_quantity(normalized[key], kind, default_unit)
+            if not math.isnan(value):
+                return value
+    return math.nan
@@ -0,0 +1,224 @@
+"""
+Parse the free-text property columns of `Material` into numeric ranges.
+
+Values such as "200-250 HB", "28-32 HRC", "max. 250 HB", "515 MPa (75 ksi)",
+"≥ 40 %" or "28 x 10^6 psi" become a (min, max) pair in a canonical unit:
+
+    hardness             HB    (HRC, HRB and HV are converted)
+    yield_strength       MPa
+    tensile_strength     MPa
+    elongation           %
+    modulus_elasticity   GPa
+
+A single value gives min == max; "max"/"≤" and "min"/"≥" leave the other
+bound open (None). When a text holds several values, the first one in a
+unit valid for the property wins. Numbers without any unit are taken to be
+in the canonical unit. Hardness scale conversions follow the approximate
+ASTM E140 tables for steel; a Rockwell value outside its table has no
+conversion, so it is skipped like a value in a foreign unit.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+PROPERTY_COLUMNS = (
+    "hardness",
+    "yield_strength",
+    "tensile_strength",
+    "elongation",
+    "modulus_elasticity",
+)
+
+# Canonical unit of each property, used in the parsed column names
+CANONICAL_UNITS = {
+    "hardness": "hb",
+    "yield_strength": "mpa",
+    "tensile_strength": "mpa",
+    "elongation": "pct",
+    "modulus_elasticity": "gpa",
+}
+
+# Approximate HRC / HRB -> HB (ASTM E140, non-austenitic steels)
+_HRC_TO_HB = np.array([
+    [20, 25, 30, 35, 40, 45, 50, 55, 60, 65],
+    [226, 253, 286, 327, 371, 421, 481, 560, 654, 739],
+], dtype=np.float64)
+_HRB_TO_HB = np.array([
+    [60, 70, 80, 90, 100],
+    [107, 125, 150, 185, 240],
+], dtype=np.float64)
+
+_PSI_TO_MPA = 0.00689476
+
+
+def _rockwell(table: np.ndarray) -> Callable[[float], Optional[float]]:
+    """HB by interpolation in `table`; None outside it rather than clamping."""
+    low, high = table[0, 0], table[0, -1]
+    return lambda v: float(np.interp(v, *table)) if low <= v <= high else None
+
+
+_STRESS: Dict[str, Callable[[float], float]] = {
+    "mpa": lambda v: v,
+    "n/mm2": lambda v: v,
+    "gpa": lambda v: v * 1000.0,
+    "kpa": lambda v: v / 1000.0,
+    "psi": lambda v: v * _PSI_TO_MPA,
+    "ksi": lambda v: v * _PSI_TO_MPA * 1000.0,
+    "kgf/mm2": lambda v: v * 9.80665,
+}
+
+# Source unit -> converter to the canonical unit, per property
+_CONVERTERS: Dict[str, Dict[str, Callable[[float], Optional[float]]]] = {
+    "hardness": {
+        "hb": lambda v: v,
+        "hrc": _rockwell(_HRC_TO_HB),
+        "hrb": _rockwell(_HRB_TO_HB),
+        "hv": lambda v: v * 0.95,
+    },
+    "yield_strength": _STRESS,
+    "tensile_strength": _STRESS,
+    "elongation": {"%": lambda v: v},
+    "modulus_elasticity": {
+        **{unit: (lambda f: lambda v: f(v) / 1000.0)(f) for unit, f in _STRESS.items()},
+        "msi": lambda v: v * _PSI_TO_MPA,
+    },
+}
+
+_UNIT_ALIASES = {
+    "hbw": "hb", "hbs": "hb", "bhn": "hb", "brinell": "hb",
+    "n/mm^2": "n/mm2", "n/mm²": "n/mm2", "kgf/mm^2": "kgf/mm2", "kgf/mm²": "kgf/mm2",
+    "vickers": "hv", "rockwell c": "hrc", "rockwell b": "hrb",
+}
+
+_UNIT = re.compile(
+    r"(?<![a-z])(hbw|hbs|hb|bhn|brinell|hrc|hrb|rockwell [bc]|hv\d*|vickers|"
+    r"mpa|gpa|kpa|n/mm(?:2|\^2|²)|kgf/mm(?:2|\^2|²)|ksi|msi|psi|%)(?![a-z])"
+)
+_NUMBER = r"\d+(?:[.,]\d+)*"
+_RANGE = re.compile(
+    rf"(?P<bound>max(?:imum)?\.?|min(?:imum)?\.?|up to|<=|>=|[<>≤≥])?\s*"
+    rf"(?P<low>{_NUMBER})"
+    rf"(?:\s*(?P<sep>-|to|~|±|\+/-)\s*(?P<high>{_NUMBER}))?"
+    rf"(?:\s*(?:x|\*|×)\s*10\s*\^?\s*(?P<exp>\d+))?"
+    rf"(?P<after>\s*(?:max|min)\b)?"
+)
+
+
+@dataclass(frozen=True)
+class PropertyRange:
+    """A parsed property in its canonical unit; `unit` is the unit as written."""
+
+    min: Optional[float]
+    max: Optional[float]
+    unit: Optional[str]
+
+
+def parse_property(column: str, text: Optional[str]) -> Optional[PropertyRange]:
+    """Parse one property column value, or None if it holds no usable number."""
+    if column not in _CONVERTERS:
+        raise ValueError(f"Unknown material property {column!r}")
+    if not text:
+        return None
+    return _parse_cached(column, text)
+
+
+def parse_material_properties(row: Mapping) -> Dict[str, Optional[float]]:
+    """
+    Numeric columns for one material row.
+
+    Keys are `<property>_min_<unit>` and `<property>_max_<unit>`, e.g.
+    `hardness_min_hb` or `tensile_strength_max_mpa`.
+    """
+    values: Dict[str, Optional[float]] = {}
+    for column in PROPERTY_COLUMNS:
+        parsed = parse_property(column, row.get(column))
+        unit = CANONICAL_UNITS[column]
+        values[f"{column}_min_{unit}"] = parsed.min if parsed else None
+        values[f"{column}_max_{unit}"] = parsed.max if parsed else None
+    return values
+
+
+@lru_cache(maxsize=8192)
+def _parse_cached(column: str, text: str) -> Optional[PropertyRange]:
+    normalized = text.lower().replace("–", "-").replace("—", "-").replace(",", _comma(text))
+    converters = _CONVERTERS[column]
+
+    units: List[Tuple[int, int, str]] = []
+    for match in _UNIT.finditer(normalized):
+        unit = _UNIT_ALIASES.get(match.group(1), match.group(1))
+        units.append((match.start(), match.end(), "hv" if unit.startswith("hv") else unit))
+    ranges = [m for m in _RANGE.finditer(normalized) if not _inside_unit(m, units)]
+
+    fallback: Optional[PropertyRange] = None
+    for i, match in enumerate(ranges):
+        found = _unit_of(match, units, ranges[i + 1].start() if i + 1 < len(ranges) else len(normalized))
+        if found is None:
+            if fallback is None and not units:
+                fallback = _build(match, None, lambda v: v, "")
+            continue
+        unit, end = found
+        if unit in converters:
+            # "187 HB max": the bound may follow the unit
+            built = _build(match, unit, converters[unit], normalized[end:end + 6].strip(" ."))
+            if built is not None:
+                return built
+    return fallback
+
+
+def _comma(text: str) -> str:
+    """Commas are thousands separators in "75,000 psi", decimal marks in "1,5 GPa"."""
+    return "" if re.search(r"\d,\d{3}(?!\d)", text) else "."
+
+
+def _inside_unit(match: re.Match, units: List[Tuple[int, int, str]]) -> bool:
+    # The digits of "HV10" or "N/mm2" are not values
+    return any(start <= match.start("low") < end for start, end, _ in units)
+
+
+def _unit_of(
+    match: re.Match, units: List[Tuple[int, int, str]], limit: int
+) -> Optional[Tuple[str, int]]:
+    """The unit written after a value (before the next value), else just before it."""
+    for start, end, unit in units:
+        if match.end("low") <= start < limit:
+            return unit, end
+    before = [(unit, end) for _, end, unit in units if end <= match.start()]
+    if before and match.start() - before[-1][1] <= 2:
+        return before[-1]
+    return None
+
+
+def _build(
+    match: re.Match,
+    unit: Optional[str],
+    convert: Callable[[float], Optional[float]],
+    trailing: str,
+) -> Optional[PropertyRange]:
+    scale = 10.0 ** int(match.group("exp")) if match.group("exp") else 1.0
+    low = float(match.group("low")) * scale
+    high = float(match.group("high")) * scale if match.group("high") else None
+    bound = (match.group("bound") or match.group("after") or trailing).strip()
+
+    if high is not None and match.group("sep") in ("±", "+/-"):
+        low, high = low - high, low + high
+    elif high is None:
+        high = low
+    if high < low:
+        low, high = high, low
+
+    low, high = convert(low), convert(high)
+    if bound.startswith(("max", "up", "<", "≤")):
+        low = None
+    elif bound.startswith(("min", ">", "≥")):
+        high = None
+    elif low is None or high is None:
+        return None
+    if low is None and high is None:
+        return None
+    return PropertyRange(
+        None if low is None else round(low, 6), None if high is None else round(high, 6), unit
+    )
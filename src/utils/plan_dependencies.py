@@ -0,0 +1,174 @@
+"""
+Which setups of an operation plan depend on which features and job inputs.
+
+A plan is a list of setups (MachineOperationPlan values) whose
+`operations` hold one entry per operation. An entry depends on the
+features it names (`feature_id`, `feature_ids` or `features`) and on the
+job inputs it lists in `depends_on`. Entries naming no feature machine
+the stock itself (facing, squaring) and depend on the stock; every entry
+depends on the machine, material, rigidity and policies, so a change to
+any of those invalidates the whole plan.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Set
+
+from .helpers import content_hash
+
+
+# Job input -> what it affects: "all" setups, or only the "stock" level
+# entries (and entries listing it in `depends_on`). "stock", "machine" and
+# "material" are content hashes of the rows, so in-place edits count too.
+INPUT_SCOPES = {
+    "stock_id": "stock",
+    "stock": "stock",
+    "machine_id": "all",
+    "machine": "all",
+    "material_id": "all",
+    "material": "all",
+    "machine_rigidity": "all",
+    "policy": "all",
+}
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """Feature ids and job inputs that changed since a plan was generated."""
+
+    feature_ids: FrozenSet[str] = frozenset()
+    inputs: FrozenSet[str] = frozenset()
+
+    def __bool__(self) -> bool:
+        return bool(self.feature_ids or self.inputs)
+
+    @property
+    def replans_all(self) -> bool:
+        return any(INPUT_SCOPES.get(name, "all") == "all" for name in self.inputs)
+
+
+def operation_entries(operations: Any) -> Iterator[Mapping]:
+    """Entries of an `operations` value: a list, {"operations": [...]} or a dict of entries."""
+    if isinstance(operations, Mapping):
+        if isinstance(operations.get("operations"), list):
+            operations = operations["operations"]
+        else:
+            operations = operations.values()
+    for entry in operations or ():
+        if isinstance(entry, Mapping):
+            yield entry
+
+
+def entry_feature_ids(entry: Mapping) -> Set[str]:
+    """Feature ids an operation entry machines."""
+    ids: Set[str] = set()
+    if entry.get("feature_id") is not None:
+        ids.add(str(entry["feature_id"]))
+    for key in ("feature_ids", "features"):
+        for item in entry.get(key) or ():
+            if isinstance(item, Mapping):
+                item = item.get("feature_id", item.get("id"))
+            if item is not None:
+                ids.add(str(item))
+    return ids
+
+
+def flagged_feature_ids(flagged: Any) -> Dict[str, str]:
+    """
+    Feature id -> content hash of its flag, from a `Job.flagged_features` value.
+
+    Accepts a list of ids or flag dicts, a {"features": [...]} wrapper or a
+    dict keyed by feature id (falsy values are not flagged).
+    """
+    if isinstance(flagged, Mapping) and isinstance(flagged.get("features"), list):
+        flagged = flagged["features"]
+    result: Dict[str, str] = {}
+    if isinstance(flagged, Mapping):
+        for key, value in flagged.items():
+            if value:
+                result[str(key)] = content_hash(value)
+        return result
+    for item in flagged or ():
+        if isinstance(item, Mapping):
+            feature_id = item.get("feature_id", item.get("id"))
+            if feature_id is not None:
+                result[str(feature_id)] = content_hash(item)
+        elif item is not None:
+            result[str(item)] = content_hash(True)
+    return result
+
+
+def diff_hashes(old: Mapping[str, str], new: Mapping[str, str]) -> Set[str]:
+    """Keys added, removed or changed between two key -> hash maps."""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+@dataclass
+class PlanDependencies:
+    """
+    Setup positions (indexes into the plan list) by feature id and by input.
+
+    `stock_level` lists the setups holding entries that name no feature.
+    """
+
+    features: Dict[str, Set[int]] = field(default_factory=dict)
+    inputs: Dict[str, Set[int]] = field(default_factory=dict)
+    stock_level: Set[int] = field(default_factory=set)
+
+    @classmethod
+    def of(cls, plans: Iterable[Mapping]) -> "PlanDependencies":
+        deps = cls()
+        for position, plan in enumerate(plans):
+            for entry in operation_entries(plan.get("operations")):
+                feature_ids = entry_feature_ids(entry)
+                for feature_id in feature_ids:
+                    deps.features.setdefault(feature_id, set()).add(position)
+                if not feature_ids:
+                    deps.stock_level.add(position)
+                for name in entry.get("depends_on") or ():
+                    deps.inputs.setdefault(str(name), set()).add(position)
+        return deps
+
+    def affected(self, changes: ChangeSet) -> Set[int]:
+        """
+        Positions of the setups to recompute for `changes`.
+
+        Feature ids no setup machines yet (new or previously unassigned
+        features) affect nothing here; the caller hands them to the
+        builder along with the affected setups.
+        """
+        positions: Set[int] = set()
+        for feature_id in changes.feature_ids:
+            positions |= self.features.get(feature_id, set())
+        for name in changes.inputs:
+            positions |= self.inputs.get(name, set())
+            if INPUT_SCOPES.get(name) == "stock":
+                # `depends_on` may name the stock by either input
+                positions |= self.stock_level
+                positions |= self.inputs.get("stock_id", set())
+                positions |= self.inputs.get("stock", set())
+        return positions
+
+
+def merge_plans(
+    plans: List[Mapping], affected: Set[int], replacements: Iterable[Mapping]
+) -> List[Dict[str, Any]]:
+    """
+    Replace the affected setups of a plan, keeping the others in order.
+
+    Replacements take the place of the first affected setup (or go last
+    when none was affected) and sequences are renumbered from 1.
+    """
+    replacements = list(replacements)
+    merged: List[Dict[str, Any]] = []
+    inserted = False
+    for position, plan in enumerate(plans):
+        if position in affected:
+            if not inserted:
+                merged.extend(dict(r) for r in replacements)
+                inserted = True
+            continue
+        merged.append(dict(plan))
+    if not inserted:
+        merged.extend(dict(r) for r in replacements)
+    for sequence, plan in enumerate(merged, start=1):
+        plan["sequence"] = sequence
+    return merged
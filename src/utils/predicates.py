@@ -0,0 +1,345 @@
+"""
+Compile `applies_if` JSON predicates into cached evaluators.
+
+A predicate is a JSON object. Each key is either a logical operator or a
+dotted path into the feature (`feature_type`, `dimensions.diameter`), and
+all keys must hold:
+
+    {}                                           always true
+    {"feature_type": "hole"}                     equality
+    {"feature_type": ["hole", "counterbore"]}    membership
+    {"dimensions.diameter": {"gte": 3, "lt": 12}}
+    {"required_ops": {"contains": "drill"}}
+    {"any": [{...}, {...}]}, {"all": [...]}, {"not": {...}}
+
+Comparison operators are eq, ne, lt, lte, gt, gte, in, nin, between
+([low, high], inclusive), exists (true/false) and contains (for list
+fields). A missing value fails every test except ne, nin and
+`exists: false`.
+"""
+import json
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .helpers import canonical_json
+
+
+Feature = Any
+Test = Callable[[Feature], bool]
+
+_MISSING = object()
+_ORDERED = {"lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge}
+_NUMBER_TYPES = (int, float)
+_CONTAINER_TYPES = (list, dict)
+_OPERATORS = {*_ORDERED, "eq", "ne", "in", "nin", "between", "exists", "contains"}
+
+
+class FeatureColumns:
+    """
+    Column-wise view of a job's features for vectorized evaluation.
+
+    Each path is extracted once, on first use, into a float64 array (NaN
+    where missing or not a number) or an object array. Results of leaf
+    tests are memoized per column set, so a clause shared by many
+    predicates is evaluated once per job.
+    """
+
+    def __init__(self, features: Sequence[Feature]):
+        self.features = features
+        self.size = len(features)
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._objects: Dict[str, np.ndarray] = {}
+        self._leaves: Dict[Tuple, np.ndarray] = {}
+
+    def numeric(self, path: str) -> np.ndarray:
+        column = self._numeric.get(path)
+        if column is None:
+            getter = _getter(path)
+            column = np.fromiter(
+                (_as_float(getter(feature)) for feature in self.features),
+                dtype=np.float64,
+                count=self.size,
+            )
+            self._numeric[path] = column
+        return column
+
+    def objects(self, path: str) -> np.ndarray:
+        column = self._objects.get(path)
+        if column is None:
+            getter = _getter(path)
+            column = np.empty(self.size, dtype=object)
+            column[:] = [_hashable(getter(feature)) for feature in self.features]
+            self._objects[path] = column
+        return column
+
+
+class Predicate:
+    """A compiled `applies_if`: call it on one feature or evaluate a batch."""
+
+    __slots__ = ("spec", "_test", "_tree")
+
+    def __init__(self, spec: Mapping):
+        self.spec = spec
+        self._tree = _parse(spec)
+        self._test = _closure(self._tree)
+
+    def __call__(self, feature: Feature) -> bool:
+        return self._test(feature)
+
+    def evaluate(self, columns: FeatureColumns) -> np.ndarray:
+        """Boolean mask over every feature in `columns`."""
+        return _vectorized(self._tree, columns)
+
+
+def compile_predicate(spec: Optional[Mapping]) -> Predicate:
+    """Compile `spec`, reusing the compiled form of identical predicates."""
+    return _compile_cached(canonical_json(spec or {}))
+
+
+def evaluate_many(
+    specs: Iterable[Optional[Mapping]], features: Sequence[Feature]
+) -> np.ndarray:
+    """
+    Evaluate many predicates over the same features.
+
+    Returns a (predicates x features) boolean matrix. Identical predicates
+    are computed once, and so are leaf clauses shared between predicates.
+    """
+    specs = list(specs)
+    columns = features if isinstance(features, FeatureColumns) else FeatureColumns(features)
+    result = np.zeros((len(specs), columns.size), dtype=bool)
+    # Keyed on the canonical spec, not the compiled object: past the
+    # compile cache's size, evicted predicates are freed and ids reused
+    done: Dict[str, int] = {}
+    for row, spec in enumerate(specs):
+        key = canonical_json(spec or {})
+        first = done.setdefault(key, row)
+        if first != row:
+            result[row] = result[first]
+        else:
+            result[row] = _compile_cached(key).evaluate(columns)
+    return result
+
+
+@lru_cache(maxsize=4096)
+def _compile_cached(key: str) -> Predicate:
+    return Predicate(json.loads(key))
+
+
+# Parsing: predicates become a tree of ("all" | "any", children),
+# ("not", child) and ("leaf", path, op, arg) tuples shared by both backends.
+
+def _parse(spec: Any) -> Tuple:
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"applies_if: expected an object, got {spec!r}")
+
+    nodes: List[Tuple] = []
+    for key, value in spec.items():
+        if key in ("all", "any"):
+            if not isinstance(value, list):
+                raise ValueError(f"applies_if: '{key}' takes a list")
+            nodes.append((key, tuple(_parse(item) for item in value)))
+        elif key == "not":
+            nodes.append(("not", _parse(value)))
+        elif isinstance(value, Mapping):
+            if not value:
+                raise ValueError(f"applies_if: no operator given for '{key}'")
+            for op, arg in value.items():
+                nodes.append(_leaf(key, op, arg))
+        elif isinstance(value, list):
+            nodes.append(_leaf(key, "in", value))
+        else:
+            nodes.append(_leaf(key, "eq", value))
+    return nodes[0] if len(nodes) == 1 else ("all", tuple(nodes))
+
+
+def _leaf(path: str, op: str, arg: Any) -> Tuple:
+    if op not in _OPERATORS:
+        raise ValueError(f"applies_if: unknown operator '{op}' for '{path}'")
+    if op in _ORDERED and not _is_number(arg):
+        raise ValueError(f"applies_if: '{op}' on '{path}' needs a number, got {arg!r}")
+    if op in ("in", "nin"):
+        if not isinstance(arg, list):
+            raise ValueError(f"applies_if: '{op}' on '{path}' takes a list")
+        arg = tuple(_hashable(item) for item in arg)
+    if op == "between":
+        if not (isinstance(arg, list) and len(arg) == 2 and all(map(_is_number, arg))):
+            raise ValueError(f"applies_if: 'between' on '{path}' takes [low, high]")
+        arg = tuple(arg)
+    return ("leaf", path, op, _hashable(arg))
+
+
+# Per-feature backend: nested closures, built once per predicate. Each leaf
+# is specialized for its operator and argument type so the per-call work is
+# a lookup and a comparison.
+
+def _closure(node: Tuple) -> Test:
+    kind = node[0]
+    if kind == "not":
+        test = _closure(node[1])
+        return lambda feature: not test(feature)
+    if kind in ("all", "any"):
+        tests = [_closure(child) for child in node[1]]
+        if len(tests) == 1:
+            return tests[0]
+        if kind == "all":
+            if len(tests) == 2:
+                first, second = tests
+                return lambda feature: first(feature) and second(feature)
+
+            def all_of(feature: Feature) -> bool:
+                for test in tests:
+                    if not test(feature):
+                        return False
+                return True
+            return all_of
+
+        if len(tests) == 2:
+            first, second = tests
+            return lambda feature: first(feature) or second(feature)
+
+        def any_of(feature: Feature) -> bool:
+            for test in tests:
+                if test(feature):
+                    return True
+            return False
+        return any_of
+
+    _, path, op, arg = node
+    get = _getter(path)
+    if op == "exists":
+        wanted = bool(arg)
+        return lambda feature: (get(feature) is not _MISSING) is wanted
+    if op == "contains":
+        return lambda feature: _contains(get(feature), arg)
+
+    if op in _ORDERED or op == "between":
+        low, high = arg if op == "between" else (arg, arg)
+        compare = _ORDERED.get(op)
+
+        def numeric(feature: Feature) -> bool:
+            value = get(feature)
+            if type(value) not in _NUMBER_TYPES:
+                return False
+            return low <= value <= high if compare is None else compare(value, arg)
+        return numeric
+
+    # Numbers compare as floats, like the float64 columns of the vectorized path
+    numbers = _is_number(arg) if op in ("eq", "ne") else bool(arg) and all(map(_is_number, arg))
+    if numbers:
+        values = frozenset(map(float, arg)) if op in ("in", "nin") else {float(arg)}
+
+        def matches(feature: Feature) -> bool:
+            value = get(feature)
+            return type(value) in _NUMBER_TYPES and value in values
+    else:
+        values = frozenset(arg) if op in ("in", "nin") else {arg}
+
+        def matches(feature: Feature) -> bool:
+            value = get(feature)
+            if type(value) in _CONTAINER_TYPES:
+                value = _hashable(value)
+            return value in values
+
+    if op in ("eq", "in"):
+        return matches
+    return lambda feature: not matches(feature)
+
+
+# Vectorized backend: one boolean mask per node over all features
+
+def _vectorized(node: Tuple, columns: FeatureColumns) -> np.ndarray:
+    kind = node[0]
+    if kind == "all":
+        mask = np.ones(columns.size, dtype=bool)
+        for child in node[1]:
+            mask &= _vectorized(child, columns)
+        return mask
+    if kind == "any":
+        mask = np.zeros(columns.size, dtype=bool)
+        for child in node[1]:
+            mask |= _vectorized(child, columns)
+        return mask
+    if kind == "not":
+        return ~_vectorized(node[1], columns)
+
+    mask = columns._leaves.get(node)
+    if mask is None:
+        mask = _leaf_mask(node, columns)
+        mask.flags.writeable = False
+        columns._leaves[node] = mask
+    return mask.copy()
+
+
+def _leaf_mask(node: Tuple, columns: FeatureColumns) -> np.ndarray:
+    _, path, op, arg = node
+    if op in _ORDERED:
+        with np.errstate(invalid="ignore"):
+            return _ORDERED[op](columns.numeric(path), arg)
+    if op == "between":
+        values = columns.numeric(path)
+        return (values >= arg[0]) & (values <= arg[1])
+    if op in ("eq", "ne") and _is_number(arg):
+        mask = columns.numeric(path) == arg
+        return ~mask if op == "ne" else mask
+    if op in ("in", "nin") and arg and all(map(_is_number, arg)):
+        mask = np.isin(columns.numeric(path), np.asarray(arg, dtype=np.float64))
+        return ~mask if op == "nin" else mask
+
+    values = columns.objects(path)
+    if op == "exists":
+        return np.fromiter((v is not _MISSING for v in values), bool, columns.size) == bool(arg)
+    if op in ("eq", "ne"):
+        mask = np.fromiter((v == arg for v in values), bool, columns.size)
+        return ~mask if op == "ne" else mask
+    if op in ("in", "nin"):
+        allowed = frozenset(arg)
+        mask = np.fromiter((v in allowed for v in values), bool, columns.size)
+        return ~mask if op == "nin" else mask
+    return np.fromiter((_contains(v, arg) for v in values), bool, columns.size)
+
+
+# Shared helpers
+
+@lru_cache(maxsize=1024)
+def _getter(path: str) -> Callable[[Feature], Any]:
+    keys = tuple(path.split("."))
+
+    def get(feature: Feature) -> Any:
+        value = feature
+        for key in keys:
+            if type(value) is dict:
+                value = value.get(key)
+            elif isinstance(value, Mapping):
+                value = value.get(key)
+            else:
+                value = getattr(value, key, None)
+            if value is None:
+                return _MISSING
+        return value
+
+    return get
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) in _NUMBER_TYPES
+
+
+def _as_float(value: Any) -> float:
+    return float(value) if _is_number(value) else np.nan
+
+
+def _hashable(value: Any) -> Any:
+    """Lists become tuples so values can be compared, hashed and memoized."""
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+def _contains(value: Any, item: Any) -> bool:
+    return isinstance(value, (list, tuple, set, frozenset)) and item in value
@@ -0,0 +1,321 @@
+"""
+Group features into machining setups by approach direction.
+
+Every feature lists the directions it can be machined from
+(`FormattedFeature.directions`). All of them are packed into one unit
+vector array; candidate setup orientations come from the job's own
+`Job.directions` plus the distinct feature directions, merged within the
+angular tolerance. A (candidates x directions) reachability matrix is
+computed in one pass for the machine's kinematics, and setups are picked
+greedily: each next setup is the candidate reaching the most features not
+yet assigned.
+
+Kinematics, from `Machine.axis`, `a_axis`, `b_axis_tilt` and
+`c_axis_rotation`:
+
+    3-axis   a direction is reachable when it is within the tolerance of
+             the setup orientation.
+    4-axis   the setup fixes a rotary axis; a direction is reachable when
+             it is perpendicular to it (within the tolerance) and within
+             the A range either side of the setup's reference direction.
+    5-axis   a direction is reachable when it is within the B tilt limit
+             (plus the tolerance) of the setup orientation. With C travel
+             below 360 degrees, its angle around the setup orientation
+             must also be within half the travel (plus the tolerance) of
+             the setup's reference direction. B is taken to tilt both
+             ways, so each C position reaches opposite sides and 180
+             degrees of C reach every angle. A missing or unreadable
+             `c_axis_rotation` counts as a continuous C.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_TOLERANCE_DEG = 1.0
+
+_PRINCIPAL = np.array(
+    [[0, 0, 1], [0, 0, -1], [1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0]],
+    dtype=np.float64,
+)
+_PRINCIPAL_NAMES = ("+Z", "-Z", "+X", "-X", "+Y", "-Y")
+
+
+@dataclass(frozen=True)
+class MachineKinematics:
+    """What a machine can reach from one setup."""
+
+    axes: int = 3
+    # 4-axis: total A travel in degrees (360 for a full rotary)
+    rotary_range_deg: float = 360.0
+    # 5-axis: largest B tilt from the spindle axis in degrees
+    tilt_limit_deg: float = 0.0
+    # 5-axis: total C travel in degrees (360 for a continuous C)
+    rotation_range_deg: float = 360.0
+
+    @classmethod
+    def from_machine(cls, machine: Any) -> "MachineKinematics":
+        """Read kinematics from a `Machine` row or object; unknown means 3-axis."""
+        a_axis = getattr(machine, "a_axis", None)
+        b_tilt = getattr(machine, "b_axis_tilt", None)
+        c_rotation = getattr(machine, "c_axis_rotation", None)
+        axes = getattr(machine, "axis", None)
+        if axes is None:
+            axes = 5 if b_tilt else 4 if a_axis else 3
+        axes = int(axes)
+        if axes >= 5:
+            low, high = _angle_range(b_tilt, (-90.0, 90.0))
+            c_low, c_high = _angle_range(c_rotation, (0.0, 360.0))
+            return cls(
+                axes=5,
+                tilt_limit_deg=max(abs(low), abs(high)),
+                rotation_range_deg=min(360.0, c_high - c_low),
+            )
+        if axes == 4:
+            low, high = _angle_range(a_axis, (0.0, 360.0))
+            return cls(axes=4, rotary_range_deg=min(360.0, high - low))
+        return cls(axes=3)
+
+
+@dataclass
+class Setup:
+    """One candidate setup: an orientation and the features it machines."""
+
+    sequence: int
+    name: str
+    # 3/5-axis: part direction aligned with the spindle; 4-axis: rotary axis
+    direction: Tuple[float, float, float]
+    feature_ids: List[Any] = field(default_factory=list)
+
+
+@dataclass
+class SetupPlan:
+    setups: List[Setup]
+    # Features without any usable direction, or reachable from no candidate
+    unassigned: List[Any]
+
+    def setup_of(self) -> Dict[Any, str]:
+        """Feature id -> setup name."""
+        return {fid: setup.name for setup in self.setups for fid in setup.feature_ids}
+
+
+def parse_direction(value: Any) -> Optional[np.ndarray]:
+    """Unit vector from {"x", "y", "z"}, {"direction": ...} or [x, y, z]."""
+    if isinstance(value, dict):
+        if "direction" in value:
+            return parse_direction(value["direction"])
+        value = [value.get("x"), value.get("y"), value.get("z")]
+    try:
+        vector = np.asarray(value, dtype=np.float64).reshape(3)
+    except (TypeError, ValueError):
+        return None
+    norm = np.linalg.norm(vector)
+    if not np.isfinite(norm) or norm == 0:
+        return None
+    return vector / norm
+
+
+def pack_directions(
+    features: Sequence[Tuple[Any, Sequence[Any]]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack (feature_id, directions) pairs into one array.
+
+    Returns an (M, 3) array of unit vectors and, per vector, the index of
+    its feature in `features`. Unparseable directions are skipped.
+    """
+    vectors: List[np.ndarray] = []
+    owners: List[int] = []
+    for position, (_, directions) in enumerate(features):
+        for raw in directions or ():
+            vector = parse_direction(raw)
+            if vector is not None:
+                vectors.append(vector)
+                owners.append(position)
+    if not vectors:
+        return np.empty((0, 3)), np.empty(0, dtype=np.int64)
+    return np.vstack(vectors), np.asarray(owners, dtype=np.int64)
+
+
+def merge_directions(vectors: np.ndarray, tolerance_deg: float) -> np.ndarray:
+    """
+    Distinct directions, each standing for the vectors within the tolerance of it.
+
+    Vectors are first bucketed on a grid a little finer than the tolerance
+    so near-duplicates collapse in one vectorized pass. Bucket means are
+    then merged greedily, most populated first, and every representative
+    is re-centred on the mean of the vectors closest to it.
+    """
+    if not len(vectors):
+        return vectors
+    step = np.radians(tolerance_deg) / 2
+    _, bucket, counts = np.unique(
+        np.round(vectors / step).astype(np.int64), axis=0, return_inverse=True, return_counts=True
+    )
+    bucket = bucket.reshape(-1)
+    means = np.zeros((len(counts), 3))
+    np.add.at(means, bucket, vectors)
+    means /= np.linalg.norm(means, axis=1, keepdims=True)
+    means = means[np.argsort(-counts, kind="stable")]
+
+    cos_tolerance = np.cos(np.radians(tolerance_deg))
+    taken = np.zeros(len(means), dtype=bool)
+    representatives = []
+    for i in range(len(means)):
+        if not taken[i]:
+            representatives.append(i)
+            taken |= means @ means[i] >= cos_tolerance
+    centres = means[representatives]
+
+    nearest = np.argmax(vectors @ centres.T, axis=1)
+    sums = np.zeros_like(centres)
+    np.add.at(sums, nearest, vectors)
+    empty = np.bincount(nearest, minlength=len(centres)) == 0
+    sums[empty] = centres[empty]
+    return sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+
+def reachability(
+    candidates: np.ndarray,
+    vectors: np.ndarray,
+    kinematics: MachineKinematics,
+    tolerance_deg: float = DEFAULT_TOLERANCE_DEG,
+) -> np.ndarray:
+    """(candidates x vectors) boolean matrix: can setup k reach direction m."""
+    dots = np.clip(candidates @ vectors.T, -1.0, 1.0)
+    tolerance = np.radians(tolerance_deg)
+    if kinematics.axes >= 5:
+        tilted = dots >= np.cos(min(np.pi, np.radians(kinematics.tilt_limit_deg) + tolerance))
+        half_range = np.radians(kinematics.rotation_range_deg) / 2 + tolerance
+        if half_range >= np.pi / 2:
+            return tilted
+        # The reference is perpendicular to the setup orientation, so its
+        # dot with a direction is that of the direction's projection on
+        # the C plane, whose length is sin(tilt)
+        projected = np.sqrt(1.0 - dots ** 2)
+        references = _rotary_references(candidates)
+        around = np.abs(references @ vectors.T) >= np.cos(half_range) * projected
+        return tilted & (around | (projected <= np.sin(tolerance)))
+    if kinematics.axes == 4:
+        in_plane = np.abs(dots) <= np.sin(tolerance)
+        if kinematics.rotary_range_deg >= 360.0:
+            return in_plane
+        half_range = np.radians(kinematics.rotary_range_deg) / 2 + tolerance
+        references = _rotary_references(candidates)
+        within = references @ vectors.T >= np.cos(min(np.pi, half_range))
+        return in_plane & within
+    return dots >= np.cos(tolerance)
+
+
+def group_setups(
+    features: Sequence[Tuple[Any, Sequence[Any]]],
+    kinematics: Optional[MachineKinematics] = None,
+    job_directions: Sequence[Any] = (),
+    tolerance_deg: float = DEFAULT_TOLERANCE_DEG,
+) -> SetupPlan:
+    """
+    Assign features to as few setups as the greedy cover finds.
+
+    `features` are (feature_id, directions) pairs. Candidates from
+    `job_directions` win ties against candidates derived from the features.
+    """
+    kinematics = kinematics or MachineKinematics()
+    vectors, owners = pack_directions(features)
+    candidates = _candidates(vectors, job_directions, kinematics, tolerance_deg)
+    if not len(candidates):
+        return SetupPlan([], [fid for fid, _ in features])
+
+    # Reachability per direction, folded per feature (any of its directions)
+    reach = reachability(candidates, vectors, kinematics, tolerance_deg)
+    covers = np.zeros((len(candidates), len(features)), dtype=bool)
+    if len(owners):
+        # pack_directions emits owners in order, so each feature is one run
+        present, starts = np.unique(owners, return_index=True)
+        covers[:, present] = np.logical_or.reduceat(reach, starts, axis=1)
+
+    setups: List[Setup] = []
+    remaining = covers.any(axis=0)
+    while remaining.any():
+        gains = (covers & remaining).sum(axis=1)
+        best = int(np.argmax(gains))
+        members = np.flatnonzero(covers[best] & remaining)
+        remaining[members] = False
+        direction = candidates[best]
+        sequence = len(setups) + 1
+        setups.append(Setup(
+            sequence=sequence,
+            name=f"Setup {sequence} {_direction_label(direction, tolerance_deg)}".rstrip(),
+            direction=tuple(float(v) for v in direction),
+            feature_ids=[features[i][0] for i in members],
+        ))
+
+    reachable = covers.any(axis=0)
+    unassigned = [features[i][0] for i in np.flatnonzero(~reachable)]
+    return SetupPlan(setups, unassigned)
+
+
+def _candidates(
+    vectors: np.ndarray,
+    job_directions: Sequence[Any],
+    kinematics: MachineKinematics,
+    tolerance_deg: float,
+) -> np.ndarray:
+    preferred = [v for v in (parse_direction(d) for d in job_directions) if v is not None]
+    if kinematics.axes == 4:
+        # The rotary axis is a fixture choice: the part's principal axes
+        # (a fixture along +X and -X is the same setup)
+        derived = _PRINCIPAL[[0, 2, 4]]
+    else:
+        derived = merge_directions(vectors, tolerance_deg)
+    stacked = [np.asarray(preferred).reshape(-1, 3), derived.reshape(-1, 3)]
+    candidates = np.vstack(stacked)
+    if not len(candidates):
+        return candidates
+
+    # Drop derived candidates that duplicate a preferred one
+    keep = np.ones(len(candidates), dtype=bool)
+    if preferred and len(derived):
+        close = candidates[len(preferred):] @ candidates[:len(preferred)].T
+        keep[len(preferred):] = ~(close >= np.cos(np.radians(tolerance_deg))).any(axis=1)
+    return candidates[keep]
+
+
+def _rotary_references(axes: np.ndarray) -> np.ndarray:
+    """Zero position of a rotary axis: +Z, or +Y when the axis is along Z."""
+    up = np.where((np.abs(axes[:, 2]) > 0.9)[:, None], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])
+    reference = up - (up * axes).sum(axis=1, keepdims=True) * axes
+    return reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+
+def _direction_label(direction: np.ndarray, tolerance_deg: float) -> str:
+    dots = _PRINCIPAL @ direction
+    best = int(np.argmax(dots))
+    return _PRINCIPAL_NAMES[best] if dots[best] >= np.cos(np.radians(tolerance_deg)) else ""
+
+
+def _angle_range(value: Any, default: Tuple[float, float]) -> Tuple[float, float]:
+    """(min, max) degrees from a number, [min, max] or a {"min", "max"}-like dict."""
+    if isinstance(value, (int, float)):
+        return (-abs(float(value)), abs(float(value)))
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        try:
+            return (float(value[0]), float(value[1]))
+        except (TypeError, ValueError):
+            return default
+    if isinstance(value, dict):
+        low = _first_number(value, ("min", "min_deg", "min_angle", "minimum", "from"))
+        high = _first_number(value, ("max", "max_deg", "max_angle", "maximum", "to", "range"))
+        if high is None:
+            return default
+        return (low if low is not None else -high, high)
+    return default
+
+
+def _first_number(values: Dict, keys: Sequence[str]) -> Optional[float]:
+    for key in keys:
+        try:
+            return float(values[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
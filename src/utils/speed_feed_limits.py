@@ -0,0 +1,315 @@
+"""
+Cap the speeds and feeds of a plan's operations to a machine's limits.
+
+The rules, applied to each set of `SpeedAndFeed` values:
+
+  1. Rigidity derating: feed per tooth, stepdown and the cutting and
+     plunge feeds are multiplied by the rigidity factor.
+  2. Spindle speed above the machine's maximum is capped; surface speed
+     and the feeds are scaled by the same ratio so chip load is kept.
+  3. Cutting and plunge feeds are capped at the machine's cutting feed,
+     retract feed at its rapid feed (the cutting feed when unknown).
+
+Limits that are unknown (NaN) cap nothing. `clamp_arrays` applies them
+to whole columns at once, `clamp_presets` to structured preset arrays and
+`clamp_plan_operations` to the JSON entries of a plan, where each entry
+whose values changed lists them under "clamped" with the reasons as flag
+bits and keeps their values from before under "unclamped".
+"""
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+VALUE_FIELDS = (
+    "spindle_speed",
+    "surface_speed",
+    "cutting_feedrate",
+    "feed_per_tooth",
+    "stepdown",
+    "stepover",
+    "plunge_feedrate",
+    "retract_feedrate",
+)
+
+_VALUE_SET = frozenset(VALUE_FIELDS)
+
+DERATED_FIELDS = ("cutting_feedrate", "feed_per_tooth", "stepdown", "plunge_feedrate")
+
+# Scaled with the spindle speed when it is capped
+_SPINDLE_SCALED = ("spindle_speed", "surface_speed", "cutting_feedrate", "plunge_feedrate")
+
+# Flag bits of the reasons a value changed
+DERATED = 1
+SPINDLE_CAPPED = 2
+FEED_CAPPED = 4
+
+# Job.machine_rigidity levels -> derating factor
+RIGIDITY_FACTORS = {
+    "very_low": 0.6,
+    "low": 0.7,
+    "medium": 0.85,
+    "high": 1.0,
+    "very_high": 1.0,
+}
+
+# Rigidity values already logged as unknown
+_REPORTED_RIGIDITIES: Set[Any] = set()
+
+
+def rigidity_factor(value: Any) -> float:
+    """
+    Derating factor of a rigidity level name, factor or percentage.
+
+    Accepted are the RIGIDITY_FACTORS level names, numbers in (0, 1] (the
+    factor itself) and strings such as "85%" (a percentage in (0, 100]).
+    Other numbers have no known scale, e.g. a 1-10 rating would read as a
+    tiny factor, so they are logged once and, like None or an unknown
+    name, mean no derating.
+    """
+    if value is None:
+        return 1.0
+    factor: Optional[float] = None
+    if isinstance(value, str):
+        text = value.strip().lower()
+        key = text.replace(" ", "_").replace("-", "_")
+        if key in RIGIDITY_FACTORS:
+            return RIGIDITY_FACTORS[key]
+        try:
+            if text.endswith("%"):
+                percent = float(text[:-1])
+                factor = percent / 100.0 if 0 < percent <= 100 else None
+            else:
+                factor = float(text)
+        except ValueError:
+            pass
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        factor = float(value)
+    if factor is not None and 0 < factor <= 1:
+        return factor
+    if value not in _REPORTED_RIGIDITIES:
+        _REPORTED_RIGIDITIES.add(value)
+        logger.warning("Unknown machine rigidity %r; not derating", value)
+    return 1.0
+
+
+@dataclass(frozen=True)
+class MachineLimits:
+    """Limits in the units of the speed and feed values (rpm, feed unit)."""
+
+    spindle_rpm: float = math.nan
+    cutting_feed: float = math.nan
+    rapid_feed: float = math.nan
+    rigidity: float = 1.0
+
+    @classmethod
+    def from_specs(
+        cls, specs: Mapping[str, float], rigidity: Any = None, feed_factor: float = 1.0
+    ) -> "MachineLimits":
+        """
+        Limits from `machine_specs` output; `feed_factor` converts its mm/min
+        feeds to the unit of the speed and feed values.
+        """
+        return cls(
+            spindle_rpm=specs.get("spindle_rpm", math.nan),
+            cutting_feed=specs.get("cutting_feed", math.nan) * feed_factor,
+            rapid_feed=specs.get("rapid_feed", math.nan) * feed_factor,
+            rigidity=rigidity_factor(rigidity),
+        )
+
+
+def clamp_arrays(
+    values: Mapping[str, np.ndarray], limits: MachineLimits
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Apply `limits` to equal-length value arrays.
+
+    Returns the new arrays and, per field, the flag bits of why each value
+    changed (0 where it did not).
+    """
+    size = len(next(iter(values.values()))) if values else 0
+    out = {
+        name: np.array(values.get(name, np.full(size, np.nan)), dtype=np.float64)
+        for name in VALUE_FIELDS
+    }
+    flags = {name: np.zeros(size, dtype=np.int8) for name in VALUE_FIELDS}
+
+    if limits.rigidity != 1.0:
+        for name in DERATED_FIELDS:
+            present = ~np.isnan(out[name])
+            out[name][present] *= limits.rigidity
+            flags[name][present] |= DERATED
+
+    if not math.isnan(limits.spindle_rpm):
+        rpm = out["spindle_speed"]
+        over = rpm > limits.spindle_rpm
+        if over.any():
+            ratio = np.ones(size)
+            ratio[over] = limits.spindle_rpm / rpm[over]
+            for name in _SPINDLE_SCALED:
+                scaled = over & ~np.isnan(out[name])
+                out[name][scaled] *= ratio[scaled]
+                flags[name][scaled] |= SPINDLE_CAPPED
+
+    rapid = limits.rapid_feed if not math.isnan(limits.rapid_feed) else limits.cutting_feed
+    for name, cap in (
+        ("cutting_feedrate", limits.cutting_feed),
+        ("plunge_feedrate", limits.cutting_feed),
+        ("retract_feedrate", rapid),
+    ):
+        if math.isnan(cap):
+            continue
+        over = out[name] > cap
+        out[name][over] = cap
+        flags[name][over] |= FEED_CAPPED
+    return out, flags
+
+
+def clamp_presets(rows: np.ndarray, limits: MachineLimits) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Apply `limits` to a structured array with the VALUE_FIELDS columns,
+    such as `SpeedFeedIndex` lookup rows.
+
+    Returns a copy with the new values and an (N, len(VALUE_FIELDS)) int8
+    array of flag bits.
+    """
+    out = rows.copy()
+    clamped, flags = clamp_arrays({name: rows[name] for name in VALUE_FIELDS}, limits)
+    for name in VALUE_FIELDS:
+        out[name] = clamped[name]
+    return out, np.column_stack([flags[name] for name in VALUE_FIELDS]).reshape(-1, len(VALUE_FIELDS))
+
+
+def clamp_plan_operations(
+    plans: Sequence[Mapping], limits: MachineLimits, key: Optional[str] = "speed_feed"
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Apply `limits` to every operation entry of `plans`.
+
+    `operations` may be a list, {"operations": [...]} or a dict of
+    entries. Values are read from the entry's `key` dict when it has one,
+    otherwise from the entry itself. Returns copies of the plans with the
+    new values, plus the number of entries seen and changed. Each changed
+    entry gets a "clamped" {field: flag bits} map and an "unclamped"
+    {field: value before} map.
+
+    Entries that already carry "unclamped" values (plans built from
+    earlier output, such as the setups a replan carries over) are clamped
+    from those values, so running the stage again gives the same result
+    instead of derating twice. A builder that changes a clamped value
+    should drop both maps from the entry.
+
+    Plan entries are JSON dicts, so this makes one pass per entry with
+    the rules of `clamp_arrays`: gathering them into arrays and writing
+    the results back saves little on small plans and costs more on large
+    ones (see `src.benchmarks.speed_feed_limits`). Use `clamp_presets` on values
+    that are already columnar.
+    """
+    targets: List[Dict[str, Any]] = []
+    entries: List[Dict[str, Any]] = []
+    plans = [_copy_plan(plan, key, targets, entries) for plan in plans]
+
+    rapid = limits.rapid_feed if not math.isnan(limits.rapid_feed) else limits.cutting_feed
+    feed_caps = (
+        ("cutting_feedrate", limits.cutting_feed),
+        ("plunge_feedrate", limits.cutting_feed),
+        ("retract_feedrate", rapid),
+    )
+    clamped = 0
+    for target, entry in zip(targets, entries):
+        values = {name: _number(target.get(name)) for name in VALUE_FIELDS}
+        previous = entry.get("unclamped")
+        if previous and isinstance(previous, dict):
+            for name, value in previous.items():
+                if name in _VALUE_SET:
+                    values[name] = _number(value)
+        else:
+            previous = {}
+        flags: Dict[str, int] = {}
+        if limits.rigidity != 1.0:
+            for name in DERATED_FIELDS:
+                if not math.isnan(values[name]):
+                    values[name] *= limits.rigidity
+                    flags[name] = DERATED
+        # NaN compares false, so unknown speeds and limits cap nothing
+        if values["spindle_speed"] > limits.spindle_rpm:
+            ratio = limits.spindle_rpm / values["spindle_speed"]
+            for name in _SPINDLE_SCALED:
+                if not math.isnan(values[name]):
+                    values[name] *= ratio
+                    flags[name] = flags.get(name, 0) | SPINDLE_CAPPED
+        for name, cap in feed_caps:
+            if values[name] > cap:
+                values[name] = cap
+                flags[name] = flags.get(name, 0) | FEED_CAPPED
+        for name, value in previous.items():
+            if name in _VALUE_SET and name not in flags:
+                target[name] = value
+        if flags:
+            entry["unclamped"] = {
+                name: previous[name] if name in previous else target.get(name) for name in flags
+            }
+            for name in flags:
+                target[name] = values[name]
+            entry["clamped"] = flags
+            clamped += 1
+        else:
+            entry.pop("clamped", None)
+            entry.pop("unclamped", None)
+    return plans, {"operations": len(targets), "clamped": clamped}
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _copy_plan(
+    plan: Mapping,
+    key: Optional[str] = "speed_feed",
+    targets: Optional[List[Dict[str, Any]]] = None,
+    entries: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Copy of a plan with fresh containers down to the value dicts, so
+    clamping leaves the original alone; other values are shared. Entries
+    holding speed and feed values, and the dicts holding the values, are
+    collected into `entries` and `targets` on the way.
+    """
+    collect = (targets if targets is not None else [], entries if entries is not None else [])
+    return {**plan, "operations": _copy_operations(plan.get("operations"), key, collect)}
+
+
+def _copy_operations(operations: Any, key: Optional[str], collect: Tuple[list, list]) -> Any:
+    if isinstance(operations, dict):
+        if isinstance(operations.get("operations"), list):
+            return {
+                **operations,
+                "operations": _copy_operations(operations["operations"], key, collect),
+            }
+        return {name: _copy_entry(entry, key, collect) for name, entry in operations.items()}
+    if isinstance(operations, list):
+        return [_copy_entry(entry, key, collect) for entry in operations]
+    return operations
+
+
+def _copy_entry(entry: Any, key: Optional[str], collect: Tuple[list, list]) -> Any:
+    if not isinstance(entry, dict):
+        return entry
+    entry = dict(entry)
+    target = entry
+    if key and isinstance(entry.get(key), dict):
+        target = entry[key] = dict(entry[key])
+    if not _VALUE_SET.isdisjoint(target):
+        collect[0].append(target)
+        collect[1].append(entry)
+    return entry
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.utils.index_codec import CODECS, VARINT, pack_indices, unpack_indices
+
+
+INT32_MIN = int(np.iinfo(np.int32).min)
+INT32_MAX = int(np.iinfo(np.int32).max)
+
+CASES = {
+    "empty": [],
+    "single": [7],
+    "sorted": list(range(0, 3000, 3)),
+    "clustered": [5, 6, 7, 1000, 1001, 2, 3, 4],
+    "extremes": [INT32_MIN, INT32_MAX, 0, INT32_MAX, INT32_MIN, -1],
+}
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+@pytest.mark.parametrize("name", list(CASES))
+def test_round_trip(codec, name):
+    values = CASES[name]
+    packed = pack_indices(values, codec)
+    unpacked = unpack_indices(packed)
+
+    assert packed[:4] == bytes((CODECS[codec], 0, 0, 0))
+    assert unpacked.dtype == np.int32
+    assert unpacked.tolist() == values
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+def test_numpy_and_iterable_inputs_pack_the_same(codec):
+    values = [3, 1, 4, 1, 5, 9, 2, 6]
+    assert pack_indices(np.array(values, dtype=np.int32), codec) == pack_indices(iter(values), codec)
+
+
+def test_int32_unpacks_as_a_read_only_view():
+    packed = pack_indices([1, 2, 3], "int32")
+    unpacked = unpack_indices(packed)
+
+    assert len(packed) == 4 + 3 * 4
+    assert not unpacked.flags.writeable
+
+
+def test_varint_is_compact_for_sorted_indices():
+    values = list(range(10000))
+    assert len(pack_indices(values, "varint")) == 4 + len(values)
+
+
+def test_none_unpacks_to_an_empty_array():
+    assert unpack_indices(None).tolist() == []
+
+
+@pytest.mark.parametrize("values", [[INT32_MAX + 1], [INT32_MIN - 1], [[1, 2], [3, 4]]])
+def test_pack_rejects_values_outside_int32_or_not_1d(values):
+    with pytest.raises(ValueError):
+        pack_indices(values)
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"\x01\x00",
+    bytes((99, 0, 0, 0)),
+    bytes((VARINT, 0, 0, 0, 0x80)),
+])
+def test_unpack_rejects_malformed_payloads(data):
+    with pytest.raises(ValueError):
+        unpack_indices(data)
+
+
+def test_unknown_codec_name_is_rejected():
+    with pytest.raises(ValueError):
+        pack_indices([1], "zstd")
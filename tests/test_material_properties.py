@@ -0,0 +1,59 @@
+import pytest
+
+from src.utils.material_properties import (
+    PropertyRange, parse_material_properties, parse_property
+)
+
+
+@pytest.mark.parametrize("column, text, expected", [
+    ("hardness", "200-250 HB", PropertyRange(200.0, 250.0, "hb")),
+    ("hardness", "28-32 HRC", PropertyRange(272.8, 302.4, "hrc")),
+    ("hardness", "max. 250 HB", PropertyRange(None, 250.0, "hb")),
+    ("hardness", "187 HB max", PropertyRange(None, 187.0, "hb")),
+    ("hardness", "95 HRB", PropertyRange(212.5, 212.5, "hrb")),
+    ("hardness", "HV10 300", PropertyRange(285.0, 285.0, "hv")),
+    ("tensile_strength", "515 MPa (75 ksi)", PropertyRange(515.0, 515.0, "mpa")),
+    ("tensile_strength", "200 ± 10 MPa", PropertyRange(190.0, 210.0, "mpa")),
+    ("yield_strength", "75,000 psi", PropertyRange(517.107, 517.107, "psi")),
+    ("elongation", "≥ 40 %", PropertyRange(40.0, None, "%")),
+    ("modulus_elasticity", "28 x 10^6 psi", PropertyRange(193.05328, 193.05328, "psi")),
+    ("modulus_elasticity", "1,5 GPa", PropertyRange(1.5, 1.5, "gpa")),
+    ("hardness", "200", PropertyRange(200.0, 200.0, None)),
+])
+def test_sample_strings(column, text, expected):
+    assert parse_property(column, text) == expected
+
+
+@pytest.mark.parametrize("text", ["70 HRC", "15 HRC", "110 HRB", "max 70 HRC"])
+def test_rockwell_outside_the_table_is_not_converted(text):
+    assert parse_property("hardness", text) is None
+
+
+def test_out_of_table_rockwell_falls_through_to_the_next_value():
+    assert parse_property("hardness", "70 HRC / 250 HB") == PropertyRange(250.0, 250.0, "hb")
+
+
+@pytest.mark.parametrize("column, text", [
+    ("hardness", None),
+    ("hardness", ""),
+    ("hardness", "about"),
+    ("tensile_strength", "250 HB"),
+])
+def test_texts_without_a_usable_value(column, text):
+    assert parse_property(column, text) is None
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(ValueError):
+        parse_property("density", "7.8 g/cm3")
+
+
+def test_material_row_columns():
+    values = parse_material_properties({"hardness": "200-250 HB", "elongation": "≥ 40 %"})
+
+    assert values["hardness_min_hb"] == 200.0
+    assert values["hardness_max_hb"] == 250.0
+    assert values["elongation_min_pct"] == 40.0
+    assert values["elongation_max_pct"] is None
+    assert values["tensile_strength_min_mpa"] is None
+    assert len(values) == 10
@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.benchmarks.predicates import interpret, make_features, make_policies
+from src.utils.predicates import FeatureColumns, compile_predicate, evaluate_many
+
+
+FEATURES = [
+    {"feature_type": "hole", "dimensions": {"diameter": 6.0, "depth": 12}, "required_ops": ["drill"]},
+    {"feature_type": "pocket", "dimensions": {"width": 40.0}, "required_ops": ["rough_mill"]},
+    {"feature_type": "hole", "dimensions": {"diameter": 14}, "required_ops": []},
+    {"feature_type": "slot", "dimensions": {"diameter": "n/a"}},
+    {},
+]
+
+
+def test_interpret_closures_and_vectorized_agree():
+    rng = random.Random(3)
+    features = make_features(300, rng)
+    policies = make_policies(200, rng)
+
+    interpreted = np.array([[interpret(spec, f) for f in features] for spec in policies])
+    closures = np.array([[compile_predicate(spec)(f) for f in features] for spec in policies])
+    vectorized = evaluate_many(policies, features)
+
+    assert np.array_equal(closures, interpreted)
+    assert np.array_equal(vectorized, interpreted)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ({}, [True, True, True, True, True]),
+    ({"feature_type": "hole"}, [True, False, True, False, False]),
+    ({"feature_type": ["pocket", "slot"]}, [False, True, False, True, False]),
+    ({"dimensions.diameter": {"gte": 3, "lt": 12}}, [True, False, False, False, False]),
+    ({"dimensions.diameter": {"between": [6, 14]}}, [True, False, True, False, False]),
+    ({"dimensions.diameter": {"ne": 6}}, [False, True, True, True, True]),
+    ({"feature_type": {"nin": ["hole"]}}, [False, True, False, True, True]),
+    ({"dimensions.width": {"exists": True}}, [False, True, False, False, False]),
+    ({"dimensions.width": {"exists": False}}, [True, False, True, True, True]),
+    ({"required_ops": {"contains": "drill"}}, [True, False, False, False, False]),
+    ({"any": [{"feature_type": "slot"}, {"not": {"feature_type": "hole"}}]},
+     [False, True, False, True, True]),
+])
+def test_closure_and_vectorized_strategies_on_edge_cases(spec, expected):
+    predicate = compile_predicate(spec)
+
+    assert [predicate(f) for f in FEATURES] == expected
+    assert predicate.evaluate(FeatureColumns(FEATURES)).tolist() == expected
+
+
+def test_evaluate_many_repeats_identical_predicates():
+    specs = [{"feature_type": "hole"}, None, {"feature_type": "hole"}]
+    result = evaluate_many(specs, FEATURES)
+
+    assert result.shape == (3, len(FEATURES))
+    assert np.array_equal(result[0], result[2])
+    assert result[1].all()
+
+
+@pytest.mark.parametrize("spec", [
+    {"dimensions.diameter": {"gte": "3"}},
+    {"dimensions.diameter": {"between": [1]}},
+    {"feature_type": {"like": "h%"}},
+    {"any": {"feature_type": "hole"}},
+    {"feature_type": {}},
+])
+def test_invalid_predicates_are_rejected(spec):
+    with pytest.raises(ValueError):
+        compile_predicate(spec)
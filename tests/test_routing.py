@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.postgres.routing import ReplicaRouter, make_routing_session_class
+
+
+ITEMS = Table("items", MetaData(), Column("id", Integer, primary_key=True))
+
+
+def make_session(committed_lsn=0, replayed_lsn=0):
+    # Engines are never connected while the replica is known to be caught up
+    # or the lag check is not yet due
+    router = ReplicaRouter(create_engine("sqlite://"), create_engine("sqlite://"))
+    router.committed_lsn = committed_lsn
+    router.replayed_lsn = replayed_lsn
+    router._checked_at = time.monotonic()
+    router.lag_check_interval = 3600
+    return make_routing_session_class(router)(), router
+
+
+def test_plain_read_goes_to_the_replica_once_caught_up():
+    session, router = make_session(committed_lsn=10, replayed_lsn=10)
+
+    assert session.get_bind(clause=select(ITEMS)) is router.replica
+    assert not session.info.get("wrote")
+
+
+def test_plain_read_stays_on_the_primary_while_the_replica_lags():
+    session, router = make_session(committed_lsn=10, replayed_lsn=5)
+
+    assert session.get_bind(clause=select(ITEMS)) is router.primary
+    assert not session.info.get("wrote")
+
+
+def test_read_after_a_write_in_the_same_session_goes_to_the_primary():
+    session, router = make_session()
+
+    assert session.get_bind(clause=insert(ITEMS)) is router.primary
+    assert session.get_bind(clause=select(ITEMS)) is router.primary
+
+
+@pytest.mark.parametrize("clause", [
+    None,
+    insert(ITEMS),
+    text("SELECT 1"),
+    select(ITEMS).with_for_update(),
+], ids=["none", "insert", "text", "for_update"])
+def test_statements_that_may_write_mark_the_session_written(clause):
+    session, router = make_session()
+
+    assert session.get_bind(clause=clause) is router.primary
+    assert session.info["wrote"]
+
+
+def replica_router():
+    from src.config import get_settings
+    from src.db.postgres.connection import get_replica_router
+
+    try:
+        configured = get_settings().postgres_replica_async_url
+    except ValidationError:
+        configured = None
+    if not configured:
+        pytest.skip("no read replica configured")
+    return get_replica_router()
+
+
+def test_reads_follow_the_replica_lsn():
+    router = replica_router()
+    session_class = make_routing_session_class(router)
+
+    async def bind_for(session, clause):
+        return await session.run_sync(lambda sync: sync.get_bind(clause=clause))
+
+    async def main():
+        # A write commit moves the committed LSN past the replica
+        async with AsyncSession(sync_session_class=session_class) as session:
+            await session.execute(text("SELECT txid_current()"))
+            assert await bind_for(session, select(1)) is router.primary
+            await session.commit()
+
+        async with AsyncSession(sync_session_class=session_class) as session:
+            deadline = time.monotonic() + 10
+            while await bind_for(session, select(1)) is not router.replica:
+                assert time.monotonic() < deadline, "replica never caught up"
+                await asyncio.sleep(router.lag_check_interval)
+            assert router.replayed_lsn >= router.committed_lsn
+            assert not session.info.get("wrote")
+
+    asyncio.run(main())
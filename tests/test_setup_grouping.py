@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.utils.setup_grouping import MachineKinematics, group_setups, reachability
+
+
+# A block with features on four faces, one on a 30 degree incline, one
+# reachable from two faces and two without a usable direction
+PART = [
+    ("top", [{"x": 0, "y": 0, "z": 1}]),
+    ("top_unnormalized", [[0, 0, 2]]),
+    ("bottom", [[0, 0, -1]]),
+    ("side_x", [[1, 0, 0]]),
+    ("side_y", [{"direction": [0, 1, 0]}]),
+    ("top_or_side", [[0, 0, 1], [1, 0, 0]]),
+    ("incline", [[0, 0.5, 0.866]]),
+    ("no_directions", []),
+    ("zero_vector", [[0, 0, 0]]),
+]
+
+
+def grouped(plan):
+    return [(setup.name, sorted(setup.feature_ids)) for setup in plan.setups]
+
+
+def test_three_axis_needs_a_setup_per_face():
+    plan = group_setups(PART, MachineKinematics(axes=3))
+
+    assert grouped(plan) == [
+        ("Setup 1 +Z", ["top", "top_or_side", "top_unnormalized"]),
+        ("Setup 2 +X", ["side_x"]),
+        ("Setup 3 -Z", ["bottom"]),
+        ("Setup 4", ["incline"]),
+        ("Setup 5 +Y", ["side_y"]),
+    ]
+    assert plan.unassigned == ["no_directions", "zero_vector"]
+    assert [setup.sequence for setup in plan.setups] == [1, 2, 3, 4, 5]
+
+
+def test_four_axis_reaches_every_face_around_the_rotary_axis():
+    plan = group_setups(PART, MachineKinematics(axes=4))
+
+    assert grouped(plan) == [
+        ("Setup 1 +X", ["bottom", "incline", "side_y", "top", "top_or_side", "top_unnormalized"]),
+        ("Setup 2 +Z", ["side_x"]),
+    ]
+    assert plan.unassigned == ["no_directions", "zero_vector"]
+
+
+def test_four_axis_with_limited_travel():
+    plan = group_setups(PART, MachineKinematics(axes=4, rotary_range_deg=90))
+
+    assert grouped(plan) == [
+        ("Setup 1 +X", ["incline", "top", "top_or_side", "top_unnormalized"]),
+        ("Setup 2 +Z", ["side_y"]),
+    ]
+    assert sorted(plan.unassigned) == ["bottom", "no_directions", "side_x", "zero_vector"]
+
+
+def test_five_axis_reaches_the_whole_hemisphere_in_one_setup():
+    plan = group_setups(PART, MachineKinematics(axes=5, tilt_limit_deg=90))
+
+    assert len(plan.setups) == 1
+    assert sorted(plan.setups[0].feature_ids) == sorted(
+        fid for fid, _ in PART if fid not in ("no_directions", "zero_vector")
+    )
+
+
+def test_five_axis_with_limited_c_travel():
+    kinematics = MachineKinematics(axes=5, tilt_limit_deg=110, rotation_range_deg=60)
+    plan = group_setups(PART, kinematics)
+
+    assert grouped(plan) == [
+        ("Setup 1 +X", ["bottom", "incline", "side_x", "top", "top_or_side", "top_unnormalized"]),
+        ("Setup 2 +Z", ["side_y"]),
+    ]
+
+
+def test_limited_c_reaches_both_sides_of_the_reference():
+    # Setup +Z: the C reference is +Y
+    setup = np.array([[0.0, 0.0, 1.0]])
+    directions = np.array([
+        [0, 0, 1], [0, 1, 0], [0, -1, 0], [1, 0, 0], [0.5, 0.866, 0], [0.7071, 0.7071, 0],
+    ], dtype=np.float64)
+    limited = MachineKinematics(axes=5, tilt_limit_deg=110, rotation_range_deg=60)
+    continuous = MachineKinematics(axes=5, tilt_limit_deg=110)
+
+    assert reachability(setup, directions, limited).tolist() == [
+        [True, True, True, False, True, False]
+    ]
+    assert reachability(setup, directions, continuous).all()
+
+
+@pytest.mark.parametrize("machine, expected", [
+    (SimpleNamespace(axis=3), MachineKinematics(axes=3)),
+    (SimpleNamespace(axis=None, a_axis={"min": 0, "max": 360}), MachineKinematics(axes=4)),
+    (SimpleNamespace(axis=4, a_axis=[-45, 45]), MachineKinematics(axes=4, rotary_range_deg=90)),
+    (
+        SimpleNamespace(axis=5, b_axis_tilt={"min": -110, "max": 30}),
+        MachineKinematics(axes=5, tilt_limit_deg=110),
+    ),
+    (
+        SimpleNamespace(axis=5, b_axis_tilt=90, c_axis_rotation={"min": -30, "max": 30}),
+        MachineKinematics(axes=5, tilt_limit_deg=90, rotation_range_deg=60),
+    ),
+    (
+        SimpleNamespace(axis=5, b_axis_tilt=90, c_axis_rotation="continuous"),
+        MachineKinematics(axes=5, tilt_limit_deg=90),
+    ),
+    (SimpleNamespace(), MachineKinematics(axes=3)),
+])
+def test_kinematics_from_machine(machine, expected):
+    assert MachineKinematics.from_machine(machine) == expected
+
+
+def test_job_directions_win_ties():
+    features = [("a", [[1, 0, 0], [0, 0, 1]])]
+
+    assert grouped(group_setups(features, job_directions=[[1, 0, 0]])) == [("Setup 1 +X", ["a"])]
+    assert grouped(group_setups(features, job_directions=[[0, 0, 1]])) == [("Setup 1 +Z", ["a"])]
+
+
+def test_no_usable_directions():
+    plan = group_setups([("a", []), ("b", None)], MachineKinematics(axes=5, tilt_limit_deg=90))
+
+    assert plan.setups == []
+    assert plan.unassigned == ["a", "b"]
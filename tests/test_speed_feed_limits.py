@@ -0,0 +1,91 @@
+import logging
+import math
+
+import pytest
+
+from src.utils.speed_feed_limits import (
+    _REPORTED_RIGIDITIES, DERATED, FEED_CAPPED, SPINDLE_CAPPED, MachineLimits,
+    clamp_plan_operations, rigidity_factor
+)
+
+
+def make_plan():
+    return {
+        "setup_name": "Setup 1",
+        "sequence": 1,
+        "operations": [
+            {
+                "feature_id": "f1",
+                "speed_feed": {
+                    "spindle_speed": 12000.0,
+                    "surface_speed": 300.0,
+                    "cutting_feedrate": 3000.0,
+                    "feed_per_tooth": 0.05,
+                    "stepdown": 1.0,
+                    "plunge_feedrate": 800.0,
+                    "retract_feedrate": 20000.0,
+                },
+            },
+            {
+                "feature_id": "f2",
+                "speed_feed": {"spindle_speed": 4000.0, "cutting_feedrate": 900.0},
+            },
+        ],
+    }
+
+
+LIMITS = MachineLimits(
+    spindle_rpm=10000, cutting_feed=5000, rapid_feed=math.nan, rigidity=rigidity_factor("medium")
+)
+
+
+def test_clamping_twice_gives_the_same_plan():
+    once, counts = clamp_plan_operations([make_plan()], LIMITS)
+    twice, _ = clamp_plan_operations(once, LIMITS)
+
+    assert counts == {"operations": 2, "clamped": 2}
+    assert twice == once
+    first = once[0]["operations"][0]
+    assert math.isclose(first["speed_feed"]["cutting_feedrate"], 3000 * 0.85 * 10000 / 12000)
+    assert math.isclose(first["speed_feed"]["feed_per_tooth"], 0.05 * 0.85)
+    assert first["clamped"]["cutting_feedrate"] == DERATED | SPINDLE_CAPPED
+    assert first["clamped"]["retract_feedrate"] == FEED_CAPPED
+    assert first["unclamped"]["cutting_feedrate"] == 3000.0
+
+
+def test_clamping_leaves_the_input_alone():
+    plan = make_plan()
+    clamp_plan_operations([plan], LIMITS)
+    assert plan == make_plan()
+
+
+def test_reclamping_for_another_machine_starts_from_the_original_values():
+    once, _ = clamp_plan_operations([make_plan()], LIMITS)
+    fresh, _ = clamp_plan_operations([make_plan()], MachineLimits(spindle_rpm=20000))
+    again, _ = clamp_plan_operations(once, MachineLimits(spindle_rpm=20000))
+
+    assert again == fresh
+    assert "clamped" not in again[0]["operations"][0]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("medium", 0.85),
+    ("Very High", 1.0),
+    ("very-low", 0.6),
+    (0.7, 0.7),
+    ("0.7", 0.7),
+    (1, 1.0),
+    ("85%", 0.85),
+    (None, 1.0),
+])
+def test_rigidity_levels_factors_and_percentages(value, expected):
+    assert rigidity_factor(value) == expected
+
+
+@pytest.mark.parametrize("value", [7, "7", 50.0, "150%", 0, -0.5, "stiff", True])
+def test_rigidity_without_a_known_scale_is_logged_and_not_derated(value, caplog):
+    _REPORTED_RIGIDITIES.discard(value)
+    with caplog.at_level(logging.WARNING, logger="src.utils.speed_feed_limits"):
+        assert rigidity_factor(value) == 1.0
+        assert rigidity_factor(value) == 1.0
+    assert len(caplog.records) == 1